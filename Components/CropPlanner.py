@@ -0,0 +1,105 @@
+import os
+import numpy as np
+
+# Rate at which detections are sampled for path planning, and the proxy size they run on
+CROP_PLAN_FPS = float(os.getenv("CROP_PLAN_FPS", "2"))
+CROP_PLAN_PROXY_EDGE = int(os.getenv("CROP_PLAN_PROXY_EDGE", "320"))
+# Constraints, in crop-window widths: targets closer than the dead zone are ignored,
+# and the window never moves faster than the max speed (per second)
+CROP_PLAN_DEAD_ZONE = float(os.getenv("CROP_PLAN_DEAD_ZONE", "0.1"))
+CROP_PLAN_MAX_SPEED = float(os.getenv("CROP_PLAN_MAX_SPEED", "0.5"))
+# Length of the ease-in/ease-out window in seconds
+CROP_PLAN_SMOOTH_SECONDS = float(os.getenv("CROP_PLAN_SMOOTH_SECONDS", "0.5"))
+
+
+def _rate_limit(xs, max_step):
+    """
+    Cap frame-to-frame movement at max_step.
+
+    A forward pass lags behind target changes and a backward pass leads them;
+    their average is still within the limit and moves symmetrically around
+    the change (offline, the path can start moving before the subject does).
+    """
+    forward = xs.copy()
+    for i in range(1, len(forward)):
+        forward[i] = min(max(forward[i], forward[i - 1] - max_step), forward[i - 1] + max_step)
+    backward = xs.copy()
+    for i in range(len(backward) - 2, -1, -1):
+        backward[i] = min(max(backward[i], backward[i + 1] - max_step), backward[i + 1] + max_step)
+    return (forward + backward) / 2
+
+
+def _ease(xs, window):
+    """Centered moving average (edges held), which rounds off the corners of the rate-limited path."""
+    if window < 2 or len(xs) < 2:
+        return xs
+    padded = np.pad(xs, (window // 2, window - 1 - window // 2), mode="edge")
+    return np.convolve(padded, np.ones(window) / window, mode="valid")
+
+
+def plan_shot_path(num_frames, sample_frames, sample_targets, default, fps, window_width, max_x):
+    """
+    Smooth crop x positions for one shot.
+
+    Detections closer than the dead zone to the held position are ignored
+    (hysteresis), the held targets are interpolated to every frame, movement
+    is capped at the max speed and the result is eased.
+
+    Args:
+        num_frames: Frames in the shot
+        sample_frames: Frame offsets (within the shot, ascending) of the sampled detections
+        sample_targets: Desired crop x for each sample, or None where nothing was detected
+        default: Crop x when the shot has no usable detection
+        fps: Video frame rate
+        window_width: Crop window width in pixels (scales the constraints)
+        max_x: Largest valid crop x
+
+    Returns:
+        float array of num_frames crop x positions
+    """
+    observed = [(f, x) for f, x in zip(sample_frames, sample_targets) if x is not None]
+    if not observed:
+        return np.full(num_frames, float(min(max(default, 0), max_x)))
+
+    dead_zone = CROP_PLAN_DEAD_ZONE * window_width
+    held = []
+    current = observed[0][1]
+    for _, x in observed:
+        if abs(x - current) > dead_zone:
+            current = x
+        held.append(current)
+
+    xs = np.interp(np.arange(num_frames), [f for f, _ in observed], held)
+    xs = _rate_limit(xs, CROP_PLAN_MAX_SPEED * window_width / fps)
+    xs = _ease(xs, int(round(CROP_PLAN_SMOOTH_SECONDS * fps)))
+    return np.clip(xs, 0, max_x)
+
+
+def plan_crop_path(frame_ranges, shot_defaults, sample_frames, sample_targets, fps, window_width, max_x):
+    """
+    Crop x for every frame of a clip, planned offline from sparse detections.
+
+    Shots are planned independently, so the window jumps on cuts and glides
+    (within the speed limit) inside a shot. Rendering then only looks up
+    path[frame_index].
+
+    Args:
+        frame_ranges: [(first_frame, end_frame), ...] shots covering the clip
+        shot_defaults: Crop x per shot when it has no usable detection
+        sample_frames: Absolute frame index of each detection sample
+        sample_targets: Desired crop x per sample, or None where nothing was detected
+        fps: Video frame rate
+        window_width: Crop window width in pixels
+        max_x: Largest valid crop x
+
+    Returns:
+        int32 array with one crop x per frame (length frame_ranges[-1][1])
+    """
+    path = np.zeros(frame_ranges[-1][1], dtype=np.int32)
+    samples = sorted(zip(sample_frames, sample_targets), key=lambda s: s[0])
+    for (first, end), default in zip(frame_ranges, shot_defaults):
+        in_shot = [(f - first, x) for f, x in samples if first <= f < end]
+        shot_path = plan_shot_path(end - first, [f for f, _ in in_shot], [x for _, x in in_shot],
+                                   default, fps, window_width, max_x)
+        path[first:end] = np.round(shot_path).astype(np.int32)
+    return path
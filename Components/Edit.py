@@ -4,6 +4,8 @@ import numpy as np
 import os
 import random
 import cv2
+from Components.MediaProbe import probe_media
+from Components.KeyframeExtractor import FrameReader
 
 def extractAudio(video_path, audio_path="audio.wav"):
     try:
@@ -18,18 +20,19 @@ def extractAudio(video_path, audio_path="audio.wav"):
 
 
 def crop_video(input_file, output_file, start_time, end_time):
+    # Ensure end_time doesn't exceed video duration (probed metadata, no reader needed)
+    duration = probe_media(input_file)['duration']
+    max_time = duration - 0.1  # Small buffer to avoid edge cases
+    if end_time > max_time:
+        print(f"Warning: Requested end time ({end_time}s) exceeds video duration ({duration}s). Capping to {max_time}s")
+        end_time = max_time
+    
     with VideoFileClip(input_file) as video:
-        # Ensure end_time doesn't exceed video duration
-        max_time = video.duration - 0.1  # Small buffer to avoid edge cases
-        if end_time > max_time:
-            print(f"Warning: Requested end time ({end_time}s) exceeds video duration ({video.duration}s). Capping to {max_time}s")
-            end_time = max_time
-        
         cropped_video = video.subclip(start_time, end_time)
         cropped_video.write_videofile(output_file, codec='libx264')
 
 
-def stitch_video_segments(input_file, segments, output_file, theme=None):
+def stitch_video_segments(input_file, segments, output_file, theme=None, shot_starts=None):
     """
     Extract multiple segments from a video and stitch them together.
     
@@ -38,6 +41,9 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
         segments: List of dicts with 'start' and 'end' keys, e.g. [{'start': 10.5, 'end': 25.0}, ...]
         output_file: Path for the output stitched video
         theme: Optional string describing the video theme, used to influence transitions.
+        shot_starts: Optional list, filled with the output time (seconds) at which each
+            segment after the first takes over (mid-transition for overlapping ones), so
+            later stages know the shot boundaries without detecting cuts again
     
     Returns:
         True if successful, False otherwise
@@ -61,6 +67,7 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
         
         # Extract each segment as a subclip
         clips = []
+        clip_sources = []  # (file, start, end) per clip, None for direct clip objects
         total_duration = 0
         target_size = None
         
@@ -72,18 +79,20 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
             if clip_obj:
                 print(f"  Using direct clip object for segment {i+1}")
                 temp_video = clip_obj
+                source_duration = clip_obj.duration
             elif seg_file and os.path.exists(seg_file):
-                # Use cached video handle
+                # Validate against probed metadata; the reader is only opened for valid segments
+                temp_video = None
                 try:
-                    temp_video = get_video_from_cache(seg_file)
+                    source_duration = probe_media(seg_file)['duration']
                 except Exception as e:
-                    print(f"  Error opening {seg_file}: {e}")
+                    print(f"  Error probing {seg_file}: {e}")
                     continue
             else:
                 print(f"  Warning: No source found for segment {i+1}")
                 continue
 
-            seg_max_time = temp_video.duration - 0.1
+            seg_max_time = source_duration - 0.1
             
             start = segment['start']
             end = segment['end']
@@ -97,6 +106,14 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
                 print(f"  Warning: Skipping invalid segment {i+1} (start={start}s, end={end}s)")
                 continue
             
+            if temp_video is None:
+                # Use cached video handle
+                try:
+                    temp_video = get_video_from_cache(seg_file)
+                except Exception as e:
+                    print(f"  Error opening {seg_file}: {e}")
+                    continue
+            
             print(f"  Extracting segment {i+1}/{len(segments)} from {os.path.basename(seg_file)}: {start:.2f}s - {end:.2f}s ({end-start:.2f}s)")
             clip = temp_video.subclip(start, end)
             
@@ -118,6 +135,7 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
                 clip = crop(clip, x_center=clip.w/2, y_center=clip.h/2, width=tw, height=th)
 
             clips.append(clip)
+            clip_sources.append(None if clip_obj else (seg_file, start, end))
             total_duration += (end - start)
         
         if not clips:
@@ -138,6 +156,44 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
             except Exception:
                 return None
 
+        # Edge frames (first/last) of every clip are only compared with each other, so they are
+        # read at a small common size. File-backed clips are prefetched with one keyframe-indexed
+        # reader per source, which serves the sorted edge times with forward decodes instead of
+        # a moviepy seek per frame.
+        tw, th = target_size
+        edge_size = (160, max(2, int(round(160 * th / tw)))) if tw else (160, 90)
+
+        def _edge_resize(frame):
+            if frame is None:
+                return None
+            return cv2.resize(frame, edge_size, interpolation=cv2.INTER_AREA)
+
+        edge_frames = {}  # (clip index, at_end) -> frame
+        by_file = {}
+        for idx, source in enumerate(clip_sources):
+            if source:
+                by_file.setdefault(source[0], []).append((idx, source[1], source[2]))
+        for path, entries in by_file.items():
+            keys = []
+            times = []
+            for idx, start, end in entries:
+                keys += [(idx, False), (idx, True)]
+                times += [start + 0.05, max(start, end - 0.05)]
+            try:
+                with FrameReader(path, max_edge=max(edge_size) * 2) as reader:
+                    for key, frame in zip(keys, reader.read_many(times)):
+                        edge_frames[key] = _edge_resize(frame)
+            except Exception as e:
+                print(f"  Warning: Could not prefetch edge frames from {os.path.basename(path)} ({e})")
+
+        def _edge_frame(i, at_end):
+            frame = edge_frames.get((i, at_end))
+            if frame is None:
+                clip = clips[i]
+                frame = _edge_resize(_get_frame_safe(clip, clip.duration - 0.05 if at_end else 0.05))
+                edge_frames[(i, at_end)] = frame
+            return frame
+
         # Helper: compute normalized mean absolute difference between two frames
         def _frame_diff(f1, f2):
             if f1 is None or f2 is None:
@@ -151,23 +207,17 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
 
         is_celebration = theme and any(kw in theme.lower() for kw in ['birthday', 'party', 'celebration', 'festive'])
 
-        # Decide transition type between two clips
-        def _choose_transition(clip_a, clip_b):
+        # Decide transition type between two clips (clip indices)
+        def _choose_transition(index_a, index_b):
+            clip_a = clips[index_a]
+            clip_b = clips[index_b]
             # Very short clips => hard cut
             if clip_a.duration < 1.5 or clip_b.duration < 1.5:
                 return ('cut', 0)
 
             # Compute difference between last frame of A and first frame of B
-            frame_a = None
-            frame_b = None
-            try:
-                frame_a = clip_a.get_frame(max(0, clip_a.duration - 0.05))
-            except Exception:
-                frame_a = _get_frame_safe(clip_a, clip_a.duration/2 if clip_a.duration>0 else 0)
-            try:
-                frame_b = clip_b.get_frame(0.05)
-            except Exception:
-                frame_b = _get_frame_safe(clip_b, 0.1)
+            frame_a = _edge_frame(index_a, True)
+            frame_b = _edge_frame(index_b, False)
 
             diff = _frame_diff(frame_a, frame_b)
             # debug log selection
@@ -330,8 +380,8 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
                 current_time = clip_start + clip.duration
                 continue
 
-            prev = raw_clips[i-1]
-            trans_type, trans_dur = _choose_transition(prev, clip)
+            prev_end = current_time
+            trans_type, trans_dur = _choose_transition(i - 1, i)
 
             if trans_type == 'cut' or trans_dur <= 0:
                 # hard cut
@@ -388,8 +438,8 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
                 # Realistic light-leak: create animated warm overlay with soft moving mask
                 leak_dur = trans_dur
                 # Representative frames to determine suitability
-                frame_a = _get_frame_safe(prev, max(0, prev.duration - 0.05))
-                frame_b = _get_frame_safe(clip, 0.05)
+                frame_a = _edge_frame(i - 1, True)
+                frame_b = _edge_frame(i, False)
 
                 try:
                     w, h = clip.size
@@ -434,6 +484,10 @@ def stitch_video_segments(input_file, segments, output_file, theme=None):
                 timeline_clips.append(clip.set_start(clip_start))
                 current_time = clip_start + clip.duration
 
+            if shot_starts is not None:
+                clip_start = current_time - clip.duration
+                shot_starts.append((clip_start + prev_end) / 2 if clip_start < prev_end else clip_start)
+
         # Create final composite clip
         print(f"  Creating composite timeline with {len(timeline_clips)} clips and {len(overlays)} overlays")
         all_clips = timeline_clips + overlays
@@ -1,12 +1,296 @@
+import os
+import subprocess
+import tempfile
 import cv2
 import numpy as np
 from moviepy.editor import *
 from Components.Speaker import detect_faces_and_speakers, Frames
-global Fps
+from Components.KeyframeExtractor import FrameReader
+from Components.FastSceneDetect import get_ffmpeg_exe, compute_diff_series, detect_cuts
+from Components.FramePipeline import run_frame_pipeline, PIPELINE_WORKERS
+from Components.FaceDetector import get_face_detector
+from Components.CropPlanner import plan_crop_path, CROP_PLAN_FPS, CROP_PLAN_PROXY_EDGE
+from Components.MediaProbe import probe_media
+
+# "ffmpeg" pipes raw frames into libx264 and muxes the source audio in one pass;
+# "opencv" writes an mp4v intermediate and adds the audio with combine_videos
+CROP_ENCODER = os.getenv("CROP_ENCODER", "ffmpeg").lower()
+CROP_X264_PRESET = os.getenv("CROP_X264_PRESET", "veryfast")
+CROP_X264_CRF = os.getenv("CROP_X264_CRF", "20")
+# Shot detection for framing when no cut list is passed in. compute_diff_series scores
+# consecutive frames, so the ContentDetector threshold holds at any sample rate.
+CROP_SHOT_THRESHOLD = float(os.getenv("CROP_SHOT_THRESHOLD", "27"))
+CROP_SHOT_MIN_SECONDS = float(os.getenv("CROP_SHOT_MIN_SECONDS", "1.0"))
+CROP_SHOT_DETECT_FPS = 5
+# Sampled detections per shot (at least, while the total stays within CROP_SAMPLE_TOTAL)
+CROP_SHOT_MIN_SAMPLES = int(os.getenv("CROP_SHOT_MIN_SAMPLES", "3"))
+CROP_SAMPLE_TOTAL = 60
+# Samples are decoded at this longest edge (the face detector and saliency work on small frames anyway)
+CROP_SAMPLE_MAX_EDGE = 640
+# Follow faces within a shot along a planned path instead of one static crop per shot
+CROP_FACE_TRACKING = os.getenv("CROP_FACE_TRACKING", "0").lower() in ("1", "true", "yes")
+# Letterbox fill for scaled screen recordings: "black" bars or "blur" (a blurred, zoomed copy, rendered by ffmpeg)
+CROP_LETTERBOX = os.getenv("CROP_LETTERBOX", "black").lower()
+# pyrDown levels applied to the planning proxies before the screen tracker diffs them
+SCREEN_TRACKER_PYRAMID_LEVELS = 1
+
+
+class FFmpegWriter:
+    """
+    cv2.VideoWriter-compatible sink that streams BGR frames into ffmpeg.
+
+    Frames are encoded with libx264 (yuv420p, +faststart) and the first audio
+    stream of audio_source, if any, is muxed into the same output. An optional
+    ffmpeg video_filter is applied to the frames before encoding.
+    """
+
+    def __init__(self, output_path, fps, size, audio_source=None, video_filter=None):
+        width, height = size
+        cmd = [get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error",
+               "-f", "rawvideo", "-pix_fmt", "bgr24", "-s", f"{width}x{height}",
+               "-framerate", f"{fps:.6f}", "-i", "-"]
+        if audio_source:
+            cmd += ["-i", audio_source, "-map", "0:v:0", "-map", "1:a:0?",
+                    "-c:a", "aac", "-b:a", "192k", "-shortest"]
+        if video_filter:
+            cmd += ["-filter:v", video_filter]
+        cmd += ["-c:v", "libx264", "-preset", CROP_X264_PRESET, "-crf", str(CROP_X264_CRF),
+                "-pix_fmt", "yuv420p", "-movflags", "+faststart", output_path]
+        self._stderr = tempfile.TemporaryFile()
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=self._stderr)
+
+    def _error(self):
+        self._stderr.seek(0)
+        return self._stderr.read().decode("utf-8", "replace").strip()
+
+    def write(self, frame):
+        try:
+            # Contiguous frames (e.g. preallocated buffers) are written without a copy
+            self.proc.stdin.write(frame.data if frame.flags.c_contiguous else frame.tobytes())
+        except (BrokenPipeError, OSError):
+            self.proc.wait()
+            raise RuntimeError(f"ffmpeg encoder exited early: {self._error()}")
+
+    def release(self):
+        try:
+            self.proc.stdin.close()
+        except OSError:
+            pass
+        returncode = self.proc.wait()
+        error = self._error()
+        self._stderr.close()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg encoder failed ({returncode}): {error}")
+
+
+def static_crop_filter(x, y, width, height, out_width=None, out_height=None):
+    """
+    ffmpeg filter chain for a fixed crop window, optionally scaled to fit and
+    padded (black, centered) to out_width x out_height.
+
+    x may be a number or an ffmpeg expression evaluated per frame (see
+    _piecewise_frame_expr). Usable on its own (-vf) or as one link of a
+    larger filter graph.
+    """
+    if isinstance(x, str):
+        x = f"'{x}'"  # per-frame expression, quoted so its commas stay inside the option
+    else:
+        x = int(x)
+    chain = f"crop={int(width)}:{int(height)}:{x}:{int(y)}:exact=1"
+    if out_width and out_height and (out_width, out_height) != (width, height):
+        chain += (f",scale={int(out_width)}:{int(out_height)}:force_original_aspect_ratio=decrease"
+                  f",pad={int(out_width)}:{int(out_height)}:(ow-iw)/2:(oh-ih)/2:black")
+    return chain
+
+
+def render_static_crop(input_video_path, output_video_path, video_filter, audio_source=None):
+    """
+    Crop with a single ffmpeg run (decode, filter, libx264 encode, audio mux), so
+    no frame passes through Python.
+
+    Returns:
+        True on success, False if ffmpeg failed (the caller can fall back to the frame loop)
+    """
+    cmd = [get_ffmpeg_exe(), "-y", "-hide_banner", "-loglevel", "error", "-i", input_video_path]
+    audio_input = 0
+    if audio_source and os.path.abspath(audio_source) != os.path.abspath(input_video_path):
+        cmd += ["-i", audio_source]
+        audio_input = 1
+    cmd += ["-map", "0:v:0", "-map", f"{audio_input}:a:0?", "-vf", video_filter,
+            "-c:v", "libx264", "-preset", CROP_X264_PRESET, "-crf", str(CROP_X264_CRF),
+            "-pix_fmt", "yuv420p", "-c:a", "aac", "-b:a", "192k", "-shortest",
+            "-movflags", "+faststart", output_video_path]
+    try:
+        subprocess.run(cmd, check=True, capture_output=True)
+        return True
+    except (OSError, subprocess.CalledProcessError) as e:
+        stderr = getattr(e, "stderr", None)
+        detail = stderr.decode("utf-8", "replace").strip() if stderr else str(e)
+        print(f"Warning: ffmpeg static crop failed ({detail})")
+        return False
+
+
+def detect_shot_starts(video_path):
+    """Hard-cut times (seconds) from a low-resolution diff series."""
+    try:
+        times, scores = compute_diff_series(video_path, sample_fps=CROP_SHOT_DETECT_FPS, width=160)
+    except Exception as e:
+        print(f"Warning: Shot detection failed ({e}), framing the clip as one shot")
+        return []
+    return detect_cuts(times, scores, CROP_SHOT_THRESHOLD, CROP_SHOT_MIN_SECONDS)
+
+
+def _shot_frame_ranges(shot_starts, fps, total_frames):
+    """[(first_frame, end_frame), ...] covering the clip, split at the shot start times."""
+    bounds = sorted({int(round(t * fps)) for t in shot_starts} | {0, total_frames})
+    bounds = [b for b in bounds if 0 <= b <= total_frames]
+    ranges = [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1) if bounds[i + 1] > bounds[i]]
+    return ranges or [(0, max(1, total_frames))]
+
+
+def _allocate_samples(frame_ranges, total=CROP_SAMPLE_TOTAL):
+    """
+    Frame indices to sample for per-shot targets, at most `total` overall.
+
+    Shots get CROP_SHOT_MIN_SAMPLES (or an even share of the total, if larger)
+    spread over the shot; with many shots the share shrinks to one sample, and
+    past `total` shots only evenly spaced shots are sampled (the others use the
+    clip-wide fallback target).
+
+    Returns:
+        (sample_indices, sample_shots): frame index and shot index of each sample
+    """
+    shots = list(range(len(frame_ranges)))
+    if len(shots) > total:
+        shots = sorted(set(np.linspace(0, len(frame_ranges) - 1, total).round().astype(int).tolist()))
+    per_shot = max(CROP_SHOT_MIN_SAMPLES, total // len(shots))
+    if per_shot * len(shots) > total:
+        per_shot = max(1, total // len(shots))
+
+    sample_indices, sample_shots = [], []
+    for shot_idx in shots:
+        first_frame, end_frame = frame_ranges[shot_idx]
+        count = min(per_shot, end_frame - first_frame)
+        if count == 1:
+            positions = [(first_frame + end_frame - 1) // 2]
+        else:
+            positions = np.linspace(first_frame, end_frame - 1, count, dtype=int)
+        for idx in positions:
+            sample_indices.append(int(idx))
+            sample_shots.append(shot_idx)
+    return sample_indices, sample_shots
+
+
+def _piecewise_frame_expr(frame_ranges, values):
+    """ffmpeg expression of the frame number n giving values[i] inside frame_ranges[i]."""
+    expr = str(int(values[-1]))
+    for (_, end_frame), value in reversed(list(zip(frame_ranges[:-1], values[:-1]))):
+        expr = f"if(lt(n,{end_frame}),{int(value)},{expr})"
+    return expr
+
+
+def blurred_background_filter(width, height):
+    """ffmpeg filter that centers the input on a blurred, zoomed copy of itself filling width x height."""
+    return (f"split[fg][bg];[bg]scale={width}:{height}:force_original_aspect_ratio=increase,"
+            f"crop={width}:{height},boxblur=20:2[bg];[bg][fg]overlay=(W-w)/2:(H-h)/2")
+
+
+def _screen_activity_targets(samples, shot_ids, shot_targets, frame_width, clamp_x):
+    """
+    Crop targets for a screen recording from low-rate proxy samples.
+
+    Each proxy is reduced to a small grayscale pyramid level; where it changed
+    since the previous sample of the same shot (typing, cursor, scrolling)
+    nudges the shot target by 20%. Samples without change keep the shot target.
+    """
+    targets = []
+    prev_gray, prev_shot = None, None
+    for proxy, shot in zip(samples, shot_ids):
+        gray = cv2.cvtColor(proxy, cv2.COLOR_BGR2GRAY)
+        for _ in range(SCREEN_TRACKER_PYRAMID_LEVELS):
+            gray = cv2.pyrDown(gray)
+        target = shot_targets[shot]
+        if prev_gray is not None and prev_shot == shot:
+            diff = cv2.absdiff(gray, prev_gray)
+            col_activity = np.sum(diff * (diff > 25), axis=0, dtype=np.float64)
+            if col_activity.sum() > 0:
+                proxy_scale = frame_width / gray.shape[1]
+                center = np.average((np.arange(gray.shape[1]) + 0.5) * proxy_scale, weights=col_activity)
+                # Prefer the shot target but allow activity nudges (80% / 20%)
+                target = 0.80 * target + 0.20 * clamp_x(center)
+        targets.append(target)
+        prev_gray, prev_shot = gray, shot
+    return targets
+
+
+def _plan_dynamic_path(input_video_path, fps, total_frames, frame_ranges, shot_targets, frame_width,
+                       window_width, track_faces):
+    """
+    Per-frame crop x (in frame_width coordinates) planned from sparse samples.
+
+    Frames are sampled at CROP_PLAN_FPS as small proxies. With track_faces the
+    target is the largest face; otherwise it is the shot target nudged (20%)
+    toward where the picture changed since the previous sample, which replaces
+    per-second optical flow for screen recordings.
+    """
+    step = max(1, int(round(fps / CROP_PLAN_FPS)))
+    sample_indices = list(range(0, total_frames, step))
+    proxy_edge = max(CROP_PLAN_PROXY_EDGE, 640) if track_faces else CROP_PLAN_PROXY_EDGE
+    print(f"Planning crop path from {len(sample_indices)} samples ({CROP_PLAN_FPS:g} fps)...")
+    try:
+        with FrameReader(input_video_path, max_edge=proxy_edge, pix_fmt='bgr24') as reader:
+            proxies = reader.read_many([idx / fps for idx in sample_indices])
+    except Exception as e:
+        print(f"Warning: Could not sample frames for the crop path ({e})")
+        proxies = []
+
+    max_x = frame_width - window_width
+
+    def clamp_x(center_x):
+        return max(0, min(center_x - window_width / 2, max_x))
+
+    def shot_of(frame_idx):
+        return next((i for i, (_, end) in enumerate(frame_ranges) if frame_idx < end), len(frame_ranges) - 1)
+
+    samples = [(idx, p) for idx, p in zip(sample_indices, proxies) if p is not None]
+    targets = []
+    if track_faces:
+        detections = get_face_detector().detect_batch([p for _, p in samples])
+        for (_, proxy), faces in zip(samples, detections):
+            if faces:
+                x, y, w, h, _ = faces[0]
+                proxy_scale = frame_width / proxy.shape[1]
+                # Same slight right offset as the static face target
+                targets.append(clamp_x((x + w / 2) * proxy_scale + 60))
+            else:
+                targets.append(None)
+    else:
+        targets = _screen_activity_targets([p for _, p in samples], [shot_of(idx) for idx, _ in samples],
+                                           shot_targets, frame_width, clamp_x)
+
+    return plan_crop_path(frame_ranges, shot_targets, [idx for idx, _ in samples], targets,
+                          fps, window_width, max_x)
+
 
-def crop_to_vertical(input_video_path, output_video_path):
-    """Crop video to vertical 9:16 format with static face detection (no tracking)"""
-    face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+def crop_to_vertical(input_video_path, output_video_path, audio_source=None, shot_starts=None):
+    """
+    Crop video to vertical 9:16 format with a static crop per shot (no per-frame detection).
+
+    Each shot gets its own face-centered (or saliency) target from a few
+    sampled detections; the crop window jumps on cuts only. Screen recordings
+    (and face clips with CROP_FACE_TRACKING) follow a crop path planned
+    offline by Components.CropPlanner instead.
+
+    Args:
+        input_video_path: Video to crop
+        output_video_path: Output path; carries the audio of audio_source
+            (default: the input video), so no separate combine_videos pass is needed
+        audio_source: Optional file to take the audio from
+        shot_starts: Shot boundary times in seconds (e.g. from stitch_video_segments);
+            when omitted, hard cuts are detected on a low-resolution pass
+    """
+    if audio_source is None:
+        audio_source = input_video_path
 
     cap = cv2.VideoCapture(input_video_path, cv2.CAP_FFMPEG)
     if not cap.isOpened():
@@ -17,6 +301,17 @@ def crop_to_vertical(input_video_path, output_video_path):
     original_height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
     fps = cap.get(cv2.CAP_PROP_FPS)
     total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    if fps <= 0 or total_frames <= 0:
+        # Some containers report no rate or frame count through OpenCV
+        try:
+            info = probe_media(input_video_path)
+        except Exception as e:
+            print(f"Warning: Could not probe {input_video_path} ({e})")
+            info = {}
+        if fps <= 0:
+            fps = info.get('fps') or 30.0
+        if total_frames <= 0:
+            total_frames = info.get('frame_count') or int(round((info.get('duration') or 0.0) * fps))
 
     vertical_height = int(original_height)
     # libx264 requires even height and width
@@ -34,50 +329,82 @@ def crop_to_vertical(input_video_path, output_video_path):
         print("Error: Original video width is less than the desired vertical width.")
         return
 
-    # Sample frames evenly across the video (up to 60 frames) to find best crop position.
+    # Shot boundaries: cut times handed over by stitching, else a cheap low-res cut detection pass
+    if shot_starts is None:
+        shot_starts = detect_shot_starts(input_video_path)
+    scene_frame_ranges = _shot_frame_ranges(shot_starts, fps, total_frames)
+
+    # Sample a few frames per shot (at most CROP_SAMPLE_TOTAL in total) to find each shot's crop position.
     # This replaces the old approach of calling detect_scenes() inside this function,
     # which was redundant and caused a major slowdown (especially in scene_based mode).
-    print("Sampling frames to determine crop position...")
-    sample_count = min(60, total_frames)
-    sample_indices = np.linspace(0, total_frames - 1, sample_count, dtype=int)
-
-    face_positions = []
-    col_scores_global = None
-
-    for idx in sample_indices:
-        cap.set(cv2.CAP_PROP_POS_FRAMES, int(idx))
-        ret, frame = cap.read()
-        if not ret:
-            continue
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=8, minSize=(30, 30))
-        if len(faces) > 0:
-            best_face = max(faces, key=lambda f: f[2] * f[3])
-            x, y, w, h = best_face
-            face_positions.append(x + w // 2)
+    print(f"Sampling frames to determine crop positions for {len(scene_frame_ranges)} shot(s)...")
+    sample_indices, sample_shots = _allocate_samples(scene_frame_ranges)
+
+    # Samples are read through the keyframe index (seek to the nearest keyframe, decode
+    # forward) instead of cap.set(CAP_PROP_POS_FRAMES), which can hang on some MP4s.
+    # They are scaled down while converting; x positions are mapped back by sample_scale.
+    sample_scale = 1.0
+    try:
+        with FrameReader(input_video_path, max_edge=CROP_SAMPLE_MAX_EDGE, pix_fmt='bgr24') as reader:
+            sample_scale = original_width / reader.width
+            sample_frames = reader.read_many([idx / fps for idx in sample_indices])
+    except Exception as e:
+        print(f"Warning: Could not sample frames ({e})")
+        sample_frames = []
+
+    shot_faces = [[] for _ in scene_frame_ranges]
+    shot_cols = [None] * len(scene_frame_ranges)
+
+    # All samples go through the shared face detector in batches (boxes in source coordinates)
+    samples = [(f, shot) for f, shot in zip(sample_frames, sample_shots) if f is not None]
+    detections = get_face_detector().detect_batch([f for f, _ in samples])
 
+    for (frame, shot_idx), faces in zip(samples, detections):
+        if faces:
+            x, y, w, h, _ = faces[0]  # largest face
+            shot_faces[shot_idx].append((x + w / 2) * sample_scale)
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
         sobelx = np.abs(cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3))
         col_sum = np.sum(sobelx, axis=0)
-        col_scores_global = col_sum if col_scores_global is None else col_scores_global + col_sum
+        shot_cols[shot_idx] = col_sum if shot_cols[shot_idx] is None else shot_cols[shot_idx] + col_sum
+
+    def clamp_x(center_x):
+        return max(0, min(int(center_x) - vertical_width // 2, original_width - vertical_width))
 
-    # Calculate static crop position from sampled frames
+    def face_target(positions):
+        # Median face center, with a slight right offset to avoid clipping the face
+        return clamp_x(sorted(positions)[len(positions) // 2] + 60)
+
+    def saliency_target(col_scores):
+        if col_scores is None or not np.any(col_scores):
+            return None
+        # Columns are in sample coordinates; the weighted center is mapped back to the source width
+        return clamp_x((np.average(np.arange(len(col_scores)), weights=col_scores) + 0.5) * sample_scale)
+
+    face_positions = [x for positions in shot_faces for x in positions]
+    saliency_cols = [c for c in shot_cols if c is not None]
+    col_scores_global = np.sum(saliency_cols, axis=0) if saliency_cols else None
+    global_saliency = saliency_target(col_scores_global)
+
+    # Per-shot static targets: the shot's faces, else its saliency (targets switch only on cuts)
     if face_positions:
-        avg_face_x = int(sorted(face_positions)[len(face_positions) // 2])
-        avg_face_x += 60  # slight right offset to avoid clipping face
-        x_start = max(0, min(avg_face_x - vertical_width // 2, original_width - vertical_width))
-        print(f"✓ Face detected. Using face-centered crop at x={x_start}")
+        fallback_x = face_target(face_positions)
+        scene_targets = []
+        for positions, cols in zip(shot_faces, shot_cols):
+            target = face_target(positions) if positions else saliency_target(cols)
+            scene_targets.append(fallback_x if target is None else target)
+        print(f"✓ Face detected. Using face-centered crop at x={scene_targets}")
         use_motion_tracking = False
     else:
         print("✗ No face detected. Using motion tracking for screen recording.")
         use_motion_tracking = True
-        x_start = 0
-
-    # Reset video to beginning by reopening (safer than cap.set which can hang on some MP4s)
-    cap.release()
-    cap = cv2.VideoCapture(input_video_path, cv2.CAP_FFMPEG)
-    if not cap.isOpened():
-        print("Error: Could not reopen video.")
-        return
+        fallback_x = global_saliency if global_saliency is not None else 0
+        scene_targets = []
+        for cols in shot_cols:
+            target = saliency_target(cols)
+            scene_targets.append(fallback_x if target is None else target)
+        print(f"Using saliency-based crop at x={scene_targets}")
 
     # For screen recordings, pre-calculate scale factor
     scale = 1.0
@@ -95,165 +422,114 @@ def crop_to_vertical(input_video_path, output_video_path):
 
         print(f"Scaling video from {original_width}x{original_height} to {scaled_width}x{scaled_height}")
 
-    # Determine static crop target x from global saliency (used for both modes as fallback)
-    if not face_positions and col_scores_global is not None:
-        cols = np.arange(len(col_scores_global))
-        weighted = int(np.average(cols, weights=col_scores_global))
-        x_start = max(0, min(weighted - vertical_width // 2, original_width - vertical_width))
-        print(f"Using saliency-based crop at x={x_start}")
-
-    # Use a single static scene target for the whole clip (no per-scene scene detection)
-    scene_frame_ranges = [(0, total_frames)]
-    scene_targets = [x_start]
-
-    # Reset to beginning for main processing loop by reopening again just to be safe
-    # But actually, the previous loop might not have moved the frame pointer if we just reopened it.
-    # We didn't read any frames after reopening! So we don't need to reopen it again,
-    # UNLESS we read frames. Wait, we didn't. 
-    # Just to be absolute safe, let's reopen it here and remove the previous reopen if not needed.
-    # Oh, wait, the previous reopen is fine, but let's just make sure it's at frame 0.
-    cap.release()
-    cap = cv2.VideoCapture(input_video_path, cv2.CAP_FFMPEG)
+    # Dynamic framing (screen recordings, or faces with CROP_FACE_TRACKING): the whole crop path
+    # is planned up front from detections sampled at CROP_PLAN_FPS on small proxies
+    crop_path = None
+    if use_motion_tracking:
+        crop_path = _plan_dynamic_path(input_video_path, fps, total_frames, scene_frame_ranges,
+                                       [int(t * scale) for t in scene_targets], scaled_width,
+                                       vertical_width, track_faces=False)
+    elif CROP_FACE_TRACKING:
+        crop_path = _plan_dynamic_path(input_video_path, fps, total_frames, scene_frame_ranges,
+                                       scene_targets, original_width, vertical_width, track_faces=True)
+
+    # A static crop needs no per-frame Python work: ffmpeg crops, encodes and muxes in one run
+    if crop_path is None and CROP_ENCODER == "ffmpeg":
+        crop_x = _piecewise_frame_expr(scene_frame_ranges, scene_targets)
+        video_filter = static_crop_filter(crop_x, 0, vertical_width, vertical_height)
+        print(f"Static crop via ffmpeg: {video_filter}")
+        if render_static_crop(input_video_path, output_video_path, video_filter, audio_source):
+            cap.release()
+            print(f"Cropping complete -> {output_video_path}")
+            return
+        print("Falling back to frame-by-frame cropping")
+
+    # cap has not read any frames yet (sampling used its own reader), so it is still at frame 0
 
     # scaled_width/height and scale already computed above when needed
 
-    # Write output
-    fourcc = cv2.VideoWriter_fourcc(*'mp4v')
-    out = cv2.VideoWriter(output_video_path, fourcc, fps, (vertical_width, vertical_height))
-    global Fps
-    Fps = fps
-
-    frame_count = 0
-    smoothed_x = 0  # Smoothed horizontal position in scaled coordinates
-    prev_gray = None
-    
-    # Calculate update interval for motion tracking (max 1 shift per second)
-    if use_motion_tracking:
-        update_interval = int(fps)  # Update once per second
-        print(f"Motion tracking: updating every {update_interval} frames (~1 shift/second)")
-    
-    current_scene_idx = 0
-    # Initialize smoothed_x to first scene target (scaled coords if needed)
-    first_target = scene_targets[0] if scene_targets else 0
-    if use_motion_tracking:
-        smoothed_x = int(first_target * scale)
-    else:
-        smoothed_x = first_target
-
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
+    # Screen recordings are scaled into a band of the output; the rest is letterbox fill
+    band_height = min(scaled_height, vertical_height)
+    blur_fill = use_motion_tracking and band_height < vertical_height and CROP_LETTERBOX == "blur"
+    frame_height = band_height if blur_fill else vertical_height
 
-        # Determine current scene index based on frame_count
-        while current_scene_idx + 1 < len(scene_frame_ranges) and frame_count >= scene_frame_ranges[current_scene_idx][1]:
-            current_scene_idx += 1
-        
+    # Write output
+    video_only_path = None
+    out = None
+    if CROP_ENCODER == "ffmpeg":
+        video_filter = blurred_background_filter(vertical_width, vertical_height) if blur_fill else None
+        try:
+            out = FFmpegWriter(output_video_path, fps, (vertical_width, frame_height), audio_source, video_filter)
+        except OSError as e:
+            print(f"Warning: Could not start ffmpeg encoder ({e}), using OpenCV writer")
+    if out is None:
+        if blur_fill:
+            print("Warning: Blurred letterbox needs the ffmpeg encoder, using black bars")
+            blur_fill = False
+            frame_height = vertical_height
+        root, ext = os.path.splitext(output_video_path)
+        video_only_path = f"{root}_video_only{ext}"
+        fourcc = cv2.VideoWriter_fourcc(*'mp4v')
+        out = cv2.VideoWriter(video_only_path, fourcc, fps, (vertical_width, vertical_height))
+
+    # Crop x for every frame is known up front (planned path, or each shot's static target),
+    # so all per-frame work is stateless and runs in the transform pool
+    if crop_path is None:
+        crop_path = np.repeat(np.array(scene_targets, dtype=np.int32),
+                              [end - first for first, end in scene_frame_ranges])
+    crop_path = np.clip(crop_path, 0, (scaled_width if use_motion_tracking else original_width) - vertical_width)
+
+    # Output frames go into a ring of preallocated buffers. A buffer is only reused once its
+    # frame has been written: at most max_in_flight results wait in the queue, plus one in the
+    # encoder and one being transformed
+    max_in_flight = PIPELINE_WORKERS * 2
+    ring = [np.zeros((frame_height, vertical_width, 3), dtype=np.uint8) for _ in range(max_in_flight + 2)]
+    offset_y = (frame_height - band_height) // 2
+    sx = scaled_width / original_width
+    sy = scaled_height / original_height
+
+    def decode_frames():
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                return
+            yield frame
+
+    # Transform stage (worker pool): crop (and for screen recordings, scale) one frame
+    def transform(frame_idx, frame):
+        crop_x = int(crop_path[min(frame_idx, len(crop_path) - 1)])
+        buffer = ring[frame_idx % len(ring)]
         if use_motion_tracking:
-            # Resize frame first
-            resized_frame = cv2.resize(frame, (scaled_width, scaled_height), interpolation=cv2.INTER_LANCZOS4)
-            # Update motion tracking once per second (optical flow) but also nudge toward scene target
-            if frame_count % update_interval == 0:
-                curr_gray = cv2.cvtColor(resized_frame, cv2.COLOR_BGR2GRAY)
-
-                if prev_gray is not None:
-                    # Calculate optical flow
-                    flow = cv2.calcOpticalFlowFarneback(prev_gray, curr_gray, None,
-                                                         0.5, 3, 15, 3, 5, 1.2, 0)
-                    magnitude = np.sqrt(flow[..., 0]**2 + flow[..., 1]**2)
-                    motion_threshold = 2.0
-                    significant_motion = magnitude > motion_threshold
-
-                    if np.any(significant_motion):
-                        col_motion = np.sum(magnitude * significant_motion, axis=0)
-                        if np.sum(col_motion) > 0:
-                            motion_x = int(np.average(np.arange(scaled_width), weights=col_motion))
-                            target_x_motion = max(0, min(motion_x - vertical_width // 2, scaled_width - vertical_width))
-                        else:
-                            target_x_motion = smoothed_x
-                    else:
-                        target_x_motion = smoothed_x
-                else:
-                    target_x_motion = smoothed_x
-
-                prev_gray = curr_gray
-
-            # Scene-based target (convert scene target to scaled coords)
-            scene_target_orig = scene_targets[current_scene_idx]
-            scene_target_scaled = int(scene_target_orig * scale)
-
-            # Blend motion target and scene target: prefer scene target but allow motion nudges
-            # Compute desired target: 80% scene target, 20% motion target
-            desired_target = int(0.80 * scene_target_scaled + 0.20 * (locals().get('target_x_motion', smoothed_x)))
-
-            # Smoothly approach desired target each frame
-            smoothed_x = int(0.90 * smoothed_x + 0.10 * desired_target)
-            
-            # Crop from scaled frame
-            crop_x_start = int(smoothed_x)
-            crop_x_end = min(crop_x_start + vertical_width, scaled_width)
-            
-            # Ensure we get full width
-            if crop_x_end - crop_x_start < vertical_width:
-                crop_x_start = max(0, crop_x_end - vertical_width)
-            
-            cropped_frame = resized_frame[:, crop_x_start:crop_x_end]
-            
-            # If scaled height is less than vertical height, add letterboxing
-            if scaled_height < vertical_height:
-                canvas = np.zeros((vertical_height, vertical_width, 3), dtype=np.uint8)
-                offset_y = (vertical_height - scaled_height) // 2
-                canvas[offset_y:offset_y+scaled_height, :] = cropped_frame
-                cropped_frame = canvas
-            elif scaled_height > vertical_height:
-                # Crop height from top
-                cropped_frame = cropped_frame[:vertical_height, :]
+            # Resample only the kept window of the scaled frame: one inverse-mapped affine warp
+            # from source pixels into the band rows (letterbox rows stay untouched)
+            matrix = np.float32([[1 / sx, 0, (crop_x + 0.5) / sx - 0.5],
+                                 [0, 1 / sy, 0.5 / sy - 0.5]])
+            cv2.warpAffine(frame, matrix, (vertical_width, band_height), dst=buffer[offset_y:offset_y + band_height],
+                           flags=cv2.INTER_LANCZOS4 | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
         else:
-            # Face-detected videos (or scene-based static crops): determine scene target and crop accordingly
-            scene_target = scene_targets[current_scene_idx] if scene_targets else x_start
-            crop_x = int(scene_target)
-            # Ensure bounds
-            crop_x = max(0, min(crop_x, original_width - vertical_width))
-            cropped_frame = frame[:, crop_x:crop_x+vertical_width]
-        
-        # Ensure final frame matches exact vertical dimensions (vertical_width x vertical_height)
-        # If the crop is smaller (due to scaling), pad with black; if larger, crop to fit.
-        if cropped_frame is None or cropped_frame.size == 0 or cropped_frame.shape[1] == 0:
-            print(f"Warning: Empty crop at frame {frame_count}")
-            break
-
-        ch = 3 if len(cropped_frame.shape) == 3 else 1
-        h, w = cropped_frame.shape[0], cropped_frame.shape[1]
-
-        # If too tall or too wide, trim to exact size
-        if h > vertical_height or w > vertical_width:
-            cropped_frame = cropped_frame[:vertical_height, :vertical_width]
-
-        # Recompute sizes after potential trim
-        h, w = cropped_frame.shape[0], cropped_frame.shape[1]
-
-        # If smaller in either dimension, pad with black to reach exact size
-        if h < vertical_height or w < vertical_width:
-            if ch == 1:
-                canvas = np.zeros((vertical_height, vertical_width), dtype=cropped_frame.dtype)
-                y_offset = (vertical_height - h) // 2
-                x_offset = (vertical_width - w) // 2
-                canvas[y_offset:y_offset+h, x_offset:x_offset+w] = cropped_frame
-            else:
-                canvas = np.zeros((vertical_height, vertical_width, 3), dtype=cropped_frame.dtype)
-                y_offset = (vertical_height - h) // 2
-                x_offset = (vertical_width - w) // 2
-                canvas[y_offset:y_offset+h, x_offset:x_offset+w, :] = cropped_frame
-            cropped_frame = canvas
-        
-        out.write(cropped_frame)
-        frame_count += 1
-        
-        if frame_count % 100 == 0:
-            print(f"Processed {frame_count}/{total_frames} frames")
-
-    cap.release()
-    out.release()
+            window = frame[:vertical_height, crop_x:crop_x + vertical_width]
+            if window.shape != buffer.shape:
+                # Short or narrow frame (e.g. a corrupt one): black-pad it
+                buffer[:] = 0
+            buffer[:window.shape[0], :window.shape[1]] = window
+        return buffer
+
+    # Encoder stage (in frame order)
+    def emit(frame_count, frame):
+        out.write(frame)
+        if (frame_count + 1) % 100 == 0:
+            print(f"Processed {frame_count + 1}/{total_frames} frames")
+
+    # Decoding, the transform pool and ordered encoding overlap, so throughput follows
+    # the core count instead of the slowest step
+    try:
+        frame_count = run_frame_pipeline(decode_frames(), transform, emit, max_in_flight=max_in_flight)
+    finally:
+        cap.release()
+        out.release()
+    if video_only_path:
+        combine_videos(audio_source, video_only_path, output_video_path)
+        os.remove(video_only_path)
     print(f"Cropping complete. Processed {frame_count} frames -> {output_video_path}")
 
 
@@ -267,8 +543,7 @@ def combine_videos(video_with_audio, video_without_audio, output_filename):
         audio = clip_with_audio.audio
         combined_clip = clip_without_audio.set_audio(audio)
 
-        global Fps
-        target_fps = Fps if Fps else 24
+        target_fps = clip_without_audio.fps or 24
         
         print(f"  Combining video and audio ({target_fps} FPS) to {output_filename}...")
         combined_clip.write_videofile(
@@ -294,10 +569,8 @@ def combine_videos(video_with_audio, video_without_audio, output_filename):
 if __name__ == "__main__":
     input_video_path = r'Out.mp4'
     output_video_path = 'Croped_output_video.mp4'
-    final_video_path = 'final_video_with_audio.mp4'
     detect_faces_and_speakers(input_video_path, "DecOut.mp4")
     crop_to_vertical(input_video_path, output_video_path)
-    combine_videos(input_video_path, output_video_path, final_video_path)
 
 
 
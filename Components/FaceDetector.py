@@ -0,0 +1,114 @@
+import os
+import threading
+import cv2
+import numpy as np
+
+# res10 SSD face detector (models/deploy.prototxt ships with the repo; the caffemodel is downloaded separately)
+FACE_DNN_PROTOTXT = os.getenv("FACE_DNN_PROTOTXT", "models/deploy.prototxt")
+FACE_DNN_MODEL = os.getenv("FACE_DNN_MODEL", "models/res10_300x300_ssd_iter_140000_fp16.caffemodel")
+FACE_DNN_CONFIDENCE = float(os.getenv("FACE_DNN_CONFIDENCE", "0.5"))
+# Frames per forward pass
+FACE_DNN_BATCH_SIZE = int(os.getenv("FACE_DNN_BATCH_SIZE", "16"))
+DNN_INPUT_SIZE = 300
+DNN_MEAN = (104.0, 177.0, 123.0)
+# The Haar fallback runs on grayscale copies downscaled to this longest edge
+HAAR_MAX_EDGE = 640
+
+
+class FaceDetector:
+    """
+    Face detection service: res10 SSD on batches of 300x300 blobs, with the
+    Haar cascade as a fallback when the caffemodel is not available.
+
+    Boxes are returned in source-frame coordinates as (x, y, w, h, confidence)
+    sorted by area, largest first (Haar boxes have confidence 1.0).
+    Use get_face_detector() for the shared per-process instance.
+    """
+
+    def __init__(self, prototxt=FACE_DNN_PROTOTXT, model=FACE_DNN_MODEL, confidence=FACE_DNN_CONFIDENCE):
+        self.confidence = confidence
+        self.net = None
+        self._cascade = None
+        # cv2.dnn.Net is not safe to run from several threads at once
+        self._lock = threading.Lock()
+        if os.path.exists(prototxt) and os.path.exists(model):
+            try:
+                self.net = cv2.dnn.readNetFromCaffe(prototxt, model)
+            except cv2.error as e:
+                print(f"Warning: Could not load face DNN ({e}), using Haar cascade")
+        else:
+            print(f"Face DNN model not found ({model}), using Haar cascade")
+
+    @property
+    def backend(self):
+        return "dnn" if self.net is not None else "haar"
+
+    def detect(self, frame, rgb=False):
+        """Faces in one frame (see detect_batch)."""
+        return self.detect_batch([frame], rgb)[0]
+
+    def detect_batch(self, frames, rgb=False):
+        """
+        Detect faces in a list of frames.
+
+        Args:
+            frames: List of uint8 color frames (any sizes)
+            rgb: True for RGB frames, False for OpenCV's BGR
+
+        Returns:
+            One list of (x, y, w, h, confidence) per frame, largest face first
+        """
+        if self.net is None:
+            return [self._detect_haar(f, rgb) for f in frames]
+        results = []
+        for start in range(0, len(frames), FACE_DNN_BATCH_SIZE):
+            results.extend(self._detect_dnn(frames[start:start + FACE_DNN_BATCH_SIZE], rgb))
+        return results
+
+    def _detect_dnn(self, frames, rgb):
+        small = [cv2.resize(f, (DNN_INPUT_SIZE, DNN_INPUT_SIZE), interpolation=cv2.INTER_AREA) for f in frames]
+        blob = cv2.dnn.blobFromImages(small, 1.0, (DNN_INPUT_SIZE, DNN_INPUT_SIZE), DNN_MEAN, swapRB=rgb)
+        with self._lock:
+            self.net.setInput(blob)
+            detections = self.net.forward()[0, 0]
+
+        # Rows are [image index, class, confidence, x1, y1, x2, y2] with normalized corners
+        detections = detections[detections[:, 2] >= self.confidence]
+        results = [[] for _ in frames]
+        for image_idx, _, score, x1, y1, x2, y2 in detections:
+            image_idx = int(image_idx)
+            if not 0 <= image_idx < len(frames):
+                continue
+            h, w = frames[image_idx].shape[:2]
+            x1, x2 = np.clip([x1 * w, x2 * w], 0, w)
+            y1, y2 = np.clip([y1 * h, y2 * h], 0, h)
+            if x2 - x1 >= 2 and y2 - y1 >= 2:
+                results[image_idx].append((int(x1), int(y1), int(x2 - x1), int(y2 - y1), float(score)))
+        return [sorted(faces, key=lambda f: f[2] * f[3], reverse=True) for faces in results]
+
+    def _detect_haar(self, frame, rgb):
+        if self._cascade is None:
+            self._cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+        h, w = frame.shape[:2]
+        scale = min(1.0, HAAR_MAX_EDGE / max(h, w))
+        gray = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY if rgb else cv2.COLOR_BGR2GRAY)
+        if scale < 1.0:
+            gray = cv2.resize(gray, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        min_size = max(16, int(30 * scale))
+        faces = self._cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=8, minSize=(min_size, min_size))
+        boxes = [(int(x / scale), int(y / scale), int(fw / scale), int(fh / scale), 1.0) for x, y, fw, fh in faces]
+        return sorted(boxes, key=lambda f: f[2] * f[3], reverse=True)
+
+
+_detector = None
+_detector_lock = threading.Lock()
+
+
+def get_face_detector():
+    """Process-wide FaceDetector, loaded on first use."""
+    global _detector
+    with _detector_lock:
+        if _detector is None:
+            _detector = FaceDetector()
+            print(f"Face detector backend: {_detector.backend}")
+        return _detector
@@ -0,0 +1,591 @@
+from concurrent.futures import ThreadPoolExecutor
+import hashlib
+import os
+import subprocess
+import numpy as np
+import cv2
+from Components.MediaProbe import probe_media
+
+# Analysis resolution of the piped frame stream and rate of the output score series
+SCENE_DETECT_WIDTH = int(os.getenv("SCENE_DETECT_WIDTH", "256"))
+SCENE_DETECT_FPS = float(os.getenv("SCENE_DETECT_FPS", "10"))
+FRAMES_PER_BATCH = 256
+
+# Parallel chunked detection for long inputs
+SCENE_DETECT_WORKERS = int(os.getenv("SCENE_DETECT_WORKERS", str(min(4, os.cpu_count() or 1))))
+SCENE_DETECT_PARALLEL_MIN_SECONDS = float(os.getenv("SCENE_DETECT_PARALLEL_MIN_SECONDS", "300"))
+CHUNK_OVERLAP_SECONDS = 1.0
+# Bumped when the meaning of the cached series changes (2: max of consecutive-frame scores per sample)
+DIFF_SERIES_VERSION = 2
+
+# Packet-metadata ("probe") mode: a non-keyframe packet this many times larger than
+# the median packet around it is a candidate cut
+PROBE_SPIKE_RATIO = float(os.getenv("SCENE_PROBE_SPIKE_RATIO", "2.5"))
+PROBE_WINDOW_SECONDS = 2.0
+PROBE_MAX_CANDIDATES = 3000
+# Candidates verified by decoding; more than this (or more frames to decode than a
+# full pass) and probe mode falls back to the fast detector
+PROBE_MAX_VERIFY = int(os.getenv("SCENE_PROBE_MAX_VERIFY", "200"))
+
+
+def get_ffmpeg_exe():
+    """ffmpeg binary from FFMPEG_BINARY, or the one bundled with imageio-ffmpeg (a moviepy dependency)."""
+    exe = os.getenv("FFMPEG_BINARY")
+    if exe and exe != "auto-detect":
+        return exe
+    try:
+        import imageio_ffmpeg
+        return imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return "ffmpeg"
+
+
+def iter_frame_batches(video_path, width, height, fps, start=None, duration=None, batch_size=FRAMES_PER_BATCH, threads=None):
+    """
+    Stream downscaled RGB frames from ffmpeg in batches.
+
+    ffmpeg decodes, resamples to a constant `fps` (dropping or duplicating
+    frames) and scales to width x height, so Python only sees small frames.
+
+    Yields:
+        uint8 arrays of shape (n, height, width, 3), n <= batch_size
+    """
+    cmd = [get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error"]
+    if threads:
+        cmd += ["-threads", str(threads)]
+    if start:
+        # Input seek: jumps to the nearest keyframe before `start` and decodes from there
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", video_path]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += [
+        "-an", "-sn",
+        "-vf", f"fps={fps},scale={width}:{height}:flags=area",
+        "-pix_fmt", "rgb24", "-f", "rawvideo", "-",
+    ]
+
+    frame_bytes = width * height * 3
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, bufsize=frame_bytes * 16)
+    try:
+        while True:
+            data = proc.stdout.read(frame_bytes * batch_size)
+            n = len(data) // frame_bytes
+            if n:
+                yield np.frombuffer(data[:n * frame_bytes], dtype=np.uint8).reshape(n, height, width, 3)
+            if n < batch_size:
+                break
+    finally:
+        proc.stdout.close()
+        stderr = proc.stderr.read().decode(errors="replace").strip()
+        proc.stderr.close()
+        returncode = proc.wait()
+    if returncode != 0:
+        raise RuntimeError(f"ffmpeg failed ({returncode}): {stderr[-500:]}")
+
+
+def hsv_frame_scores(batch, previous=None):
+    """
+    Content score between consecutive frames, vectorized over a batch.
+
+    The score is the mean absolute difference of the HSV channels averaged
+    over hue, saturation and value, the same metric as PySceneDetect's
+    ContentDetector. Its thresholds only carry over when the frames are
+    consecutive decoded frames (see compute_diff_series): a delta across
+    several frames of motion reads much higher.
+
+    Args:
+        batch: uint8 RGB frames, shape (n, h, w, 3)
+        previous: Last frame of the previous batch (or None at stream start)
+
+    Returns:
+        (scores, last_hsv): scores has one entry per frame in the batch
+        (0.0 for the very first frame of the stream)
+    """
+    n, h, w, _ = batch.shape
+    # cvtColor is per-pixel, so the whole batch converts in one call as a tall image
+    hsv = cv2.cvtColor(batch.reshape(n * h, w, 3), cv2.COLOR_RGB2HSV).reshape(n, h, w, 3).astype(np.int16)
+    if previous is not None:
+        stacked = np.concatenate([previous[None], hsv])
+    else:
+        stacked = hsv
+    deltas = np.abs(np.diff(stacked, axis=0)).mean(axis=(1, 2, 3))
+    if previous is None:
+        deltas = np.concatenate([[0.0], deltas])
+    return deltas.astype(np.float32), hsv[-1]
+
+
+def _analysis_size(info, width=None):
+    """Even-sized analysis resolution preserving the source aspect ratio."""
+    width = min(width or SCENE_DETECT_WIDTH, info['width'] or SCENE_DETECT_WIDTH)
+    width -= width % 2
+    height = max(2, int(round(width * info['height'] / info['width'] / 2)) * 2) if info['width'] else width
+    return width, height
+
+
+def sample_scores(deltas, step):
+    """
+    Reduce consecutive-frame scores to one score per sample.
+
+    Sample k is the frame at index ceil(k * step); its score is the largest
+    delta between consecutive frames since the previous sample, so a cut
+    anywhere between two samples is reported at the later one. Only samples
+    whose frame was decoded are returned (as many as ffmpeg's fps filter
+    would output); frames after the last one are dropped.
+
+    Args:
+        deltas: Score of each decoded frame against the one before it
+        step: Decoded frames per sample (>= 1)
+    """
+    if not len(deltas):
+        return np.zeros(0, dtype=np.float32)
+    num_samples = int(np.floor((len(deltas) - 1) / step + 1e-9)) + 1
+    # Frame i belongs to the first sample at or after it: floor((i - 1) / step) + 1
+    groups = (np.floor((np.arange(len(deltas)) - 1) / step + 1e-9) + 1).astype(np.int64)
+    keep = groups < num_samples
+    scores = np.zeros(num_samples, dtype=np.float32)
+    np.maximum.at(scores, groups[keep], deltas[keep])
+    return scores
+
+
+def compute_diff_series(video_path, sample_fps=None, width=None, start=None, duration=None, info=None, threads=None):
+    """
+    Decode a low-resolution frame stream once and return its frame-difference series.
+
+    Every decoded frame is scored against the one before it, so the scores
+    stay on ContentDetector's scale; the series is then reduced to
+    `sample_fps` by keeping the strongest change in each sample interval.
+
+    Args:
+        video_path: Path to the video file
+        sample_fps: Samples per second in the returned series (default SCENE_DETECT_FPS, capped at the source fps)
+        width: Analysis width in pixels (default SCENE_DETECT_WIDTH)
+        start, duration: Optional time range in seconds
+        info: Result of probe_media (probed if omitted)
+
+    Returns:
+        (times, scores) float arrays: timestamp in seconds and content score of each sample
+    """
+    info = info or probe_media(video_path)
+    sample_fps = _effective_sample_fps(info, sample_fps)
+    # ffmpeg's fps filter at the source rate turns variable-rate input into evenly spaced frames
+    decode_fps = info['fps'] if info['fps'] > 0 else sample_fps
+    width, height = _analysis_size(info, width)
+
+    deltas = []
+    previous = None
+    for batch in iter_frame_batches(video_path, width, height, decode_fps, start=start, duration=duration, threads=threads):
+        batch_deltas, previous = hsv_frame_scores(batch, previous)
+        deltas.append(batch_deltas)
+
+    deltas = np.concatenate(deltas) if deltas else np.zeros(0, dtype=np.float32)
+    scores = sample_scores(deltas, decode_fps / sample_fps)
+    times = (start or 0.0) + np.arange(len(scores), dtype=np.float64) / sample_fps
+    return times, scores
+
+
+def _chunk_series(args):
+    """Thread-pool worker: diff series of one chunk."""
+    video_path, sample_fps, start, duration, info, threads = args
+    return compute_diff_series(video_path, sample_fps=sample_fps, start=start, duration=duration, info=info, threads=threads)
+
+
+def merge_chunk_series(chunks, bounds):
+    """
+    Merge per-chunk diff series into one timeline series.
+
+    Each chunk starts CHUNK_OVERLAP_SECONDS before its range, so the first
+    sample it owns already has a real predecessor frame. Only the samples
+    inside the chunk's own [start, end) range are kept, which removes the
+    overlap zones (and any cut detected twice there) before cuts are derived.
+
+    Args:
+        chunks: List of (times, scores) per chunk, in timeline order
+        bounds: List of (start, end) ranges owned by each chunk
+
+    Returns:
+        (times, scores) for the whole timeline
+    """
+    times, scores = [], []
+    for (chunk_times, chunk_scores), (start, end) in zip(chunks, bounds):
+        # The epsilon absorbs float drift in the sample timestamps
+        keep = (chunk_times >= start - 1e-6) & (chunk_times < end - 1e-6)
+        times.append(chunk_times[keep])
+        scores.append(chunk_scores[keep])
+    if not times:
+        return np.zeros(0), np.zeros(0, dtype=np.float32)
+    return np.concatenate(times), np.concatenate(scores)
+
+
+def compute_diff_series_parallel(video_path, workers=None, sample_fps=None, info=None):
+    """
+    Compute the diff series with the timeline split into chunks decoded in parallel.
+
+    Each worker seeks to its chunk (keyframe seek + decode to the exact time)
+    and runs its own ffmpeg, so long videos use several cores. Workers are
+    threads rather than processes: decoding happens in the ffmpeg subprocesses
+    and the numpy/OpenCV scoring releases the GIL, while forking the API
+    process (with its server, scheduler and pool threads) could deadlock.
+    Chunk starts are aligned to the sampling grid, so the merged series
+    matches a single pass.
+
+    Returns:
+        (times, scores) like compute_diff_series
+    """
+    info = info or probe_media(video_path)
+    workers = max(1, workers or SCENE_DETECT_WORKERS)
+    sample_fps = _effective_sample_fps(info, sample_fps)
+    duration = info['duration']
+    if workers == 1 or not duration:
+        return compute_diff_series(video_path, sample_fps=sample_fps, info=info)
+
+    # Chunk boundaries on the sample grid (multiples of 1/sample_fps)
+    step = np.ceil(duration / workers * sample_fps) / sample_fps
+    starts = [i * step for i in range(workers) if i * step < duration]
+    bounds = [(s, starts[i + 1] if i + 1 < len(starts) else float('inf')) for i, s in enumerate(starts)]
+    threads = max(1, (os.cpu_count() or 1) // len(bounds))
+
+    jobs = []
+    for start, end in bounds:
+        read_start = max(0.0, start - CHUNK_OVERLAP_SECONDS)
+        # Align the read start to the grid so sample times line up with the single-pass series
+        read_start = np.floor(read_start * sample_fps) / sample_fps
+        read_duration = None if end == float('inf') else end - read_start
+        jobs.append((video_path, sample_fps, read_start, read_duration, info, threads))
+
+    print(f"  Detecting scenes in {len(jobs)} parallel chunks of {step:.0f}s")
+    with ThreadPoolExecutor(max_workers=len(jobs), thread_name_prefix="scene-chunk") as executor:
+        chunks = list(executor.map(_chunk_series, jobs))
+    return merge_chunk_series(chunks, bounds)
+
+
+def detect_cuts(times, scores, threshold, min_scene_len):
+    """
+    Cut times where the score reaches `threshold`, at least `min_scene_len` seconds apart.
+
+    Mirrors ContentDetector: a candidate closer than min_scene_len to the previous
+    cut (or the start of the video) is ignored.
+    """
+    cuts = []
+    last_cut = times[0] if len(times) else 0.0
+    for i in np.flatnonzero(scores >= threshold):
+        t = float(times[i])
+        if t - last_cut >= min_scene_len:
+            cuts.append(t)
+            last_cut = t
+    return cuts
+
+
+def threshold_for_target(times, scores, target_scenes, min_scene_len):
+    """
+    Lowest threshold that yields at most target_scenes scenes from a diff series.
+
+    Deriving cuts from a series is O(n), so a binary search over the threshold
+    is instant compared to decoding the video again.
+    """
+    lo, hi = 0.0, (float(scores.max()) + 1.0 if len(scores) else 1.0)
+    for _ in range(40):
+        mid = (lo + hi) / 2
+        if len(detect_cuts(times, scores, mid, min_scene_len)) + 1 > target_scenes:
+            lo = mid
+        else:
+            hi = mid
+    return hi
+
+
+def _effective_sample_fps(info, sample_fps=None):
+    sample_fps = sample_fps or SCENE_DETECT_FPS
+    return min(sample_fps, info['fps']) if info['fps'] > 0 else sample_fps
+
+
+def _series_cache_path(video_path, sample_fps, width):
+    """Cache file for a video's diff series, keyed by path, mtime, size and analysis settings."""
+    cache_dir = os.getenv("SCENE_DIFF_CACHE_DIR", os.path.join(os.getenv("ZIPCLIP_CACHE_DIR", "cache"), "scene_diffs"))
+    if not cache_dir:
+        return None
+    st = os.stat(video_path)
+    key = f"{os.path.abspath(video_path)}|{st.st_mtime_ns}|{st.st_size}|{sample_fps:.3f}|{width}|{DIFF_SERIES_VERSION}"
+    return os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".npz")
+
+
+def load_diff_series(video_path, info=None):
+    """
+    Frame-difference series of a video, decoded once and then served from disk.
+
+    The series is stored under SCENE_DIFF_CACHE_DIR (default
+    <ZIPCLIP_CACHE_DIR>/scene_diffs; empty disables persistence), so cuts for
+    any other threshold, minimum scene length or target scene count are
+    derived without decoding the video again.
+
+    Returns:
+        (times, scores) like compute_diff_series
+    """
+    info = info or probe_media(video_path)
+    sample_fps = _effective_sample_fps(info)
+    path = _series_cache_path(video_path, sample_fps, _analysis_size(info)[0])
+    if path and os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                print("  Using cached frame-difference series")
+                return data['times'], data['scores']
+        except Exception as e:
+            print(f"  Warning: Could not read cached diff series ({e})")
+
+    if SCENE_DETECT_WORKERS > 1 and info['duration'] >= SCENE_DETECT_PARALLEL_MIN_SECONDS:
+        times, scores = compute_diff_series_parallel(video_path, sample_fps=sample_fps, info=info)
+    else:
+        times, scores = compute_diff_series(video_path, sample_fps=sample_fps, info=info)
+
+    if path:
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path[:-len(".npz")] + ".tmp.npz"
+            np.savez(tmp_path, times=times, scores=scores)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"  Warning: Could not cache diff series ({e})")
+    return times, scores
+
+
+def scenes_from_cuts(cuts, duration):
+    """Turn cut times into [(start, end), ...]; no cuts gives an empty list like PySceneDetect's detect()."""
+    if not cuts:
+        return []
+    bounds = [0.0] + [c for c in cuts if 0.0 < c < duration] + [duration]
+    return [(bounds[i], bounds[i + 1]) for i in range(len(bounds) - 1)]
+
+
+def fast_detect_scenes(video_path, threshold, min_scene_len, info=None, target_scenes=None):
+    """
+    Detect scenes from a downscaled ffmpeg frame stream.
+
+    Videos of SCENE_DETECT_PARALLEL_MIN_SECONDS or more are split into
+    SCENE_DETECT_WORKERS chunks analyzed in parallel. The diff series
+    is cached (see load_diff_series), so re-running with other settings is instant.
+
+    Args:
+        video_path: Path to the video file
+        threshold: ContentDetector-compatible threshold
+        min_scene_len: Minimum scene length in seconds
+        info: Result of probe_media (probed if omitted)
+        target_scenes: If set, the threshold is calibrated to give at most this many scenes
+
+    Returns:
+        List of (start_time, end_time) tuples in seconds
+    """
+    info = info or probe_media(video_path)
+    times, scores = load_diff_series(video_path, info=info)
+    if target_scenes:
+        threshold = threshold_for_target(times, scores, target_scenes, min_scene_len)
+        print(f"  Calibrated threshold {threshold:.2f} for a target of {target_scenes} scenes")
+    duration = info['duration'] or (float(times[-1]) if len(times) else 0.0)
+    return scenes_from_cuts(detect_cuts(times, scores, threshold, min_scene_len), duration)
+
+
+def read_packet_index(video_path):
+    """
+    Read per-packet metadata of the first video stream without decoding pixels.
+
+    Returns:
+        (times, sizes, keyframes, fps): presentation times in seconds, packet sizes
+        in bytes and keyframe flags (sorted by time), plus the stream frame rate
+    """
+    import av
+
+    times, sizes, keyframes = [], [], []
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        fps = float(stream.average_rate or stream.guessed_rate or 0)
+        for packet in container.demux(stream):
+            if packet.pts is None or not packet.size:
+                continue
+            times.append(float(packet.pts * stream.time_base))
+            sizes.append(packet.size)
+            keyframes.append(packet.is_keyframe)
+
+    order = np.argsort(times, kind='stable')
+    return np.asarray(times)[order], np.asarray(sizes, dtype=np.float64)[order], np.asarray(keyframes, dtype=bool)[order], fps
+
+
+def propose_packet_cuts(times, sizes, keyframes, fps):
+    """
+    Candidate cut times from packet metadata.
+
+    Candidates are keyframes after the first one (encoders insert keyframes at
+    scene cuts) and non-keyframe packets much larger than the median packet
+    within PROBE_WINDOW_SECONDS around them (a new scene the encoder coded as
+    a large predicted frame).
+    """
+    if len(times) < 2:
+        return []
+    window = max(3, int(round((fps or 30.0) * PROBE_WINDOW_SECONDS)) | 1)
+    padded = np.pad(sizes, window // 2, mode='edge')
+    rolling_median = np.median(np.lib.stride_tricks.sliding_window_view(padded, window), axis=1)
+    ratio = sizes / np.maximum(rolling_median, 1.0)
+
+    spikes = (~keyframes) & (ratio >= PROBE_SPIKE_RATIO)
+    candidates = np.flatnonzero(keyframes | spikes)
+    candidates = candidates[candidates > 0]
+    if len(candidates) > PROBE_MAX_CANDIDATES:
+        # Keep the strongest spikes; keyframes rank by the same size ratio
+        candidates = np.sort(candidates[np.argsort(-ratio[candidates])[:PROBE_MAX_CANDIDATES]])
+    return [float(times[i]) for i in candidates]
+
+
+def _keyframe_scores(container, stream, width, height, keep_times=(), keep_threshold=0.0):
+    """
+    Content score between consecutive keyframes, decoding keyframes only.
+
+    Returns:
+        (key_times, scores, kept): kept maps the index of each keyframe at one
+        of keep_times scoring at least keep_threshold to its analysis-size RGB
+        frame, for reuse in verification (at most PROBE_MAX_VERIFY + 1 are kept)
+    """
+    stream.codec_context.skip_frame = "NONKEY"
+    keep_times = np.sort(np.asarray(keep_times, dtype=np.float64))
+    key_times, scores, kept = [], [], {}
+    previous = None
+    for frame in container.decode(stream):
+        if frame.time is None:
+            continue
+        rgb = frame.to_ndarray(format='rgb24', width=width, height=height)
+        batch_scores, previous = hsv_frame_scores(rgb[None], previous)
+        if len(keep_times) and batch_scores[0] >= keep_threshold and len(kept) <= PROBE_MAX_VERIFY:
+            j = int(np.searchsorted(keep_times, frame.time))
+            if any(abs(keep_times[k] - frame.time) < 1e-3 for k in (j - 1, j) if 0 <= k < len(keep_times)):
+                kept[len(key_times)] = rgb
+        key_times.append(frame.time)
+        scores.append(float(batch_scores[0]))
+    stream.codec_context.skip_frame = "DEFAULT"
+    return np.asarray(key_times), np.asarray(scores), kept
+
+
+def _decode_frame_before(container, stream, t, frame_interval, width, height):
+    """Decode the last frame before t (seeking to the keyframe that precedes it)."""
+    target = max(0.0, t - frame_interval * 1.5)
+    container.seek(int(target / stream.time_base), stream=stream, backward=True)
+    previous = None
+    for frame in container.decode(stream):
+        if frame.time is None:
+            continue
+        if frame.time >= t - frame_interval / 2:
+            break
+        previous = frame
+        if frame.time >= t - frame_interval * 1.5:
+            # This is the frame just before t; no need to decode t itself
+            break
+    return previous.to_ndarray(format='rgb24', width=width, height=height) if previous is not None else None
+
+
+def _decode_frame_pair(container, stream, t, frame_interval, width, height):
+    """Decode the frame at t and the frame just before it (seeking to the preceding keyframe)."""
+    target = max(0.0, t - frame_interval * 1.5)
+    container.seek(int(target / stream.time_base), stream=stream, backward=True)
+    previous = None
+    for frame in container.decode(stream):
+        if frame.time is None:
+            continue
+        if frame.time < t - frame_interval / 2:
+            previous = frame
+            continue
+        if previous is None:
+            return None
+        return np.stack([
+            previous.to_ndarray(format='rgb24', width=width, height=height),
+            frame.to_ndarray(format='rgb24', width=width, height=height),
+        ])
+    return None
+
+
+def verification_cost(times, keyframes, candidates):
+    """
+    Frames decoded to verify candidate cuts by seeking.
+
+    Each candidate decodes from the keyframe preceding the frame before it up
+    to the candidate; a keyframe candidate stops at the frame before it (the
+    keyframe itself is reused from the keyframe pass).
+    """
+    key_positions = np.flatnonzero(keyframes)
+    if not len(key_positions):
+        return len(candidates) * len(times)
+    total = 0
+    for t in candidates:
+        i = min(int(np.searchsorted(times, t - 1e-6)), len(times) - 1)
+        k = key_positions[max(0, int(np.searchsorted(key_positions, i - 1, side='right')) - 1)]
+        total += max(1, i - k + (0 if keyframes[i] else 1))
+    return total
+
+
+def probe_detect_scenes(video_path, threshold, min_scene_len, info=None):
+    """
+    Scene detection from packet metadata, verified on decoded frame pairs.
+
+    1. Packet sizes and keyframe flags propose candidate cuts (no decoding).
+    2. Keyframes alone are decoded and candidates whose surrounding
+       keyframes look alike are dropped.
+    3. Each remaining candidate is verified by decoding the frame pair around
+       it (a seek plus up to a GOP of frames; keyframe candidates reuse their
+       keyframe from step 2) and scoring it with the ContentDetector metric.
+
+    This pays off for long GOPs and few candidates. When step 3 would decode
+    more frames than a full pass (keyframes + candidates x GOP vs the frame
+    count) or more than PROBE_MAX_VERIFY candidates remain, the fast detector
+    is used instead.
+
+    Args:
+        video_path: Path to the video file
+        threshold: ContentDetector-compatible threshold
+        min_scene_len: Minimum scene length in seconds
+        info: Result of probe_media (probed if omitted)
+
+    Returns:
+        List of (start_time, end_time) tuples in seconds
+    """
+    import av
+
+    info = info or probe_media(video_path)
+    times, sizes, keyframes, fps = read_packet_index(video_path)
+    fps = fps or info['fps'] or 30.0
+    candidates = propose_packet_cuts(times, sizes, keyframes, fps)
+    width, height = _analysis_size(info)
+    is_keyframe = {float(t) for t in times[keyframes]}
+
+    with av.open(video_path) as container:
+        stream = container.streams.video[0]
+        stream.thread_type = "AUTO"
+
+        # Prefilter: a cut between two keyframes makes them differ at least as much as the cut itself
+        key_times, key_scores, key_frames = _keyframe_scores(
+            container, stream, width, height, keep_times=[t for t in candidates if t in is_keyframe], keep_threshold=threshold)
+        if len(key_times) > 1:
+            filtered = []
+            for t in candidates:
+                # Score of the first keyframe at or after t against the keyframe before it
+                k = int(np.searchsorted(key_times, t - 1e-6))
+                if k >= len(key_times) or key_scores[k] >= threshold:
+                    filtered.append(t)
+            print(f"  Probe: {len(candidates)} packet candidates, {len(filtered)} after keyframe prefilter")
+            candidates = filtered
+
+        cost = len(key_times) + verification_cost(times, keyframes, candidates)
+        if len(candidates) > PROBE_MAX_VERIFY or cost >= len(times):
+            print(f"  Probe: verifying {len(candidates)} candidates would decode ~{cost} of {len(times)} frames, "
+                  f"using the fast detector")
+            return fast_detect_scenes(video_path, threshold, min_scene_len, info=info)
+
+        verified_times, verified_scores = [], []
+        for t in candidates:
+            k = int(np.searchsorted(key_times, t - 1e-6))
+            if k in key_frames and abs(key_times[k] - t) < 1e-3:
+                previous = _decode_frame_before(container, stream, t, 1.0 / fps, width, height)
+                pair = np.stack([previous, key_frames[k]]) if previous is not None else None
+            else:
+                pair = _decode_frame_pair(container, stream, t, 1.0 / fps, width, height)
+            if pair is None:
+                continue
+            verified_times.append(t)
+            verified_scores.append(float(hsv_frame_scores(pair)[0][1]))
+
+    duration = info['duration'] or (float(times[-1]) if len(times) else 0.0)
+    cuts = detect_cuts(np.asarray([0.0] + verified_times), np.asarray([0.0] + verified_scores), threshold, min_scene_len)
+    return scenes_from_cuts(cuts, duration)
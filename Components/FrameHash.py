@@ -0,0 +1,203 @@
+import cv2
+import numpy as np
+import json
+import os
+import threading
+
+# Hamming distance (out of 64 bits) under which two frames count as near-duplicates
+DEFAULT_MAX_DISTANCE = 6
+# Hashes with fewer set (or unset) bits than this come from flat frames (black, blank, fades)
+# that unrelated videos share, so they are never exchanged through the persistent store
+MIN_INFORMATIVE_BITS = 8
+
+
+def dhash(frame, hash_size=8):
+    """
+    Compute a 64-bit difference hash (dHash) of a decoded frame.
+
+    The frame is reduced to a (hash_size+1) x hash_size grayscale thumbnail and
+    each bit records whether a pixel is brighter than its right-hand neighbour.
+    Small re-encodes, noise and scaling leave the hash (nearly) unchanged.
+
+    Args:
+        frame: HxW or HxWx3 uint8 array
+        hash_size: Bits per row/column (default 8 -> 64-bit hash)
+
+    Returns:
+        Hash as a Python int
+    """
+    if frame.ndim == 3:
+        frame = cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+    small = cv2.resize(frame, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def dhash_file(image_path):
+    """Compute the dHash of an image file, or None if it cannot be read."""
+    frame = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE)
+    if frame is None:
+        return None
+    return dhash(frame)
+
+
+def is_informative(frame_hash):
+    """True if a hash carries enough structure to identify a frame across videos."""
+    ones = bin(frame_hash).count("1")
+    return MIN_INFORMATIVE_BITS <= ones <= 64 - MIN_INFORMATIVE_BITS
+
+
+def hamming_distances(hashes, query):
+    """
+    Vectorized Hamming distance between one hash and an array of hashes.
+
+    Args:
+        hashes: np.ndarray of dtype uint64
+        query: Hash as a Python int
+
+    Returns:
+        np.ndarray of distances (0-64)
+    """
+    if len(hashes) == 0:
+        return np.zeros(0, dtype=np.int64)
+    xor = np.bitwise_xor(hashes, np.uint64(query))
+    return np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+
+
+class DescriptionStore:
+    """
+    Persistent perceptual-hash -> description index.
+
+    Lookups are a single vectorized Hamming scan over all stored hashes, so a
+    store with tens of thousands of entries answers in well under a millisecond.
+    The store is shared across jobs and persisted as JSON at `path`
+    (set path=None for an in-memory store). Because entries come from other
+    users' uploads, cross-job lookups should use max_distance=0 (exact match).
+    """
+
+    def __init__(self, path=None, max_entries=50000):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._descriptions = {}
+        self._hashes = np.zeros(0, dtype=np.uint64)
+        self._keys = []
+        self._pending_keys = []  # added since the numpy index was last built
+        self._index_stale = False  # set when entries were replaced or evicted
+        self._dirty = False
+        if path and os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                self._descriptions = {int(k, 16): v for k, v in data.items()}
+                self._rebuild_index()
+                print(f"Loaded {len(self._descriptions)} cached frame descriptions from {path}")
+            except Exception as e:
+                print(f"Warning: Could not load description cache {path}: {e}")
+
+    def _rebuild_index(self):
+        self._keys = list(self._descriptions.keys())
+        self._hashes = np.array(self._keys, dtype=np.uint64)
+        self._pending_keys = []
+        self._index_stale = False
+
+    def _refresh_index(self):
+        """Bring the numpy index up to date on lookup (appends are batched, removals rebuild)."""
+        if self._index_stale:
+            self._rebuild_index()
+        elif self._pending_keys:
+            self._keys.extend(self._pending_keys)
+            self._hashes = np.concatenate([self._hashes, np.array(self._pending_keys, dtype=np.uint64)])
+            self._pending_keys = []
+
+    def __len__(self):
+        return len(self._descriptions)
+
+    def lookup(self, frame_hash, max_distance=DEFAULT_MAX_DISTANCE):
+        """Return the description of the closest stored hash within max_distance, or None."""
+        with self._lock:
+            if frame_hash in self._descriptions:
+                return self._descriptions[frame_hash]
+            if max_distance <= 0:
+                return None
+            self._refresh_index()
+            distances = hamming_distances(self._hashes, frame_hash)
+            if len(distances) == 0:
+                return None
+            best = int(np.argmin(distances))
+            if distances[best] <= max_distance:
+                return self._descriptions[self._keys[best]]
+            return None
+
+    def add(self, frame_hash, description):
+        with self._lock:
+            if self._descriptions.pop(frame_hash, None) is not None:
+                self._index_stale = True  # re-inserted at the end; its index position moves
+            else:
+                self._pending_keys.append(frame_hash)
+            self._descriptions[frame_hash] = description
+            # Drop the oldest entries once the store is full
+            while len(self._descriptions) > self.max_entries:
+                self._descriptions.pop(next(iter(self._descriptions)))
+                self._index_stale = True
+            self._dirty = True
+
+    def save(self):
+        """Persist the store (atomic replace, so concurrent readers never see a partial file)."""
+        with self._lock:
+            if not self.path or not self._dirty:
+                return
+            data = {f"{k:016x}": v for k, v in self._descriptions.items()}
+            self._dirty = False
+        try:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Warning: Could not save description cache {self.path}: {e}")
+
+
+def group_near_duplicates(hashes, max_distance=DEFAULT_MAX_DISTANCE):
+    """
+    Greedily group near-duplicate hashes within one job.
+
+    Args:
+        hashes: List of hashes (None entries are left ungrouped)
+        max_distance: Maximum Hamming distance to join an existing group
+
+    Returns:
+        List mapping each index to the index of its group representative
+        (None for None hashes)
+    """
+    representatives = []
+    rep_hashes = []
+    mapping = []
+    for i, h in enumerate(hashes):
+        if h is None:
+            mapping.append(None)
+            continue
+        distances = hamming_distances(np.array(rep_hashes, dtype=np.uint64), h)
+        if len(distances) and distances.min() <= max_distance:
+            mapping.append(representatives[int(np.argmin(distances))])
+        else:
+            representatives.append(i)
+            rep_hashes.append(h)
+            mapping.append(i)
+    return mapping
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_description_store():
+    """Process-wide description store (path from VISION_CACHE_PATH; empty disables persistence)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            cache_dir = os.getenv("ZIPCLIP_CACHE_DIR", "cache")
+            path = os.getenv("VISION_CACHE_PATH", os.path.join(cache_dir, "vision_descriptions.json"))
+            _store = DescriptionStore(path or None)
+        return _store
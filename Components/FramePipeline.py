@@ -0,0 +1,82 @@
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Transform threads for per-frame work (OpenCV releases the GIL, so these run on separate cores)
+PIPELINE_WORKERS = int(os.getenv("FRAME_PIPELINE_WORKERS", str(min(4, os.cpu_count() or 1))))
+
+_DONE = object()
+
+
+def run_frame_pipeline(frames, transform, sink, workers=None, max_in_flight=None):
+    """
+    Run decode -> transform -> sink as a pipeline with bounded queues.
+
+    A decoder thread pulls frames from the iterable and submits
+    transform(index, frame) to a pool of worker threads; the calling thread
+    consumes the results strictly in frame order and passes them to
+    sink(index, result) (the encoder stage). At most max_in_flight frames are
+    decoded ahead of the sink, so memory stays bounded when one stage is slow.
+
+    transform must not depend on other frames; state that has to advance
+    frame by frame (smoothing, trackers) belongs in sink.
+
+    Args:
+        frames: Iterable of frames (e.g. a generator over cap.read())
+        transform: Callable (index, frame) -> result, run on the worker pool
+        sink: Callable (index, result), called in order; returning False stops the pipeline
+        workers: Transform threads (default FRAME_PIPELINE_WORKERS)
+        max_in_flight: Frames decoded but not yet consumed (default 2 per worker)
+
+    Returns:
+        Number of frames passed to sink
+    """
+    workers = max(1, workers or PIPELINE_WORKERS)
+    pending = queue.Queue(maxsize=max_in_flight or workers * 2)
+    stop = threading.Event()
+
+    def put(item):
+        # Blocks while the queue is full, but gives up once the consumer has stopped
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def decode(executor):
+        try:
+            for index, frame in enumerate(frames):
+                if stop.is_set() or not put(executor.submit(transform, index, frame)):
+                    break
+        except BaseException as e:
+            put(e)
+        finally:
+            put(_DONE)
+
+    count = 0
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="frame-transform")
+    decoder = threading.Thread(target=decode, args=(executor,), name="frame-decoder", daemon=True)
+    decoder.start()
+    try:
+        while True:
+            item = pending.get()
+            if item is _DONE:
+                break
+            if isinstance(item, BaseException):
+                raise item
+            if sink(count, item.result()) is False:
+                break
+            count += 1
+    finally:
+        stop.set()
+        # Unblock the decoder if it is waiting on a full queue, then wait for it
+        while decoder.is_alive():
+            try:
+                pending.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        executor.shutdown(wait=True, cancel_futures=True)
+    return count
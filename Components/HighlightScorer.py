@@ -0,0 +1,251 @@
+"""
+Local, CPU-only highlight scoring.
+
+Ranks transcript windows with cheap vectorized features so that either
+only the most promising windows are sent to the LLM (prefilter), or a
+highlight is picked without any network call at all (local fallback).
+"""
+
+import numpy as np
+import re
+import wave
+
+STOPWORDS = set("""
+a an the and or but if then so of to in on at by for with from as is are was were be been being
+it its this that these those i you he she we they me him her us them my your our their
+do does did done have has had not no yes just very really like um uh yeah okay ok oh
+what which who whom when where why how all any some more most other such only own same than too
+can will would should could there here about into over after before again also out up down off
+""".split())
+
+# Relative weight of each (z-scored) feature in the final window score
+FEATURE_WEIGHTS = {
+    'speech_rate': 0.20,
+    'loudness': 0.20,
+    'salience': 0.30,
+    'completeness': 0.15,
+    'punctuation': 0.15,
+}
+
+_TOKEN_RE = re.compile(r"[a-z][a-z']+")
+
+
+def _segment_word_counts(transcriptions):
+    counts = []
+    for seg in transcriptions:
+        words = seg.get('words') or []
+        counts.append(len(words) if words else len(seg['text'].split()))
+    return np.array(counts, dtype=np.float64)
+
+
+def _segment_salience(transcriptions):
+    """Mean TF-IDF weight of each segment's content words (segments are the documents)."""
+    docs = [[t for t in _TOKEN_RE.findall(seg['text'].lower()) if t not in STOPWORDS] for seg in transcriptions]
+    vocab = {}
+    for doc in docs:
+        for token in doc:
+            vocab.setdefault(token, len(vocab))
+    if not vocab:
+        return np.zeros(len(docs))
+
+    tf = np.zeros((len(docs), len(vocab)), dtype=np.float32)
+    for i, doc in enumerate(docs):
+        for token in doc:
+            tf[i, vocab[token]] += 1
+
+    df = np.count_nonzero(tf, axis=0)
+    idf = np.log((1 + len(docs)) / (1 + df)) + 1.0
+    lengths = np.maximum(tf.sum(axis=1), 1)
+    return (tf * idf).sum(axis=1) / lengths
+
+
+def _loudness_series(audio_path, hop_seconds=0.5):
+    """RMS loudness of a 16-bit PCM wav file in hop_seconds frames."""
+    with wave.open(audio_path, 'rb') as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        if wf.getsampwidth() != 2:
+            raise ValueError("Only 16-bit PCM audio is supported for loudness scoring")
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples[: len(samples) // channels * channels].reshape(-1, channels).mean(axis=1)
+    hop = max(1, int(sample_rate * hop_seconds))
+    n = len(samples) // hop
+    if n == 0:
+        return np.zeros(0), hop_seconds
+    frames = samples[: n * hop].astype(np.float32).reshape(n, hop)
+    return np.sqrt(np.mean(frames ** 2, axis=1)), hop_seconds
+
+
+def _zscore(x):
+    std = x.std()
+    return (x - x.mean()) / std if std > 1e-9 else np.zeros_like(x)
+
+
+def score_windows(transcriptions, window_seconds=120.0, audio_path=None):
+    """
+    Score every transcript window that starts on a segment boundary.
+
+    A window starting at segment i runs until the first segment whose end
+    reaches start_i + window_seconds. All per-window features are computed
+    from prefix sums, so scoring is O(n) in the number of segments.
+
+    Args:
+        transcriptions: List of dicts with 'text', 'start', 'end' (and optional 'words')
+        window_seconds: Target window length in seconds
+        audio_path: Optional wav file used for loudness peaks
+
+    Returns:
+        List of window dicts sorted by start time:
+        {'start', 'end', 'score', 'first_segment', 'last_segment', 'features'}
+    """
+    if not transcriptions:
+        return []
+
+    starts = np.array([seg['start'] for seg in transcriptions], dtype=np.float64)
+    ends = np.array([seg['end'] for seg in transcriptions], dtype=np.float64)
+    texts = [seg['text'].strip() for seg in transcriptions]
+    n = len(transcriptions)
+
+    first = np.arange(n)
+    last = np.minimum(np.searchsorted(ends, starts + window_seconds), n - 1)
+    win_start = starts[first]
+    win_end = ends[last]
+    win_len = np.maximum(win_end - win_start, 1e-3)
+
+    def window_sum(values):
+        prefix = np.concatenate([[0.0], np.cumsum(values)])
+        return prefix[last + 1] - prefix[first]
+
+    seg_count = (last - first + 1).astype(np.float64)
+
+    # Speech rate (words per second)
+    speech_rate = window_sum(_segment_word_counts(transcriptions)) / win_len
+
+    # Keyword / TF-IDF salience
+    salience = window_sum(_segment_salience(transcriptions)) / seg_count
+
+    # Sentence completeness: starts after a sentence end and ends on one
+    ends_sentence = np.array([t.endswith(('.', '?', '!')) for t in texts], dtype=np.float64)
+    starts_sentence = np.concatenate([[1.0], ends_sentence[:-1]])
+    completeness = 0.5 * starts_sentence[first] + 0.5 * ends_sentence[last]
+
+    # Question / exclamation density (per segment)
+    punctuation = window_sum(np.array([t.count('?') + t.count('!') for t in texts], dtype=np.float64)) / seg_count
+
+    # Loudness peaks: share of the window spent above the 90th loudness percentile
+    loudness = np.zeros(n)
+    if audio_path:
+        try:
+            rms, hop = _loudness_series(audio_path)
+            if len(rms):
+                peaks = np.concatenate([[0.0], np.cumsum(rms > np.percentile(rms, 90))])
+                lo = np.clip((win_start / hop).astype(int), 0, len(rms))
+                hi = np.clip((win_end / hop).astype(int), 0, len(rms))
+                loudness = (peaks[hi] - peaks[lo]) / np.maximum(hi - lo, 1)
+        except Exception as e:
+            print(f"  Warning: Could not compute loudness features: {e}")
+
+    features = {
+        'speech_rate': speech_rate,
+        'loudness': loudness,
+        'salience': salience,
+        'completeness': completeness,
+        'punctuation': punctuation,
+    }
+    score = sum(FEATURE_WEIGHTS[name] * _zscore(values) for name, values in features.items())
+
+    # Windows that could not reach the target length (end of video) are penalised
+    score = score - np.clip(1.0 - win_len / window_seconds, 0, 1)
+
+    return [
+        {
+            'start': float(win_start[i]),
+            'end': float(win_end[i]),
+            'score': float(score[i]),
+            'first_segment': int(first[i]),
+            'last_segment': int(last[i]),
+            'features': {name: float(values[i]) for name, values in features.items()},
+        }
+        for i in range(n)
+    ]
+
+
+def select_top_windows(windows, top_k):
+    """
+    Pick up to top_k highest-scoring, mutually non-overlapping windows.
+
+    Returns:
+        Selected windows sorted by start time
+    """
+    selected = []
+    for window in sorted(windows, key=lambda w: w['score'], reverse=True):
+        if len(selected) >= top_k:
+            break
+        if all(window['end'] <= s['start'] or window['start'] >= s['end'] for s in selected):
+            selected.append(window)
+    return sorted(selected, key=lambda w: w['start'])
+
+
+def build_prefiltered_transcript(transcriptions, windows):
+    """
+    Build the timestamped transcription text for only the given windows.
+
+    Uses the same "start - end: text" line format as the full transcript,
+    with a "[...]" line wherever segments were skipped between windows; the
+    highlight prompts tell the LLM that excerpts separated this way are not
+    contiguous.
+    """
+    text = ""
+    for i, window in enumerate(windows):
+        if i and window['first_segment'] > windows[i - 1]['last_segment'] + 1:
+            text += "[...]\n"
+        for seg in transcriptions[window['first_segment']:window['last_segment'] + 1]:
+            text += f"{seg['start']} - {seg['end']}: {seg['text']}\n"
+    return text
+
+
+def local_highlight(transcriptions, target_duration=120, audio_path=None):
+    """
+    Zero-network replacement for GetHighlight.
+
+    Returns:
+        (start, end) of the best-scoring window, or (None, None) if there is no transcript
+    """
+    windows = score_windows(transcriptions, target_duration, audio_path)
+    if not windows:
+        return None, None
+    best = max(windows, key=lambda w: w['score'])
+    print(f"Local highlight: {best['start']:.2f}s - {best['end']:.2f}s (score {best['score']:.2f})")
+    return best['start'], best['end']
+
+
+def local_multi_segment(transcriptions, target_duration=120, segment_seconds=20.0, audio_path=None):
+    """
+    Zero-network replacement for GetHighlightMultiSegment.
+
+    Returns:
+        List of segment dicts ('start', 'end', 'content') in timeline order, or None
+    """
+    windows = score_windows(transcriptions, segment_seconds, audio_path)
+    if not windows:
+        return None
+    max_segments = max(1, int(np.ceil(target_duration / segment_seconds)))
+    selected = []
+    total = 0.0
+    for window in sorted(windows, key=lambda w: w['score'], reverse=True):
+        if total >= target_duration or len(selected) >= max_segments:
+            break
+        if all(window['end'] <= s['start'] or window['start'] >= s['end'] for s in selected):
+            selected.append(window)
+            total += window['end'] - window['start']
+
+    segments = []
+    for window in sorted(selected, key=lambda w: w['start']):
+        segments.append({
+            'start': window['start'],
+            'end': window['end'],
+            'content': f"Locally scored highlight (score {window['score']:.2f})"
+        })
+    print(f"Local multi-segment selection: {len(segments)} segments, {total:.2f}s total")
+    return segments
@@ -0,0 +1,163 @@
+from bisect import bisect_right
+import os
+
+# Without a keyframe index, targets further apart than this are reached with a seek instead of decoding through the gap
+SEEK_GAP_SECONDS = float(os.getenv("KEYFRAME_SEEK_GAP_SECONDS", "8"))
+
+
+def _scaled_size(width, height, max_edge):
+    if max_edge and max(width, height) > max_edge:
+        scale = max_edge / max(width, height)
+        return max(2, int(width * scale)) // 2 * 2, max(2, int(height * scale)) // 2 * 2
+    return width, height
+
+
+class FrameReader:
+    """
+    Random-access video frame reader backed by the persisted keyframe index.
+
+    Each read seeks only when a keyframe lies between the current decode
+    position and the target (or when going backwards), landing on the
+    keyframe at or before the target and decoding forward from there.
+    Reads at increasing times therefore decode each frame at most once, and
+    the keyframe index (Components.MediaProbe.get_keyframe_index) is built
+    once per file and cached with the media probe.
+
+    Usage:
+        with FrameReader(path, max_edge=640) as reader:
+            frames = reader.read_many([1.0, 12.5, 3.2])
+    """
+
+    def __init__(self, video_path, max_edge=0, pix_fmt='rgb24'):
+        import av
+        from Components.MediaProbe import get_keyframe_index
+
+        self.video_path = video_path
+        self.pix_fmt = pix_fmt
+        try:
+            self.keyframes = get_keyframe_index(video_path)
+        except Exception as e:
+            print(f"  Warning: No keyframe index for {os.path.basename(video_path)} ({e})")
+            self.keyframes = None
+
+        self.container = av.open(video_path)
+        self.stream = self.container.streams.video[0]
+        self.stream.thread_type = "AUTO"
+        fps = float(self.stream.average_rate or self.stream.guessed_rate or 30)
+        self.half_interval = 0.5 / fps
+        self.width, self.height = _scaled_size(self.stream.codec_context.width, self.stream.codec_context.height, max_edge)
+
+        self._decoder = None
+        self._last = None  # last decoded frame
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.container.close()
+
+    def _needs_seek(self, t):
+        if self._decoder is None or self._last is None:
+            return True
+        position = self._last.time
+        if t < position - self.half_interval:
+            return True
+        if self.keyframes:
+            # Seek when decoding from a later keyframe skips part of the gap
+            k = bisect_right(self.keyframes, t + self.half_interval) - 1
+            return k >= 0 and self.keyframes[k] > position + self.half_interval
+        return t - position > SEEK_GAP_SECONDS
+
+    def _convert(self, frame):
+        return frame.to_ndarray(format=self.pix_fmt, width=self.width, height=self.height, interpolation='AREA')
+
+    def read(self, t):
+        """
+        Frame at time t (the first frame whose display interval reaches t).
+
+        Returns:
+            uint8 array (height, width, 3), the last frame for t past the end, or None
+        """
+        if self._needs_seek(t):
+            self.container.seek(int(max(0.0, t) / self.stream.time_base), stream=self.stream, backward=True)
+            self._decoder = self.container.decode(self.stream)
+            self._last = None
+        elif self._last.time + self.half_interval >= t:
+            return self._convert(self._last)
+
+        if self._decoder is not None:
+            for frame in self._decoder:
+                if frame.time is None:
+                    continue
+                self._last = frame
+                if frame.time + self.half_interval >= t:
+                    return self._convert(frame)
+            self._decoder = None
+        # End of stream: targets past the last frame get the last frame
+        return self._convert(self._last) if self._last is not None else None
+
+    def read_many(self, timestamps):
+        """Frames for timestamps in any order, read in time order (list aligned with timestamps)."""
+        frames = [None] * len(timestamps)
+        for idx in sorted(range(len(timestamps)), key=lambda i: timestamps[i]):
+            frames[idx] = self.read(timestamps[idx])
+        return frames
+
+
+def _extract_with_cv2(video_path, order, timestamps, max_edge):
+    import cv2
+
+    frames = [None] * len(timestamps)
+    cap = cv2.VideoCapture(video_path)
+    try:
+        for idx in order:
+            cap.set(cv2.CAP_PROP_POS_MSEC, max(0.0, timestamps[idx]) * 1000.0)
+            ok, bgr = cap.read()
+            if not ok:
+                continue
+            rgb = cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB)
+            h, w = rgb.shape[:2]
+            size = _scaled_size(w, h, max_edge)
+            if size != (w, h):
+                rgb = cv2.resize(rgb, size, interpolation=cv2.INTER_AREA)
+            frames[idx] = rgb
+    finally:
+        cap.release()
+    return frames
+
+
+def extract_frames(video_path, timestamps, max_edge=0):
+    """
+    Extract frames at the given timestamps in one forward decode pass.
+
+    Timestamps are sorted and served in order by a FrameReader, so nearby
+    targets cost only the frames between them and distant ones a seek to the
+    nearest preceding keyframe. Frames are scaled during color conversion, so
+    full-resolution RGB is never materialized when max_edge is set. Falls back
+    to OpenCV seeks if PyAV cannot open the file.
+
+    Args:
+        video_path: Path to the video file
+        timestamps: Times in seconds, in any order
+        max_edge: Longest edge of the returned frames in pixels (0 keeps full size)
+
+    Returns:
+        List of RGB uint8 arrays aligned with timestamps (None where extraction failed)
+    """
+    if not timestamps:
+        return []
+    order = sorted(range(len(timestamps)), key=lambda i: timestamps[i])
+    try:
+        with FrameReader(video_path, max_edge) as reader:
+            return reader.read_many(timestamps)
+    except Exception as e:
+        print(f"  Warning: Sequential frame extraction failed ({e}), falling back to OpenCV seeks")
+        return _extract_with_cv2(video_path, order, timestamps, max_edge)
+
+
+def extract_frame(video_path, t, max_edge=0):
+    """Single-frame convenience wrapper around extract_frames (e.g. for thumbnails)."""
+    return extract_frames(video_path, [t], max_edge)[0]
@@ -0,0 +1,206 @@
+from dotenv import load_dotenv
+from langchain_core.callbacks import BaseCallbackHandler
+from Components.LLMTelemetry import record_call, current_job
+from Components.RateLimiter import get_request_scheduler, PRIORITY_SELECTION
+import asyncio
+import os
+import random
+import time
+
+load_dotenv()
+
+
+def get_api_key():
+    """OpenAI key from OPENAI_API (or OPENAI_API_KEY). A placeholder is used when talking to a local stub."""
+    key = os.getenv("OPENAI_API") or os.getenv("OPENAI_API_KEY")
+    if not key and os.getenv("LLM_BASE_URL"):
+        key = "stub"
+    return key
+
+
+def get_chat_model(model, temperature, **kwargs):
+    """
+    Create a ChatOpenAI client for the given model.
+
+    Every LLM and vision call site builds its client here, so setting
+    LLM_BASE_URL (e.g. http://localhost:8787/v1 for llm_stub_server.py)
+    redirects the whole pipeline to an OpenAI-compatible endpoint.
+    Invoke the result through invoke_llm / ainvoke_llm for telemetry and retries.
+    """
+    from langchain_openai import ChatOpenAI
+
+    base_url = os.getenv("LLM_BASE_URL")
+    if base_url:
+        kwargs.setdefault("base_url", base_url)
+    # Retries are handled (and counted) by invoke_llm / ainvoke_llm
+    kwargs.setdefault("max_retries", 0)
+    return ChatOpenAI(model=model, temperature=temperature, api_key=get_api_key(), **kwargs)
+
+
+class _UsageCallback(BaseCallbackHandler):
+    """Collects token usage reported by the chat model across (re)tries."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        if usage:
+            self.prompt_tokens += usage.get("prompt_tokens", 0) or 0
+            self.completion_tokens += usage.get("completion_tokens", 0) or 0
+            return
+        for generations in response.generations:
+            for generation in generations:
+                metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+                self.prompt_tokens += metadata.get("input_tokens", 0)
+                self.completion_tokens += metadata.get("output_tokens", 0)
+
+
+# Rough token costs used to budget a request before it is sent (corrected from the reported usage)
+CHARS_PER_TOKEN = 4
+IMAGE_TOKENS = {"low": 85, "high": 765, "auto": 765}
+COMPLETION_TOKEN_ESTIMATE = 300
+
+
+def estimate_tokens(inputs):
+    """Estimate the prompt + completion tokens of a request from its inputs (messages or chain variables)."""
+    def count(value):
+        if isinstance(value, str):
+            return len(value) // CHARS_PER_TOKEN
+        if isinstance(value, dict):
+            if value.get("type") == "image_url":
+                detail = (value.get("image_url") or {}).get("detail", "auto")
+                return IMAGE_TOKENS.get(detail, IMAGE_TOKENS["auto"])
+            return sum(count(v) for v in value.values())
+        if isinstance(value, (list, tuple)):
+            return sum(count(v) for v in value)
+        content = getattr(value, "content", None)
+        return count(content) if content is not None else len(str(value)) // CHARS_PER_TOKEN
+
+    return count(inputs) + COMPLETION_TOKEN_ESTIMATE
+
+
+def _is_retryable(error):
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, (openai.RateLimitError, openai.APITimeoutError, openai.APIConnectionError, openai.InternalServerError))
+
+
+def _is_rate_limit(error):
+    try:
+        import openai
+    except ImportError:
+        return False
+    return isinstance(error, openai.RateLimitError)
+
+
+def _retry_delay(attempt, error=None):
+    """Jittered exponential backoff, or the server's Retry-After when it sends one."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return float(retry_after) + random.uniform(0, 1.0)
+        except ValueError:
+            pass
+    delay = min(30.0, 2.0 ** attempt)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+def _backoff(scheduler, error, attempt, started=None, deadline=None):
+    """Delay before the next attempt, or None if the retry would start after the deadline."""
+    delay = _retry_delay(attempt, error)
+    if deadline is not None and time.monotonic() - started + delay >= deadline:
+        return None
+    if _is_rate_limit(error):
+        # Every caller shares the quota, so hold back the whole queue
+        scheduler.pause(delay)
+    return delay
+
+
+def invoke_llm(runnable, inputs, name, model, priority=PRIORITY_SELECTION, deadline=None):
+    """
+    Invoke a chat model or chain through the request scheduler, with telemetry and retries.
+
+    Each attempt waits for the process-wide RPM/TPM budget (see
+    Components.RateLimiter.RequestScheduler); `priority` and the current job
+    decide its place in the queue. Records latency, prompt/completion tokens,
+    retries and estimated cost for the call (see Components.LLMTelemetry).
+    Transient API errors are retried up to LLM_MAX_RETRIES times (default 4)
+    with jittered exponential backoff; other errors are recorded and re-raised.
+    With a deadline, retries that would start after it are skipped, so a slow
+    API fails within roughly deadline + one request timeout (bound each
+    attempt with get_chat_model(..., timeout=...)).
+
+    Args:
+        runnable: ChatOpenAI instance or LangChain runnable built on one
+        inputs: Input passed to runnable.invoke
+        name: Call-site name used to group metrics (e.g. "GetHighlight")
+        model: Model name used for cost estimation
+        priority: PRIORITY_SELECTION (default) or PRIORITY_BULK for vision fan-out
+        deadline: Seconds after which failed attempts are no longer retried (default: no limit)
+
+    Returns:
+        The runnable's result
+    """
+    max_retries = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    scheduler = get_request_scheduler()
+    estimated = estimate_tokens(inputs)
+    job_id = current_job()
+    usage = _UsageCallback()
+    retries = 0
+    started = time.monotonic()
+    while True:
+        charged = scheduler.acquire(estimated, priority, job_id)
+        used_before = usage.prompt_tokens + usage.completion_tokens
+        try:
+            result = runnable.invoke(inputs, config={"callbacks": [usage]})
+        except Exception as e:
+            # A failed attempt does not use the tokens charged for it
+            scheduler.settle(charged, usage.prompt_tokens + usage.completion_tokens - used_before)
+            delay = _backoff(scheduler, e, retries + 1, started, deadline) if retries < max_retries and _is_retryable(e) else None
+            if delay is not None:
+                retries += 1
+                print(f"  {name}: {type(e).__name__}, retrying in {delay:.1f}s ({retries}/{max_retries})...")
+                time.sleep(delay)
+                continue
+            record_call(name, model, time.monotonic() - started, usage.prompt_tokens, usage.completion_tokens, retries, error=type(e).__name__)
+            raise
+        # Without reported usage the estimate stands
+        scheduler.settle(charged, (usage.prompt_tokens + usage.completion_tokens - used_before) or None)
+        record_call(name, model, time.monotonic() - started, usage.prompt_tokens, usage.completion_tokens, retries)
+        return result
+
+
+async def ainvoke_llm(runnable, inputs, name, model, priority=PRIORITY_SELECTION, deadline=None):
+    """Async counterpart of invoke_llm."""
+    max_retries = int(os.getenv("LLM_MAX_RETRIES", "4"))
+    scheduler = get_request_scheduler()
+    estimated = estimate_tokens(inputs)
+    job_id = current_job()
+    usage = _UsageCallback()
+    retries = 0
+    started = time.monotonic()
+    while True:
+        charged = await scheduler.acquire_async(estimated, priority, job_id)
+        used_before = usage.prompt_tokens + usage.completion_tokens
+        try:
+            result = await runnable.ainvoke(inputs, config={"callbacks": [usage]})
+        except Exception as e:
+            # A failed attempt does not use the tokens charged for it
+            scheduler.settle(charged, usage.prompt_tokens + usage.completion_tokens - used_before)
+            delay = _backoff(scheduler, e, retries + 1, started, deadline) if retries < max_retries and _is_retryable(e) else None
+            if delay is not None:
+                retries += 1
+                print(f"  {name}: {type(e).__name__}, retrying in {delay:.1f}s ({retries}/{max_retries})...")
+                await asyncio.sleep(delay)
+                continue
+            record_call(name, model, time.monotonic() - started, usage.prompt_tokens, usage.completion_tokens, retries, error=type(e).__name__)
+            raise
+        # Without reported usage the estimate stands
+        scheduler.settle(charged, (usage.prompt_tokens + usage.completion_tokens - used_before) or None)
+        record_call(name, model, time.monotonic() - started, usage.prompt_tokens, usage.completion_tokens, retries)
+        return result
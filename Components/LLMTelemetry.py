@@ -0,0 +1,144 @@
+from contextlib import contextmanager
+import contextvars
+import threading
+import time
+
+# USD per 1M tokens (input, output); unknown models are reported with zero cost
+MODEL_PRICING = {
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-5-nano": (0.05, 0.40),
+}
+
+_current_job = contextvars.ContextVar("llm_job_id", default=None)
+
+_lock = threading.Lock()
+_job_calls = {}  # job_id -> list of call records
+_totals = {}     # (name, model, status) -> aggregated counters for metrics export
+
+
+def estimate_cost(model, prompt_tokens, completion_tokens):
+    for prefix, (input_price, output_price) in sorted(MODEL_PRICING.items(), key=lambda kv: -len(kv[0])):
+        if model and model.startswith(prefix):
+            return (prompt_tokens * input_price + completion_tokens * output_price) / 1_000_000
+    return 0.0
+
+
+@contextmanager
+def job_context(job_id):
+    """Attribute every LLM call made inside this block (and tasks it spawns) to job_id."""
+    token = _current_job.set(job_id)
+    try:
+        yield
+    finally:
+        _current_job.reset(token)
+
+
+def current_job():
+    return _current_job.get()
+
+
+def record_call(name, model, latency_s, prompt_tokens=0, completion_tokens=0, retries=0, cache_hit=False, error=None):
+    """Record one LLM invocation (or cache hit) for the current job and the process-wide metrics."""
+    record = {
+        "name": name,
+        "model": model,
+        "latency_s": latency_s,
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "retries": retries,
+        "cache_hit": cache_hit,
+        "cost_usd": 0.0 if cache_hit else estimate_cost(model, prompt_tokens, completion_tokens),
+        "error": error,
+        "timestamp": time.time(),
+    }
+    status = "cache_hit" if cache_hit else ("error" if error else "ok")
+    job_id = _current_job.get()
+
+    with _lock:
+        if job_id is not None:
+            _job_calls.setdefault(job_id, []).append(record)
+        totals = _totals.setdefault((name, model or "", status), {
+            "calls": 0, "latency_s": 0.0, "prompt_tokens": 0, "completion_tokens": 0, "retries": 0, "cost_usd": 0.0,
+        })
+        totals["calls"] += 1
+        totals["latency_s"] += latency_s
+        totals["prompt_tokens"] += prompt_tokens
+        totals["completion_tokens"] += completion_tokens
+        totals["retries"] += retries
+        totals["cost_usd"] += record["cost_usd"]
+    return record
+
+
+def record_cache_hits(name, model, count):
+    for _ in range(count):
+        record_call(name, model, 0.0, cache_hit=True)
+
+
+def get_job_summary(job_id, clear=False):
+    """
+    Aggregate the LLM calls of one job.
+
+    Returns:
+        Dict with overall totals and a per-call-name breakdown, e.g.
+        {'calls': 12, 'latency_s': 18.4, ..., 'by_name': {'vision': {...}, 'GetHighlight': {...}}}
+    """
+    with _lock:
+        calls = list(_job_calls.pop(job_id, []) if clear else _job_calls.get(job_id, []))
+
+    def aggregate(records):
+        return {
+            "calls": sum(1 for r in records if not r["cache_hit"]),
+            "cache_hits": sum(1 for r in records if r["cache_hit"]),
+            "errors": sum(1 for r in records if r["error"]),
+            "retries": sum(r["retries"] for r in records),
+            "latency_s": round(sum(r["latency_s"] for r in records), 3),
+            "max_latency_s": round(max((r["latency_s"] for r in records), default=0.0), 3),
+            "prompt_tokens": sum(r["prompt_tokens"] for r in records),
+            "completion_tokens": sum(r["completion_tokens"] for r in records),
+            "cost_usd": round(sum(r["cost_usd"] for r in records), 6),
+        }
+
+    summary = aggregate(calls)
+    by_name = {}
+    for r in calls:
+        by_name.setdefault(r["name"], []).append(r)
+    summary["by_name"] = {name: {**aggregate(records), "model": records[0]["model"]} for name, records in by_name.items()}
+    return summary
+
+
+def print_job_summary(job_id):
+    summary = get_job_summary(job_id)
+    if not summary["calls"] and not summary["cache_hits"]:
+        return
+    print(f"\n{'='*60}")
+    print(f"LLM USAGE FOR JOB {job_id}:")
+    print(f"{'='*60}")
+    for name, stats in summary["by_name"].items():
+        print(f"  {name} ({stats['model']}): {stats['calls']} calls, {stats['latency_s']:.2f}s, "
+              f"{stats['prompt_tokens']}+{stats['completion_tokens']} tokens, "
+              f"{stats['retries']} retries, {stats['cache_hits']} cache hits, ${stats['cost_usd']:.4f}")
+    print(f"  Total: {summary['calls']} calls, {summary['latency_s']:.2f}s, ${summary['cost_usd']:.4f}")
+    print(f"{'='*60}\n")
+
+
+def export_prometheus():
+    """Process-wide LLM metrics in Prometheus text exposition format."""
+    with _lock:
+        totals = {key: dict(value) for key, value in _totals.items()}
+
+    metrics = [
+        ("zipclip_llm_calls_total", "counter", "LLM invocations", "calls"),
+        ("zipclip_llm_latency_seconds_total", "counter", "Total wall-clock latency of LLM invocations", "latency_s"),
+        ("zipclip_llm_prompt_tokens_total", "counter", "Prompt tokens consumed", "prompt_tokens"),
+        ("zipclip_llm_completion_tokens_total", "counter", "Completion tokens generated", "completion_tokens"),
+        ("zipclip_llm_retries_total", "counter", "Retries after transient API errors", "retries"),
+        ("zipclip_llm_cost_usd_total", "counter", "Estimated API cost in USD", "cost_usd"),
+    ]
+    lines = []
+    for metric, metric_type, help_text, field in metrics:
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {metric_type}")
+        for (name, model, status), values in sorted(totals.items()):
+            lines.append(f'{metric}{{name="{name}",model="{model}",status="{status}"}} {values[field]}')
+    return "\n".join(lines) + "\n"
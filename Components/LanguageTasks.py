@@ -1,14 +1,19 @@
 from pydantic import BaseModel,Field
 from dotenv import load_dotenv
+from Components.LLMClient import get_chat_model, get_api_key, invoke_llm
 import os
 
 load_dotenv()
 
-api_key = os.getenv("OPENAI_API")
+api_key = get_api_key()
 
 if not api_key:
     raise ValueError("API key not found. Make sure it is defined in the .env file.")
 
+# Time budget (seconds) for a highlight selection call, including retries. Past it the
+# call fails and callers fall back to the local highlight scorer.
+HIGHLIGHT_LLM_TIMEOUT = float(os.getenv("HIGHLIGHT_LLM_TIMEOUT", "60"))
+
 class JSONResponse(BaseModel):
     """
     The response should strictly follow the following structure: -
@@ -66,6 +71,7 @@ Select a 2-minute segment from the transcription that contains something interes
 The selected text should contain only complete sentences.
 Do not cut the sentences in the middle.
 The selected text should form a complete thought.
+If the transcription is split into excerpts by lines containing only "[...]", the excerpts are not contiguous: the segment must start and end within a single excerpt.
 Return a JSON object with the following structure:
 ## Output 
 {{
@@ -86,14 +92,8 @@ Return a JSON object with the following structure:
 
 
 def GetHighlight(Transcription):
-    from langchain_openai import ChatOpenAI
-    
     try:
-        llm = ChatOpenAI(
-            model="gpt-5-nano",  # Much cheaper than gpt-4o
-            temperature=1.0,
-            api_key = api_key
-        )
+        llm = get_chat_model("gpt-5-nano", temperature=1.0, timeout=HIGHLIGHT_LLM_TIMEOUT)  # Much cheaper than gpt-4o
 
         from langchain.prompts import ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages(
@@ -105,7 +105,7 @@ def GetHighlight(Transcription):
         chain = prompt |llm.with_structured_output(JSONResponse,method="function_calling")
         
         print("Calling LLM for highlight selection...")
-        response = chain.invoke({"Transcription":Transcription})
+        response = invoke_llm(chain, {"Transcription":Transcription}, name="GetHighlight", model="gpt-5-nano", deadline=HIGHLIGHT_LLM_TIMEOUT)
         
         # Validate response
         if not response:
@@ -142,11 +142,8 @@ def GetHighlight(Transcription):
         print(f"Content: {response.content}")
         print(f"{'='*60}\n")
         
-        if Start==End:
-            Ask = input("Error - Get Highlights again (y/n) -> ").lower()
-            if Ask == "y":
-                Start, End = GetHighlight(Transcription)
-            return Start, End
+        # No interactive retry here: this runs inside API worker threads, so callers
+        # handle (None, None) themselves (e.g. the local highlight scorer fallback)
         return Start,End
         
     except Exception as e:
@@ -175,8 +172,6 @@ def GetHighlightMultiSegment(Transcription, target_duration=120):
     Returns:
         List of segment dicts with 'start' and 'end' keys, or None if error
     """
-    from langchain_openai import ChatOpenAI
-    
     multi_system = f"""
 The input contains a timestamped transcription of a video.
 Identify 3-5 separate segments from throughout the transcription that together form an engaging and cohesive short video.
@@ -184,6 +179,7 @@ Select segments that contain interesting, useful, surprising, controversial, or
 The segments should complement each other and tell a compelling story together.
 Try to achieve a total duration of approximately {target_duration} seconds across all segments combined.
 Each segment should contain only complete sentences - do not cut sentences in the middle.
+If the transcription is split into excerpts by lines containing only "[...]", the excerpts are not contiguous: each segment must start and end within a single excerpt.
 
 Return a JSON object with the following structure:
 {{{{
@@ -203,11 +199,7 @@ Return a JSON object with the following structure:
 """
     
     try:
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=1.0,
-            api_key=api_key
-        )
+        llm = get_chat_model("gpt-4o-mini", temperature=1.0, timeout=HIGHLIGHT_LLM_TIMEOUT)
 
         from langchain.prompts import ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages(
@@ -219,7 +211,7 @@ Return a JSON object with the following structure:
         chain = prompt | llm.with_structured_output(MultiSegmentResponse, method="function_calling")
         
         print(f"Calling LLM for multi-segment selection (target: {target_duration}s)...")
-        response = chain.invoke({"Transcription": Transcription})
+        response = invoke_llm(chain, {"Transcription": Transcription}, name="GetHighlightMultiSegment", model="gpt-4o-mini", deadline=HIGHLIGHT_LLM_TIMEOUT)
         
         # Validate response
         if not response:
@@ -301,8 +293,6 @@ def GetHighlightMultiSegmentFromScenes(scene_transcripts, target_duration=120):
     Returns:
         List of segment dicts with 'start' and 'end' keys, or None if error
     """
-    from langchain_openai import ChatOpenAI
-    
     # Build scene summary
     scene_summary = "DETECTED SCENES WITH TRANSCRIPTS:\n"
     scene_summary += "=" * 80 + "\n\n"
@@ -341,11 +331,7 @@ Return a JSON object with the following structure:
 """
     
     try:
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=1.0,
-            api_key=api_key
-        )
+        llm = get_chat_model("gpt-4o-mini", temperature=1.0)
 
         from langchain.prompts import ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages(
@@ -357,7 +343,7 @@ Return a JSON object with the following structure:
         chain = prompt | llm.with_structured_output(MultiSegmentResponse, method="function_calling")
         
         print(f"Calling LLM for scene-based selection (target: {target_duration}s)...")
-        response = chain.invoke({})
+        response = invoke_llm(chain, {}, name="GetHighlightMultiSegmentFromScenes", model="gpt-4o-mini")
         
         # Validate response
         if not response:
@@ -438,8 +424,6 @@ def GetHighlightMultiSegmentFromFrames(scene_segments, target_duration=120):
     Returns:
         List of segment dicts with 'start' and 'end' keys, or None if error
     """
-    from langchain_openai import ChatOpenAI
-    
     # Build scene summary with visual analysis
     scene_summary = "DETECTED SCENES WITH VISUAL ANALYSIS:\n"
     scene_summary += "=" * 80 + "\n\n"
@@ -500,11 +484,7 @@ Return a JSON object with the following structure:
 """
     
     try:
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=1.0,
-            api_key=api_key
-        )
+        llm = get_chat_model("gpt-4o-mini", temperature=1.0)
 
         from langchain.prompts import ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages(
@@ -518,7 +498,7 @@ Return a JSON object with the following structure:
         print(f"Calling LLM for scene selection based on visual content...")
         print(f"Target: {target_duration}s, Minimum: {min_duration}s")
         print(f"Max per segment: 10s (20s only for critical moments)")
-        response = chain.invoke({})
+        response = invoke_llm(chain, {}, name="GetHighlightMultiSegmentFromFrames", model="gpt-4o-mini")
         
         # Validate response
         if not response:
@@ -621,8 +601,6 @@ def GetCoherentHighlights(media_metadata_list, target_duration=120):
     Returns:
         List of segment dicts with 'media_index', 'start', 'end', or None if error
     """
-    from langchain_openai import ChatOpenAI
-    
     media_summary = "INPUT MEDIA FILES:\n"
     media_summary += "=" * 80 + "\n\n"
     
@@ -673,11 +651,7 @@ Return a JSON object with the following structure:
 """
     
     try:
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=1.0,
-            api_key=api_key
-        )
+        llm = get_chat_model("gpt-4o-mini", temperature=1.0)
 
         from langchain.prompts import ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages(
@@ -689,7 +663,7 @@ Return a JSON object with the following structure:
         chain = prompt | llm.with_structured_output(CoherentMultiSegmentResponse, method="function_calling")
         
         print(f"Calling LLM for coherent multi-media selection...")
-        response = chain.invoke({})
+        response = invoke_llm(chain, {}, name="GetCoherentHighlights", model="gpt-4o-mini")
         
         # Validate response
         if not response:
@@ -738,8 +712,6 @@ def GetMusicMood(theme, media_metadata_list):
     """
     Suggest a music genre and mood based on the theme and media content.
     """
-    from langchain_openai import ChatOpenAI
-    
     media_info = ""
     for item in media_metadata_list[:3]: # Just a sample
         media_info += f"- {item['type']}: {item['visual_description'][:100]}\n"
@@ -755,18 +727,14 @@ Media Sample:
 """
     
     try:
-        llm = ChatOpenAI(
-            model="gpt-4o-mini",
-            temperature=0.7,
-            api_key=api_key
-        )
+        llm = get_chat_model("gpt-4o-mini", temperature=0.7)
         
         from langchain.prompts import ChatPromptTemplate
         prompt = ChatPromptTemplate.from_messages([("system", mood_system)])
         chain = prompt | llm
         
         print(f"Calling LLM for music mood selection...")
-        response = chain.invoke({"theme": theme, "media_info": media_info})
+        response = invoke_llm(chain, {"theme": theme, "media_info": media_info}, name="GetMusicMood", model="gpt-4o-mini")
         mood = response.content if hasattr(response, 'content') else str(response)
         
         return mood.strip()
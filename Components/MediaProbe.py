@@ -0,0 +1,254 @@
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import threading
+from collections import OrderedDict
+from fractions import Fraction
+
+# Probes kept in memory (least recently used are dropped first; the disk cache keeps the rest)
+MEDIA_PROBE_MEMORY_CACHE_SIZE = 256
+
+_memory_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _cache_dir():
+    """On-disk probe cache (MEDIA_PROBE_CACHE_DIR, default <ZIPCLIP_CACHE_DIR>/media_probe; empty disables)."""
+    return os.getenv("MEDIA_PROBE_CACHE_DIR", os.path.join(os.getenv("ZIPCLIP_CACHE_DIR", "cache"), "media_probe"))
+
+
+def _cache_key(path):
+    st = os.stat(path)
+    return f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}"
+
+
+def _disk_path(key):
+    cache_dir = _cache_dir()
+    if not cache_dir:
+        return None
+    return os.path.join(cache_dir, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+
+def _remember(key, info):
+    with _cache_lock:
+        _memory_cache[key] = info
+        _memory_cache.move_to_end(key)
+        while len(_memory_cache) > MEDIA_PROBE_MEMORY_CACHE_SIZE:
+            _memory_cache.popitem(last=False)
+
+
+def _load(key):
+    with _cache_lock:
+        if key in _memory_cache:
+            _memory_cache.move_to_end(key)
+            return _memory_cache[key]
+    path = _disk_path(key)
+    if path and os.path.exists(path):
+        try:
+            with open(path, "r") as f:
+                info = json.load(f)
+            if info.get("cache_key") == key:
+                _remember(key, info)
+                return info
+        except (OSError, ValueError):
+            pass
+    return None
+
+
+def _store(key, info):
+    info["cache_key"] = key
+    _remember(key, info)
+    path = _disk_path(key)
+    if not path:
+        return
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(info, f)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"  Warning: Could not cache media probe for {info.get('path')}: {e}")
+
+
+def _rate(value):
+    try:
+        rate = Fraction(value)
+    except (TypeError, ValueError, ZeroDivisionError):
+        return 0.0
+    return float(rate) if rate > 0 else 0.0
+
+
+def _rotation(video):
+    """
+    Display rotation of an ffprobe video stream in degrees (clockwise, as the old "rotate" tag).
+
+    Current ffmpeg reports it only as display-matrix side data, whose angle is
+    counter-clockwise; older files and builds set the "rotate" tag.
+    """
+    rotate = (video.get("tags") or {}).get("rotate")
+    if rotate:
+        return int(float(rotate)) % 360
+    for side_data in video.get("side_data_list") or []:
+        if side_data.get("rotation") is not None:
+            return int(round(-float(side_data["rotation"]))) % 360
+    return 0
+
+
+def _get_ffprobe_exe():
+    return os.getenv("FFPROBE_BINARY") or shutil.which("ffprobe")
+
+
+def _probe_with_ffprobe(path, exe):
+    result = subprocess.run(
+        [exe, "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path],
+        capture_output=True, text=True, check=True, timeout=60,
+    )
+    data = json.loads(result.stdout)
+    fmt = data.get("format", {})
+    video = next((s for s in data.get("streams", []) if s.get("codec_type") == "video"
+                  and not s.get("disposition", {}).get("attached_pic")), None)
+    audio = next((s for s in data.get("streams", []) if s.get("codec_type") == "audio"), None)
+
+    info = {
+        "duration": float(fmt.get("duration") or (video or {}).get("duration") or 0.0),
+        "format": fmt.get("format_name"),
+        "bit_rate": int(fmt.get("bit_rate") or 0),
+        "has_video": video is not None,
+        "has_audio": audio is not None,
+    }
+    if video:
+        info.update({
+            "width": int(video.get("width") or 0),
+            "height": int(video.get("height") or 0),
+            "fps": _rate(video.get("avg_frame_rate")) or _rate(video.get("r_frame_rate")),
+            "video_codec": video.get("codec_name"),
+            "pix_fmt": video.get("pix_fmt"),
+            "frame_count": int(video.get("nb_frames") or 0),
+            "rotation": _rotation(video),
+        })
+    if audio:
+        info.update({
+            "audio_codec": audio.get("codec_name"),
+            "audio_channels": int(audio.get("channels") or 0),
+            "audio_layout": audio.get("channel_layout"),
+            "audio_sample_rate": int(audio.get("sample_rate") or 0),
+        })
+    return info
+
+
+def _probe_with_av(path):
+    import av
+
+    with av.open(path) as container:
+        video = container.streams.video[0] if container.streams.video else None
+        audio = container.streams.audio[0] if container.streams.audio else None
+        duration = container.duration / av.time_base if container.duration else 0.0
+        if not duration and video is not None and video.duration:
+            duration = float(video.duration * video.time_base)
+
+        info = {
+            "duration": duration,
+            "format": container.format.name,
+            "bit_rate": int(container.bit_rate or 0),
+            "has_video": video is not None,
+            "has_audio": audio is not None,
+        }
+        if video is not None:
+            ctx = video.codec_context
+            info.update({
+                "width": ctx.width,
+                "height": ctx.height,
+                "fps": float(video.average_rate or video.guessed_rate or 0),
+                "video_codec": ctx.name,
+                "pix_fmt": ctx.pix_fmt,
+                "frame_count": int(video.frames or 0),
+                "rotation": 0,
+            })
+        if audio is not None:
+            ctx = audio.codec_context
+            info.update({
+                "audio_codec": ctx.name,
+                "audio_channels": ctx.channels,
+                "audio_layout": ctx.layout.name if ctx.layout else None,
+                "audio_sample_rate": ctx.sample_rate,
+            })
+    return info
+
+
+def probe_media(path):
+    """
+    Container and stream metadata for a media file, cached per file.
+
+    ffprobe is used when available (FFPROBE_BINARY or PATH), otherwise PyAV;
+    neither decodes any frames. Results are cached in memory and as JSON
+    under MEDIA_PROBE_CACHE_DIR, keyed by path + mtime + size, so a changed
+    file is probed again. Each call returns its own copy of the dict.
+
+    Args:
+        path: Path to a video, audio or image file
+
+    Returns:
+        Dict with 'duration', 'fps', 'width', 'height', 'video_codec', 'pix_fmt',
+        'frame_count', 'rotation', 'has_video', 'has_audio', 'audio_codec',
+        'audio_channels', 'audio_layout', 'audio_sample_rate', 'format', 'bit_rate'
+        (stream fields default to 0/None when the stream is missing)
+    """
+    key = _cache_key(path)
+    info = _load(key)
+    if info is not None:
+        return dict(info)
+
+    exe = _get_ffprobe_exe()
+    try:
+        probed = _probe_with_ffprobe(path, exe) if exe else _probe_with_av(path)
+    except Exception as e:
+        if not exe:
+            raise
+        print(f"  Warning: ffprobe failed for {os.path.basename(path)} ({e}), using PyAV")
+        probed = _probe_with_av(path)
+
+    info = {
+        "path": os.path.abspath(path),
+        "duration": 0.0, "fps": 0.0, "width": 0, "height": 0,
+        "video_codec": None, "pix_fmt": None, "frame_count": 0, "rotation": 0,
+        "audio_codec": None, "audio_channels": 0, "audio_layout": None, "audio_sample_rate": 0,
+    }
+    info.update(probed)
+    if not info["frame_count"] and info["fps"] and info["duration"]:
+        info["frame_count"] = int(round(info["fps"] * info["duration"]))
+    _store(key, info)
+    return dict(info)
+
+
+def get_keyframe_index(path):
+    """
+    Presentation times (seconds, ascending) of the video keyframes, cached with the probe.
+
+    Built once per file from packet metadata with PyAV (no decoding) and
+    stored in the probe cache entry.
+    """
+    info = probe_media(path)
+    if info.get("keyframes") is not None:
+        return info["keyframes"]
+
+    import av
+
+    keyframes = []
+    with av.open(path) as container:
+        stream = container.streams.video[0]
+        for packet in container.demux(stream):
+            if packet.is_keyframe and packet.pts is not None:
+                keyframes.append(float(packet.pts * stream.time_base))
+    keyframes.sort()
+
+    info = dict(info, keyframes=keyframes)
+    _store(info["cache_key"], info)
+    return keyframes
+
+
+def get_duration(path):
+    """Duration in seconds (0.0 if unknown)."""
+    return probe_media(path)["duration"]
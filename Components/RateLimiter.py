@@ -0,0 +1,253 @@
+from collections import OrderedDict, deque
+import asyncio
+import os
+import traceback
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    The bucket is guarded by a threading lock rather than an asyncio lock so
+    a single instance can be shared across event loops and API worker threads.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens=1.0):
+        """
+        Take `tokens` from the bucket if available.
+
+        Returns:
+            0.0 if the tokens were taken, otherwise the number of seconds
+            to wait before they are expected to be available.
+        """
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate if self.rate > 0 else 1.0
+
+    def adjust(self, tokens):
+        """
+        Take (positive) or return (negative) tokens without waiting.
+
+        Used to correct an estimate once the real cost is known; the balance
+        may go negative, which delays the next acquisitions accordingly.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.capacity, self._tokens - tokens)
+
+
+# Request priorities: lower values are dispatched first
+PRIORITY_SELECTION = 0  # Small highlight/selection/mood calls a job is blocked on
+PRIORITY_BULK = 1       # Bulk vision calls (one per scene/frame batch)
+
+
+class _Ticket:
+    """A queued request waiting for the scheduler to grant it."""
+
+    def __init__(self, tokens, loop=None):
+        self.tokens = tokens
+        self.charged = 0.0
+        self.granted = False
+        self._event = threading.Event()
+        self._loop = loop
+        self._future = loop.create_future() if loop is not None else None
+
+    def grant(self):
+        """Wake the waiting caller. Returns False if its event loop has already closed."""
+        if self._future is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._resolve)
+            except RuntimeError:
+                return False
+        else:
+            self._event.set()
+        self.granted = True
+        return True
+
+    def _resolve(self):
+        if not self._future.done():
+            self._future.set_result(None)
+
+
+class RequestScheduler:
+    """
+    Process-wide scheduler for OpenAI requests.
+
+    Every request waits for both a requests-per-minute and a tokens-per-minute
+    budget (token buckets refilled continuously). Waiting requests are
+    dispatched by priority (PRIORITY_SELECTION before PRIORITY_BULK) and,
+    within a priority, round-robin across jobs so one job's vision burst
+    cannot starve another job. A dedicated dispatcher thread grants tickets,
+    so blocking callers (threads) and async callers (any event loop) share
+    one queue.
+
+    When the API answers 429, pause() holds back every request for the
+    backoff period instead of letting concurrent callers keep hammering it.
+    An rpm or tpm of 0 (or less) disables that limit.
+    """
+
+    def __init__(self, rpm, tpm, burst_seconds=5.0):
+        self.requests = TokenBucket(rpm / 60.0, max(1.0, rpm / 60.0 * burst_seconds)) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm / 60.0, max(1.0, tpm / 60.0 * burst_seconds)) if tpm > 0 else None
+        # priority -> OrderedDict(job_id -> deque of tickets); job order is the round-robin order
+        self._queues = {}
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._dispatcher = None
+
+    def _ensure_dispatcher(self):
+        if self._dispatcher is None or not self._dispatcher.is_alive():
+            self._dispatcher = threading.Thread(target=self._dispatch_loop, name="llm-scheduler", daemon=True)
+            self._dispatcher.start()
+
+    def _enqueue(self, ticket, priority, job_id):
+        with self._cond:
+            jobs = self._queues.setdefault(priority, OrderedDict())
+            jobs.setdefault(job_id, deque()).append(ticket)
+            self._ensure_dispatcher()
+            self._cond.notify()
+
+    def _remove(self, ticket):
+        with self._cond:
+            for jobs in self._queues.values():
+                for job_id, tickets in list(jobs.items()):
+                    if ticket in tickets:
+                        tickets.remove(ticket)
+                        if not tickets:
+                            del jobs[job_id]
+                        return
+
+    def _head(self):
+        """Next ticket to dispatch: highest priority, then the job at the front of the rotation."""
+        for priority in sorted(self._queues):
+            jobs = self._queues[priority]
+            if jobs:
+                job_id, tickets = next(iter(jobs.items()))
+                return priority, job_id, tickets[0]
+        return None
+
+    def _pop(self, priority, job_id):
+        jobs = self._queues[priority]
+        tickets = jobs.pop(job_id)
+        tickets.popleft()
+        if tickets:
+            # Move the job to the back of the rotation
+            jobs[job_id] = tickets
+
+    def _dispatch_loop(self):
+        # A dead dispatcher would leave every queued caller hanging, so never let it exit
+        while True:
+            try:
+                self._dispatch()
+            except Exception:
+                print("Warning: LLM scheduler dispatcher error, continuing")
+                traceback.print_exc()
+                time.sleep(0.1)
+
+    def _dispatch(self):
+        with self._cond:
+            while True:
+                head = self._head()
+                if head is None:
+                    self._cond.wait()
+                    continue
+                priority, job_id, ticket = head
+
+                charged = 0.0
+                wait = self._paused_until - time.monotonic()
+                if wait <= 0 and self.requests is not None:
+                    wait = self.requests.try_acquire(1.0)
+                if wait <= 0 and self.tokens is not None:
+                    # Requests larger than the burst would never fit; cap them at the bucket size
+                    charged = min(ticket.tokens, self.tokens.capacity)
+                    wait = self.tokens.try_acquire(charged)
+                    if wait > 0:
+                        charged = 0.0
+                        if self.requests is not None:
+                            self.requests.adjust(-1.0)
+                if wait > 0:
+                    # Woken early if a higher-priority request arrives
+                    self._cond.wait(timeout=wait)
+                    continue
+
+                self._pop(priority, job_id)
+                ticket.charged = charged
+                if not ticket.grant():
+                    # The caller's event loop is gone; give its budget back
+                    if self.requests is not None:
+                        self.requests.adjust(-1.0)
+                    self.settle(charged, 0)
+
+    def acquire(self, tokens, priority=PRIORITY_SELECTION, job_id=None):
+        """
+        Block the calling thread until the request may be sent.
+
+        Returns:
+            Tokens actually charged (capped at the bucket size), to pass to settle()
+        """
+        ticket = _Ticket(tokens)
+        self._enqueue(ticket, priority, job_id)
+        ticket._event.wait()
+        return ticket.charged
+
+    async def acquire_async(self, tokens, priority=PRIORITY_SELECTION, job_id=None):
+        """Wait (without blocking the event loop) until the request may be sent; returns the tokens charged."""
+        ticket = _Ticket(tokens, asyncio.get_running_loop())
+        self._enqueue(ticket, priority, job_id)
+        try:
+            await ticket._future
+        finally:
+            if not ticket.granted:
+                self._remove(ticket)
+        return ticket.charged
+
+    def settle(self, charged_tokens, actual_tokens):
+        """
+        Correct the token budget once the real usage is known.
+
+        Pass 0 for a request that failed (its charge is refunded) and None when
+        the response reported no usage (the charge stands).
+        """
+        if actual_tokens is not None and self.tokens is not None:
+            self.tokens.adjust(actual_tokens - charged_tokens)
+
+    def pause(self, seconds):
+        """Hold back every queued request for `seconds` (e.g. after a 429)."""
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._cond.notify()
+
+
+# Process-wide scheduler shared by every OpenAI request, regardless of which job,
+# thread or event loop issues it. Configure with LLM_RATE_LIMIT_RPM / LLM_RATE_LIMIT_TPM
+# (0 disables a limit).
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_request_scheduler():
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            rpm = float(os.getenv("LLM_RATE_LIMIT_RPM", "500"))
+            tpm = float(os.getenv("LLM_RATE_LIMIT_TPM", "200000"))
+            _scheduler = RequestScheduler(rpm, tpm)
+        return _scheduler
@@ -0,0 +1,90 @@
+import numpy as np
+import cv2
+from Components.FaceDetector import get_face_detector
+
+# Embedding layout: 8x4x4 HSV histogram, 8x8 grayscale thumbnail, face count
+HIST_BINS = (8, 4, 4)
+THUMB_SIZE = 8
+MAX_FACES = 3
+# Relative weight of each part in the distance between two scenes
+HIST_WEIGHT = 1.0
+THUMB_WEIGHT = 0.5
+FACE_WEIGHT = 0.5
+
+def count_faces(frame):
+    """Number of faces in an RGB frame (shared face detector)."""
+    return len(get_face_detector().detect(frame, rgb=True))
+
+
+def scene_embeddings(frames):
+    """
+    Compact visual embeddings for scene keyframes.
+
+    Each embedding concatenates a normalized HSV color histogram, a
+    mean-centred 8x8 grayscale thumbnail and a capped face count, weighted
+    so that Euclidean distance reflects how alike two scenes look.
+
+    Args:
+        frames: List of RGB uint8 arrays (any size)
+
+    Returns:
+        float32 array of shape (len(frames), dims)
+    """
+    n = len(frames)
+    small = np.stack([cv2.resize(f, (64, 36), interpolation=cv2.INTER_AREA) for f in frames])
+
+    # Color histograms for all frames at once: quantize, then one bincount with per-frame offsets
+    hsv = cv2.cvtColor(small.reshape(n * 36, 64, 3), cv2.COLOR_RGB2HSV).reshape(n, -1, 3).astype(np.int32)
+    h_bins, s_bins, v_bins = HIST_BINS
+    bins = (hsv[..., 0] * h_bins // 180) * (s_bins * v_bins) + (hsv[..., 1] * s_bins // 256) * v_bins + hsv[..., 2] * v_bins // 256
+    n_bins = h_bins * s_bins * v_bins
+    hist = np.bincount((bins + np.arange(n)[:, None] * n_bins).ravel(), minlength=n * n_bins).reshape(n, n_bins)
+    hist = hist / hist.sum(axis=1, keepdims=True)
+
+    gray = cv2.cvtColor(small.reshape(n * 36, 64, 3), cv2.COLOR_RGB2GRAY).reshape(n, 36, 64)
+    thumbs = np.stack([cv2.resize(g, (THUMB_SIZE, THUMB_SIZE), interpolation=cv2.INTER_AREA) for g in gray])
+    thumbs = thumbs.reshape(n, -1).astype(np.float32) / 255.0
+    thumbs -= thumbs.mean(axis=1, keepdims=True)
+
+    detections = get_face_detector().detect_batch(frames, rgb=True)
+    faces = np.array([[min(len(d), MAX_FACES) / MAX_FACES] for d in detections], dtype=np.float32)
+
+    return np.hstack([
+        hist * HIST_WEIGHT,
+        thumbs * (THUMB_WEIGHT / THUMB_SIZE),
+        faces * FACE_WEIGHT,
+    ]).astype(np.float32)
+
+
+def cluster_scenes(embeddings, max_clusters):
+    """
+    Group scenes into at most max_clusters clusters of similar-looking scenes.
+
+    Representatives are chosen by farthest-point sampling (each new one is
+    the scene least like any chosen so far), so the budget goes to visually
+    distinct scenes; every scene then joins its nearest representative.
+
+    Returns:
+        (representatives, labels): scene indices sent to vision, and for each
+        scene the index into representatives of its cluster
+    """
+    n = len(embeddings)
+    if n <= max_clusters:
+        return list(range(n)), list(range(n))
+    max_clusters = max(1, max_clusters)
+
+    # Start from the scene closest to the mean (the most typical look)
+    centroid = embeddings.mean(axis=0)
+    representatives = [int(np.argmin(((embeddings - centroid) ** 2).sum(axis=1)))]
+    nearest = ((embeddings - embeddings[representatives[0]]) ** 2).sum(axis=1)
+    labels = np.zeros(n, dtype=np.int64)
+    while len(representatives) < max_clusters:
+        candidate = int(np.argmax(nearest))
+        if nearest[candidate] <= 0:
+            break
+        distance = ((embeddings - embeddings[candidate]) ** 2).sum(axis=1)
+        closer = distance < nearest
+        labels[closer] = len(representatives)
+        nearest = np.minimum(nearest, distance)
+        representatives.append(candidate)
+    return representatives, labels.tolist()
@@ -2,29 +2,52 @@ from scenedetect import detect, ContentDetector, AdaptiveDetector
 from scenedetect.video_manager import VideoManager
 from scenedetect.scene_manager import SceneManager
 import os
-from moviepy.editor import VideoFileClip
+import asyncio
 import numpy as np
+from pydantic import BaseModel, Field
+from Components.FastSceneDetect import fast_detect_scenes, probe_detect_scenes
+from Components.MediaProbe import probe_media
 
-def detect_scenes(video_path, threshold=12.0, min_scene_len=20.0):
+def detect_scenes(video_path, threshold=12.0, min_scene_len=20.0, method=None, target_scenes=None):
     """
-    Detect scenes in a video using PySceneDetect with frame-based analysis.
+    Detect scenes in a video using frame-based analysis.
     Optimized for 1-hour videos to generate 10+ segments with 15-20 second max duration.
     
+    Three strategies are available:
+        probe          - candidate cuts from packet metadata (keyframe flags, packet sizes),
+                         verified on decoded frame pairs; pays off on long GOPs with few
+                         candidates. Uses fast instead when verification would decode about
+                         as many frames as a full pass (or too many candidates remain), and on error
+        fast           - built-in detector on a downscaled ffmpeg stream
+                         (see Components.FastSceneDetect); falls back to pyscenedetect on error
+        pyscenedetect  - PySceneDetect's ContentDetector on the full-resolution file
+    
     Args:
         video_path: Path to the video file
         threshold: Sensitivity for scene detection (lower = more sensitive, default=12.0)
                   Recommended: 8-15 for higher sensitivity, detects more visual changes
         min_scene_len: Minimum scene length in seconds (default=20.0)
+        method: Detection strategy (default: SCENE_DETECT_METHOD env var, or "fast")
+        target_scenes: Desired number of scenes (default: SCENE_TARGET_COUNT env var, or unset).
+                       The threshold is calibrated from the cached frame-difference series
+                       of the fast detector, so this always uses the fast strategy
     
     Returns:
         List of tuples [(start_time, end_time), ...] representing scene boundaries in seconds
     """
+    if method is None:
+        method = os.getenv("SCENE_DETECT_METHOD", "fast")
+    if target_scenes is None and os.getenv("SCENE_TARGET_COUNT"):
+        target_scenes = int(os.getenv("SCENE_TARGET_COUNT"))
+    if target_scenes:
+        method = "fast"
+    
     try:
-        # Get video duration for adaptive thresholding
+        # Get video duration for adaptive thresholding (container metadata only, no decoding)
+        info = None
         try:
-            video = VideoFileClip(video_path)
-            duration = video.duration
-            video.close()
+            info = probe_media(video_path)
+            duration = info['duration']
             print(f"Video duration: {duration:.2f}s ({duration/60:.1f} minutes)")
             
             # Adaptive threshold based on video length
@@ -41,28 +64,44 @@ def detect_scenes(video_path, threshold=12.0, min_scene_len=20.0):
             print(f"Could not get video duration: {e}")
             duration = None
         
-        print(f"Detecting scenes in video using frame-based analysis...")
+        print(f"Detecting scenes in video using frame-based analysis ({method})...")
         print(f"Parameters: threshold={threshold}, min_scene_len={min_scene_len}s")
         
-        # Use ContentDetector with frame-based analysis (default in pySceneDetect)
-        # ContentDetector measures the difference between consecutive frames
-        # This is purely visual analysis, independent of audio
-        scene_list = detect(
-            video_path, 
-            ContentDetector(threshold=threshold, min_scene_len=int(min_scene_len * 30))
-        )
+        scenes = None
+        if method == "probe":
+            try:
+                scenes = probe_detect_scenes(video_path, threshold, min_scene_len, info=info)
+            except Exception as e:
+                print(f"Packet probe scene detection failed ({e}), falling back to fast detection")
+                method = "fast"
         
-        # Convert to list of (start_time, end_time) tuples in seconds
-        scenes = []
-        for i, scene in enumerate(scene_list):
-            start_time = scene[0].get_seconds()
-            end_time = scene[1].get_seconds()
-            duration_scene = end_time - start_time
+        if scenes is None and method == "fast":
+            try:
+                scenes = fast_detect_scenes(video_path, threshold, min_scene_len, info=info, target_scenes=target_scenes)
+            except Exception as e:
+                print(f"Fast scene detection failed ({e}), falling back to PySceneDetect")
+        
+        if scenes is None:
+            # Use ContentDetector with frame-based analysis (default in pySceneDetect)
+            # ContentDetector measures the difference between consecutive frames
+            # This is purely visual analysis, independent of audio
+            # min_scene_len is in frames: use the real source frame rate
+            fps = info['fps'] if info and info['fps'] > 0 else 30.0
+            scene_list = detect(
+                video_path, 
+                ContentDetector(threshold=threshold, min_scene_len=int(min_scene_len * fps))
+            )
             
-            # Enforce max segment length constraint (15-20 seconds)
-            # If a scene is longer than 20 seconds, we'll let LLM handle splitting if needed
-            # But we still report it as-is
-            scenes.append((start_time, end_time))
+            # Convert to list of (start_time, end_time) tuples in seconds
+            scenes = []
+            for i, scene in enumerate(scene_list):
+                start_time = scene[0].get_seconds()
+                end_time = scene[1].get_seconds()
+                
+                # Enforce max segment length constraint (15-20 seconds)
+                # If a scene is longer than 20 seconds, we'll let LLM handle splitting if needed
+                # But we still report it as-is
+                scenes.append((start_time, end_time))
         
         print(f"✓ Detected {len(scenes)} scenes in the video")
         
@@ -87,11 +126,8 @@ def detect_scenes(video_path, threshold=12.0, min_scene_len=20.0):
         print(f"Error detecting scenes: {e}")
         print(f"Falling back to simple time-based segmentation")
         # Fallback: create 10-second segments
-        from moviepy.editor import VideoFileClip
         try:
-            video = VideoFileClip(video_path)
-            duration = video.duration
-            video.close()
+            duration = probe_media(video_path)['duration']
             
             scenes = []
             segment_length = 10.0
@@ -239,14 +275,21 @@ def convert_scenes_to_segments(scenes):
         return []
 
 
-def analyze_scenes_with_vision(video_path, scenes):
+def analyze_scenes_with_vision(video_path, scenes, max_concurrency=None, batch_size=None):
     """
     Extract key frames from each scene and analyze them with vision AI.
     This provides rich visual descriptions of what's in each scene.
     
+    Vision requests are issued concurrently (see analyze_scenes_with_vision_async);
+    this wrapper keeps the original synchronous interface for callers.
+    
     Args:
         video_path: Path to the video file
         scenes: List of (start_time, end_time) tuples
+        max_concurrency: Maximum number of in-flight vision requests
+                         (default: VISION_MAX_CONCURRENCY env var, or 4)
+        batch_size: Number of scene frames sent per vision request
+                    (default: VISION_BATCH_SIZE env var, or 1 = one call per scene)
     
     Returns:
         List of dicts with scene info and visual analysis:
@@ -262,113 +305,452 @@ def analyze_scenes_with_vision(video_path, scenes):
         ]
     """
     try:
-        from moviepy.editor import VideoFileClip
-        import tempfile
-        import os as os_module
-        
-        print("Analyzing scene content with vision AI...")
-        
-        video = VideoFileClip(video_path)
-        scene_analysis = []
-        
-        for scene_idx, (scene_start, scene_end) in enumerate(scenes):
-            try:
-                # Extract frame from middle of scene for analysis
-                frame_time = scene_start + (scene_end - scene_start) / 2
-                frame = video.get_frame(frame_time)
-                
-                # Save frame temporarily
-                with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp_file:
-                    from PIL import Image
-                    img = Image.fromarray((frame * 255).astype('uint8'))
-                    img.save(tmp_file.name)
-                    temp_frame_path = tmp_file.name
-                
-                # Analyze frame with vision API
-                frame_description = analyze_frame_with_gpt(temp_frame_path)
-                
-                # Clean up temp file
-                os_module.unlink(temp_frame_path)
-                
-                duration = scene_end - scene_start
-                scene_analysis.append({
-                    'scene_index': scene_idx,
-                    'scene_start': scene_start,
-                    'scene_end': scene_end,
-                    'duration': duration,
-                    'frame_description': frame_description
-                })
-                
-                print(f"  Scene {scene_idx + 1}: {frame_description}")
-                
-            except Exception as e:
-                print(f"  Warning: Could not analyze scene {scene_idx + 1}: {e}")
-                # Fallback to basic description
-                duration = scene_end - scene_start
-                scene_analysis.append({
-                    'scene_index': scene_idx,
-                    'scene_start': scene_start,
-                    'scene_end': scene_end,
-                    'duration': duration,
-                    'frame_description': f"Scene with duration {duration:.1f}s"
-                })
-                continue
-        
-        video.close()
-        
-        print(f"✓ Analyzed {len(scene_analysis)} scenes with vision AI\n")
-        return scene_analysis
-        
+        return _run_coroutine(analyze_scenes_with_vision_async(video_path, scenes, max_concurrency, batch_size))
     except Exception as e:
         print(f"Error analyzing scenes with vision: {e}")
         print("Falling back to basic scene analysis")
         return convert_scenes_to_segments(scenes)
 
 
-def analyze_frame_with_gpt(frame_path):
+async def analyze_scenes_with_vision_async(video_path, scenes, max_concurrency=None, batch_size=None):
+    """
+    Asyncio variant of analyze_scenes_with_vision.
+    
+    Key frames are extracted first, then described with describe_frames_async.
+    When there are more scenes than the job's remaining vision budget
+    (VISION_MAX_CALLS_PER_JOB), scenes are clustered by look (see
+    Components.SceneClustering) and only cluster representatives are
+    described; members reuse their representative's description.
+    Results are returned in scene order, and each scene falls back to a basic
+    description if its analysis fails.
+    
+    Args:
+        video_path: Path to the video file
+        scenes: List of (start_time, end_time) tuples
+        max_concurrency: Maximum number of in-flight vision requests
+        batch_size: Number of scene frames sent per vision request
+    
+    Returns:
+        Same structure as analyze_scenes_with_vision
+    """
+    from Components.KeyframeExtractor import extract_frames
+    
+    print("Analyzing scene content with vision AI...")
+    
+    # Extract one key frame from the middle of each scene in a single forward decode,
+    # scaled down to the vision resolution while decoding
+    frame_times = [scene_start + (scene_end - scene_start) / 2 for scene_start, scene_end in scenes]
+    frames = extract_frames(video_path, frame_times, max_edge=int(os.getenv("VISION_MAX_EDGE", "768")))
+    for scene_idx, frame in enumerate(frames):
+        if frame is None:
+            print(f"  Warning: Could not extract frame for scene {scene_idx + 1}")
+    
+    # Over the per-job vision budget, describe one representative per group of similar-looking scenes
+    valid = [i for i, frame in enumerate(frames) if frame is not None]
+    budget = _vision_frame_budget(batch_size)
+    descriptions = None
+    if budget is not None and len(valid) > budget:
+        try:
+            from Components.SceneClustering import scene_embeddings, cluster_scenes
+            representatives, labels = cluster_scenes(scene_embeddings([frames[i] for i in valid]), budget)
+            print(f"  {len(valid)} scenes exceed the vision budget ({budget} frames): "
+                  f"describing {len(representatives)} cluster representatives")
+            rep_descriptions = await describe_frames_async(
+                [frames[valid[r]] for r in representatives], max_concurrency, batch_size
+            )
+            descriptions = [None] * len(frames)
+            for j, i in enumerate(valid):
+                descriptions[i] = rep_descriptions[labels[j]]
+        except Exception as e:
+            print(f"  Warning: Scene clustering failed ({e}); describing every scene")
+    if descriptions is None:
+        descriptions = await describe_frames_async(frames, max_concurrency, batch_size)
+    
+    scene_analysis = []
+    for scene_idx, ((scene_start, scene_end), description) in enumerate(zip(scenes, descriptions)):
+        duration = scene_end - scene_start
+        if description is None:
+            # Fallback to basic description
+            description = f"Scene with duration {duration:.1f}s"
+        scene_analysis.append({
+            'scene_index': scene_idx,
+            'scene_start': scene_start,
+            'scene_end': scene_end,
+            'duration': duration,
+            'frame_description': description
+        })
+        print(f"  Scene {scene_idx + 1}: {description}")
+    
+    print(f"✓ Analyzed {len(scene_analysis)} scenes with vision AI\n")
+    return scene_analysis
+
+
+def _resolve_batch_size(batch_size):
+    if batch_size is None:
+        batch_size = int(os.getenv("VISION_BATCH_SIZE", "1"))
+    return max(1, min(int(batch_size), MAX_FRAMES_PER_REQUEST))
+
+
+def _vision_frame_budget(batch_size=None):
+    """
+    Frames the current job may still send to vision, or None if unlimited.
+    
+    VISION_MAX_CALLS_PER_JOB (default 60; 0 disables) caps vision requests per
+    job; requests already made in this job (see Components.LLMTelemetry) count
+    against it, and each request carries up to batch_size frames.
+    """
+    from Components.LLMTelemetry import current_job, get_job_summary
+    
+    max_calls = int(os.getenv("VISION_MAX_CALLS_PER_JOB", "60"))
+    if max_calls <= 0:
+        return None
+    used = 0
+    job_id = current_job()
+    if job_id is not None:
+        by_name = get_job_summary(job_id)['by_name']
+        used = sum(by_name.get(name, {}).get('calls', 0) for name in ('vision', 'vision_batch'))
+    return max(1, max_calls - used) * _resolve_batch_size(batch_size)
+
+
+def describe_frames(frames, max_concurrency=None, batch_size=None):
+    """
+    Synchronous wrapper around describe_frames_async.
+    """
+    return _run_coroutine(describe_frames_async(frames, max_concurrency, batch_size))
+
+
+async def describe_frames_async(frames, max_concurrency=None, batch_size=None):
+    """
+    Describe a list of frames with the vision model.
+    
+    Near-duplicate frames within this job (dHash within VISION_DEDUP_MAX_DISTANCE
+    bits, default 6; set to -1 to disable) are described once. Frames whose exact
+    hash was described in an earlier job reuse that description from the
+    persistent store in Components.FrameHash; flat frames (black, blank) are
+    never shared across jobs.
+    The remaining frames are grouped into batches of `batch_size` (several images per request,
+    see analyze_frames_batch_with_gpt_async) and the requests are issued
+    concurrently, bounded by a semaphore (max_concurrency) and queued as bulk
+    requests in the process-wide scheduler from Components.RateLimiter.
+    
+    Args:
+        frames: List of image paths or RGB uint8 arrays (None entries are skipped)
+        max_concurrency: Maximum number of in-flight vision requests
+                         (default: VISION_MAX_CONCURRENCY env var, or 4)
+        batch_size: Number of frames per request
+                    (default: VISION_BATCH_SIZE env var, or 1)
+    
+    Returns:
+        List of descriptions aligned with frames (None where analysis failed)
+    """
+    from Components.FrameHash import dhash, dhash_file, group_near_duplicates, get_description_store, is_informative
+    from Components.LLMTelemetry import record_cache_hits
+    
+    if max_concurrency is None:
+        max_concurrency = int(os.getenv("VISION_MAX_CONCURRENCY", "4"))
+    max_concurrency = max(1, int(max_concurrency))
+    batch_size = _resolve_batch_size(batch_size)
+    
+    max_distance = int(os.getenv("VISION_DEDUP_MAX_DISTANCE", "6"))
+    descriptions = [None] * len(frames)
+    
+    # Perceptual-hash deduplication: reuse descriptions of exactly matching frames from
+    # earlier jobs (a near match could be another user's similar-looking frame), and only
+    # describe one representative per group of near-identical frames in this job
+    hashes = [None] * len(frames)
+    store = None
+    if max_distance >= 0:
+        store = get_description_store()
+        for i, frame in enumerate(frames):
+            if frame is not None:
+                hashes[i] = dhash_file(frame) if isinstance(frame, str) else dhash(frame)
+                if hashes[i] is not None and is_informative(hashes[i]):
+                    descriptions[i] = store.lookup(hashes[i], max_distance=0)
+        mapping = group_near_duplicates(
+            [h if descriptions[i] is None else None for i, h in enumerate(hashes)],
+            max_distance
+        )
+    else:
+        mapping = [None] * len(frames)
+    
+    cached = sum(1 for d in descriptions if d is not None)
+    duplicates = sum(1 for i, rep in enumerate(mapping) if rep is not None and rep != i)
+    record_cache_hits("vision", "gpt-4o", cached + duplicates)
+    pending = [
+        i for i, frame in enumerate(frames)
+        if frame is not None and descriptions[i] is None and mapping[i] in (None, i)
+    ]
+    if cached or duplicates:
+        print(f"  Reusing descriptions: {cached} cached, {duplicates} near-duplicate frames")
+    
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+    print(f"  Describing {len(pending)} frames in {len(batches)} request(s) "
+          f"(batch_size={batch_size}, concurrency={max_concurrency})")
+    
+    semaphore = asyncio.Semaphore(max_concurrency)
+    
+    async def describe_single(idx):
+        try:
+            async with semaphore:
+                descriptions[idx] = await analyze_frame_with_gpt_async(frames[idx])
+        except Exception as e:
+            print(f"  Warning: Could not analyze frame {idx + 1}: {e}")
+    
+    async def describe_batch(indices):
+        if len(indices) == 1:
+            await describe_single(indices[0])
+            return
+        try:
+            async with semaphore:
+                results = await analyze_frames_batch_with_gpt_async([frames[i] for i in indices])
+        except Exception as e:
+            print(f"  Warning: Batched vision request failed ({e}); retrying frames individually")
+            results = [None] * len(indices)
+        
+        # Frames the model skipped fall back to a single-frame request
+        missing = [idx for idx, result in zip(indices, results) if not result]
+        for idx, result in zip(indices, results):
+            if result:
+                descriptions[idx] = result
+        if missing:
+            await asyncio.gather(*[describe_single(idx) for idx in missing])
+    
+    await asyncio.gather(*[describe_batch(batch) for batch in batches])
+    
+    # Drop fallback strings so they are neither propagated nor cached
+    for idx in pending:
+        if descriptions[idx] == VISION_FALLBACK_DESCRIPTION:
+            descriptions[idx] = None
+    
+    for i, rep in enumerate(mapping):
+        if rep is not None and rep != i and descriptions[i] is None:
+            descriptions[i] = descriptions[rep]
+    
+    if store is not None:
+        for idx in pending:
+            if descriptions[idx] and hashes[idx] is not None and is_informative(hashes[idx]):
+                store.add(hashes[idx], descriptions[idx])
+        store.save()
+    
+    return descriptions
+
+
+def _run_coroutine(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+    
+    API jobs run in worker threads without an event loop, so asyncio.run is
+    used directly. If a loop is already running in this thread, the coroutine
+    is executed on a fresh loop in a helper thread instead.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    
+    from concurrent.futures import ThreadPoolExecutor
+    import contextvars
+    # Copy the context so per-job telemetry still attributes calls to this job
+    context = contextvars.copy_context()
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        return executor.submit(context.run, asyncio.run, coro).result()
+
+
+VISION_FALLBACK_DESCRIPTION = "Scene content analysis unavailable"
+
+VISION_PROMPT = "Briefly describe what you see in this video frame. Focus on: people present, their activities, emotions, setting, key details. Keep it to 1-2 sentences."
+
+
+def downscale_frame(frame, max_edge=None):
+    """
+    Downscale an RGB frame so its longest edge is at most max_edge pixels.
+    
+    Args:
+        frame: HxWx3 array (uint8, or float in [0, 1])
+        max_edge: Longest edge in pixels (default: VISION_MAX_EDGE env var, or 768; 0 keeps full size)
+    
+    Returns:
+        uint8 array
+    """
+    import cv2
+    
+    if max_edge is None:
+        max_edge = int(os.getenv("VISION_MAX_EDGE", "768"))
+    frame = np.asarray(frame)
+    if frame.dtype != np.uint8:
+        # Float frames are in [0, 1]; moviepy already returns uint8
+        frame = (np.clip(frame, 0, 1) * 255).astype(np.uint8)
+    h, w = frame.shape[:2]
+    if max_edge and max(h, w) > max_edge:
+        scale = max_edge / max(h, w)
+        frame = cv2.resize(frame, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    return frame
+
+
+def encode_image_for_vision(image, max_edge=None, quality=None):
+    """
+    Encode an image as a base64 JPEG entirely in memory.
+    
+    Args:
+        image: Image path or RGB array
+        max_edge: Longest edge in pixels (default: VISION_MAX_EDGE env var, or 768)
+        quality: JPEG quality 1-95 (default: VISION_JPEG_QUALITY env var, or 80)
+    
+    Returns:
+        Base64-encoded JPEG string
+    """
+    from PIL import Image
+    import base64
+    import io
+    
+    if quality is None:
+        quality = int(os.getenv("VISION_JPEG_QUALITY", "80"))
+    
+    if isinstance(image, str):
+        with Image.open(image) as img:
+            frame = np.asarray(img.convert('RGB'))
+    else:
+        frame = image
+    
+    buffer = io.BytesIO()
+    Image.fromarray(downscale_frame(frame, max_edge)).save(buffer, format='JPEG', quality=quality)
+    return base64.standard_b64encode(buffer.getvalue()).decode('utf-8')
+
+
+def _image_content(image):
+    """Build an image_url content part, honouring VISION_IMAGE_DETAIL (low/high/auto)."""
+    image_url = {"url": f"data:image/jpeg;base64,{encode_image_for_vision(image)}"}
+    detail = os.getenv("VISION_IMAGE_DETAIL", "auto")
+    if detail in ("low", "high"):
+        image_url["detail"] = detail
+    return {"type": "image_url", "image_url": image_url}
+
+
+def _build_vision_message(frame):
+    from langchain_core.messages import HumanMessage
+    
+    return HumanMessage(
+        content=[
+            _image_content(frame),
+            {
+                "type": "text",
+                "text": VISION_PROMPT
+            }
+        ],
+    )
+
+
+def analyze_frame_with_gpt(frame):
     """
     Use GPT-4 Vision to analyze a frame and describe what's happening.
     
     Args:
-        frame_path: Path to the frame image
+        frame: Path to the frame image, or an RGB frame array
     
     Returns:
         Description of what's in the frame
     """
     try:
-        from langchain_openai import ChatOpenAI
-        from langchain_core.messages import HumanMessage
-        import base64
+        from Components.LLMClient import get_chat_model, invoke_llm
+        from Components.RateLimiter import PRIORITY_BULK
         
-        # Read and encode the image
-        with open(frame_path, 'rb') as f:
-            image_data = base64.standard_b64encode(f.read()).decode('utf-8')
+        llm = get_chat_model("gpt-4o", temperature=0.7)
+        message = _build_vision_message(frame)
         
-        llm = ChatOpenAI(model="gpt-4o", temperature=0.7)
+        response = invoke_llm(llm, [message], name="vision", model="gpt-4o", priority=PRIORITY_BULK)
+        description = response.content if hasattr(response, 'content') else str(response)
         
-        message = HumanMessage(
-            content=[
-                {
-                    "type": "image_url",
-                    "image_url": {
-                        "url": f"data:image/jpeg;base64,{image_data}",
-                    },
-                },
-                {
-                    "type": "text",
-                    "text": "Briefly describe what you see in this video frame. Focus on: people present, their activities, emotions, setting, key details. Keep it to 1-2 sentences."
-                }
-            ],
-        )
+        return description.strip()
+        
+    except Exception as e:
+        print(f"Error analyzing frame with GPT: {e}")
+        return VISION_FALLBACK_DESCRIPTION
+
+
+async def analyze_frame_with_gpt_async(frame):
+    """
+    Async counterpart of analyze_frame_with_gpt (same prompt, same fallback).
+    """
+    try:
+        from Components.LLMClient import get_chat_model, ainvoke_llm
+        from Components.RateLimiter import PRIORITY_BULK
+        
+        llm = get_chat_model("gpt-4o", temperature=0.7)
+        message = _build_vision_message(frame)
         
-        response = llm.invoke([message])
+        response = await ainvoke_llm(llm, [message], name="vision", model="gpt-4o", priority=PRIORITY_BULK)
         description = response.content if hasattr(response, 'content') else str(response)
         
         return description.strip()
         
     except Exception as e:
         print(f"Error analyzing frame with GPT: {e}")
-        return "Scene content analysis unavailable"
+        return VISION_FALLBACK_DESCRIPTION
+
+
+class FrameDescription(BaseModel):
+    """
+    Description of a single labelled frame in a batched vision request.
+    """
+    frame: int = Field(description="Frame number as labelled in the request (1-based)")
+    description: str = Field(description="1-2 sentence description of the frame")
+
+
+class FrameBatchResponse(BaseModel):
+    """
+    Per-frame descriptions for a batched vision request.
+    """
+    frames: list[FrameDescription] = Field(description="One entry per labelled frame")
+
+
+# gpt-4o accepts many images per message; beyond ~10 the per-frame detail drops off
+MAX_FRAMES_PER_REQUEST = 10
+
+
+def _build_vision_batch_message(frames):
+    from langchain_core.messages import HumanMessage
+    
+    content = [{
+        "type": "text",
+        "text": (
+            f"You will see {len(frames)} video frames, each preceded by its label (Frame 1 to Frame {len(frames)}). "
+            "Describe every frame separately. " + VISION_PROMPT.replace("this video frame", "each frame")
+        )
+    }]
+    for n, frame in enumerate(frames, 1):
+        content.append({"type": "text", "text": f"Frame {n}:"})
+        content.append(_image_content(frame))
+    return HumanMessage(content=content)
+
+
+async def analyze_frames_batch_with_gpt_async(frames):
+    """
+    Describe several frames with a single GPT-4o request.
+    
+    The frames are sent as labelled images in one message and the model returns
+    a structured per-frame list (FrameBatchResponse).
+    
+    Args:
+        frames: List of frame image paths or RGB arrays
+    
+    Returns:
+        List of descriptions aligned with frames; entries the model did not
+        return are None so the caller can fall back per frame.
+    """
+    from Components.LLMClient import get_chat_model, ainvoke_llm
+    from Components.RateLimiter import PRIORITY_BULK
+    
+    llm = get_chat_model("gpt-4o", temperature=0.7)
+    chain = llm.with_structured_output(FrameBatchResponse, method="function_calling")
+    message = _build_vision_batch_message(frames)
+    
+    response = await ainvoke_llm(chain, [message], name="vision_batch", model="gpt-4o", priority=PRIORITY_BULK)
+    
+    descriptions = [None] * len(frames)
+    for item in (response.frames if response else []):
+        if 1 <= item.frame <= len(frames) and item.description:
+            descriptions[item.frame - 1] = item.description.strip()
+    return descriptions
 
 
 
@@ -0,0 +1,115 @@
+from bisect import bisect_left
+
+SENTENCE_END_CHARS = ('.', '?', '!')
+
+
+class BoundaryIndex:
+    """
+    Sorted sentence and word boundary times built from Whisper word timestamps.
+
+    Snapping a time is a binary search (O(log n)) over the relevant boundary
+    list. Segments without word timestamps contribute their own start/end as
+    both word and sentence boundaries.
+    """
+
+    def __init__(self, transcriptions):
+        word_starts, word_ends = [], []
+        sentence_starts, sentence_ends = [], []
+        at_sentence_start = True
+
+        for seg in transcriptions:
+            words = seg.get('words') or []
+            if not words:
+                word_starts.append(seg['start'])
+                word_ends.append(seg['end'])
+                if at_sentence_start:
+                    sentence_starts.append(seg['start'])
+                at_sentence_start = seg['text'].strip().endswith(SENTENCE_END_CHARS)
+                if at_sentence_start:
+                    sentence_ends.append(seg['end'])
+                continue
+
+            for word in words:
+                if word['start'] is None or word['end'] is None:
+                    continue
+                word_starts.append(word['start'])
+                word_ends.append(word['end'])
+                if at_sentence_start:
+                    sentence_starts.append(word['start'])
+                at_sentence_start = word['text'].strip().endswith(SENTENCE_END_CHARS)
+                if at_sentence_start:
+                    sentence_ends.append(word['end'])
+
+        # The end of the transcript always closes a sentence
+        if word_ends and (not sentence_ends or sentence_ends[-1] != max(word_ends)):
+            sentence_ends.append(max(word_ends))
+
+        self.word_starts = sorted(word_starts)
+        self.word_ends = sorted(word_ends)
+        self.sentence_starts = sorted(sentence_starts)
+        self.sentence_ends = sorted(sentence_ends)
+
+    @staticmethod
+    def _nearest(boundaries, t):
+        if not boundaries:
+            return None
+        i = bisect_left(boundaries, t)
+        candidates = boundaries[max(0, i - 1):i + 1]
+        return min(candidates, key=lambda b: abs(b - t))
+
+    def snap_start(self, t, max_shift=3.0):
+        """Nearest sentence start within max_shift seconds, else the nearest word start."""
+        sentence = self._nearest(self.sentence_starts, t)
+        if sentence is not None and abs(sentence - t) <= max_shift:
+            return sentence
+        word = self._nearest(self.word_starts, t)
+        return word if word is not None else t
+
+    def snap_end(self, t, max_shift=3.0):
+        """Nearest sentence end within max_shift seconds, else the nearest word end."""
+        sentence = self._nearest(self.sentence_ends, t)
+        if sentence is not None and abs(sentence - t) <= max_shift:
+            return sentence
+        word = self._nearest(self.word_ends, t)
+        return word if word is not None else t
+
+
+def snap_segments(segments, index, max_shift=3.0, merge_gap=0.5):
+    """
+    Snap segment edges to sentence/word boundaries, then sort and merge.
+
+    Args:
+        segments: List of dicts with 'start' and 'end' (and optional 'content')
+        index: BoundaryIndex for the source transcript
+        max_shift: Maximum distance (seconds) to move an edge to a sentence boundary
+        merge_gap: Segments closer than this (seconds) are merged
+
+    Returns:
+        New list of segment dicts in timeline order without overlaps
+    """
+    snapped = []
+    for seg in segments:
+        start = index.snap_start(seg['start'], max_shift)
+        end = index.snap_end(seg['end'], max_shift)
+        if end <= start:
+            # Snapping collapsed the segment - keep the original edges
+            start, end = seg['start'], seg['end']
+        if end <= start:
+            continue
+        if abs(start - seg['start']) > 0.01 or abs(end - seg['end']) > 0.01:
+            print(f"  Snapped segment {seg['start']:.2f}s - {seg['end']:.2f}s -> {start:.2f}s - {end:.2f}s")
+        snapped.append({**seg, 'start': start, 'end': end})
+
+    snapped.sort(key=lambda s: s['start'])
+
+    merged = []
+    for seg in snapped:
+        if merged and seg['start'] <= merged[-1]['end'] + merge_gap:
+            prev = merged[-1]
+            print(f"  Merging overlapping segments {prev['start']:.2f}s - {prev['end']:.2f}s and {seg['start']:.2f}s - {seg['end']:.2f}s")
+            prev['end'] = max(prev['end'], seg['end'])
+            if seg.get('content') and prev.get('content'):
+                prev['content'] = f"{prev['content']} {seg['content']}"
+            continue
+        merged.append(dict(seg))
+    return merged
@@ -5,15 +5,10 @@ import wave
 import contextlib
 from pydub import AudioSegment
 import os
+from Components.FaceDetector import get_face_detector
 
-# Update paths to the model files
-prototxt_path = "models/deploy.prototxt"
-model_path = "models/res10_300x300_ssd_iter_140000_fp16.caffemodel"
 temp_audio_path = "temp_audio.wav"
 
-# Load DNN model
-net = cv2.dnn.readNetFromCaffe(prototxt_path, model_path)
-
 # Initialize VAD
 vad = webrtcvad.Vad(2)  # Aggressiveness mode from 0 to 3
 
@@ -39,6 +34,10 @@ Frames = [] # [x,y,w,h]
 def detect_faces_and_speakers(input_video_path, output_video_path):
     # Return Frams:
     global Frames
+    # Shared res10 SSD (loaded once per process by the face detection service)
+    net = get_face_detector().net
+    if net is None:
+        raise RuntimeError("Speaker detection needs the res10 face DNN (see FACE_DNN_MODEL)")
     # Extract audio from the video
     extract_audio_from_video(input_video_path, temp_audio_path)
 
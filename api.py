@@ -4,7 +4,7 @@ FastAPI server for video processing with frontend integration support.
 """
 
 from fastapi import FastAPI, File, Form, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel, Field
@@ -16,6 +16,7 @@ import threading
 import time
 from datetime import datetime
 from processor import process_video, process_multi_media
+from Components.LLMTelemetry import job_context, get_job_summary, print_job_summary, export_prometheus
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -100,6 +101,7 @@ class JobStatus(BaseModel):
     transcript: Optional[List[Dict]] = None  # Full transcript with timestamps
     processing_mode: Optional[str] = None  # The mode used for processing
     target_duration_used: Optional[int] = None  # Target duration that was used
+    llm_usage: Optional[Dict] = None  # Per-job LLM latency/tokens/retries/cost summary
 
 
 class JobListItem(BaseModel):
@@ -127,29 +129,33 @@ def process_job(job_id: str, input_source: any, mode: str, add_subtitles: bool,
             jobs[job_id]["status"] = "processing"
             jobs[job_id]["message"] = "Starting processing..."
         
-        # Process the video
-        if isinstance(input_source, list):
-            # Multiple local files
-            result = process_multi_media(
-                file_paths=input_source,
-                add_subtitles=add_subtitles,
-                target_duration=target_duration,
-                progress_callback=update_progress,
-                session_id=job_id,
-                mode=mode
-            )
-        else:
-            # Single URL or local file
-            result = process_video(
-                video_url_or_path=input_source,
-                mode=mode,
-                add_subtitles=add_subtitles,
-                target_duration=target_duration,
-                progress_callback=update_progress,
-                session_id=job_id
-            )
+        # Process the video (LLM calls made during processing are attributed to this job)
+        with job_context(job_id):
+            if isinstance(input_source, list):
+                # Multiple local files
+                result = process_multi_media(
+                    file_paths=input_source,
+                    add_subtitles=add_subtitles,
+                    target_duration=target_duration,
+                    progress_callback=update_progress,
+                    session_id=job_id,
+                    mode=mode
+                )
+            else:
+                # Single URL or local file
+                result = process_video(
+                    video_url_or_path=input_source,
+                    mode=mode,
+                    add_subtitles=add_subtitles,
+                    target_duration=target_duration,
+                    progress_callback=update_progress,
+                    session_id=job_id
+                )
+        
+        print_job_summary(job_id)
         
         with jobs_lock:
+            jobs[job_id]["llm_usage"] = get_job_summary(job_id, clear=True)
             if result["success"]:
                 jobs[job_id]["status"] = "completed"
                 jobs[job_id]["progress"] = 100
@@ -170,6 +176,7 @@ def process_job(job_id: str, input_source: any, mode: str, add_subtitles: bool,
             jobs[job_id]["message"] = "Processing failed"
             jobs[job_id]["error"] = str(e)
             jobs[job_id]["completed_at"] = datetime.now().isoformat()
+            jobs[job_id]["llm_usage"] = get_job_summary(job_id, clear=True)
 
 
 # API Endpoints
@@ -219,6 +226,12 @@ async def health_check():
     }
 
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """Process-wide LLM call metrics in Prometheus text format."""
+    return PlainTextResponse(export_prometheus(), media_type="text/plain; version=0.0.4")
+
+
 @app.post("/api/process", response_model=JobStatus)
 async def create_processing_job(
     background_tasks: BackgroundTasks,
@@ -316,6 +329,7 @@ async def create_processing_job(
             "error": None,
             "video_title": None,
             "segments": None,
+            "llm_usage": None,
             "transcript": None,
             "processing_mode": processing_mode,
             "target_duration_used": process_duration
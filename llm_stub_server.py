@@ -0,0 +1,194 @@
+"""
+Local OpenAI-compatible LLM stub with record/replay.
+
+Implements the chat-completions endpoint used by langchain_openai.ChatOpenAI so
+the pipeline can be benchmarked and load-tested without the live API.
+
+Modes:
+    record  - forward each request to the upstream API, store the response as a
+              cassette and return it (requests already recorded are replayed)
+    replay  - answer only from cassettes; unknown requests get a 404 error
+
+Point the pipeline at the stub with:
+    LLM_BASE_URL=http://localhost:8787/v1
+
+Usage:
+    python llm_stub_server.py --mode record --cassettes cassettes/
+    python llm_stub_server.py --mode replay --latency-ms 800 --jitter-ms 200
+    python llm_stub_server.py --mode replay --latency-ms recorded
+"""
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import time
+
+app = FastAPI(title="ZipClip LLM Stub", version="1.0.0")
+
+# Configuration (overridden by command-line arguments)
+config = {
+    "mode": os.getenv("STUB_MODE", "replay"),
+    "cassette_dir": os.getenv("STUB_CASSETTE_DIR", "cassettes"),
+    "upstream_url": os.getenv("STUB_UPSTREAM_URL", "https://api.openai.com/v1"),
+    # Milliseconds of injected latency, or "recorded" to replay the measured upstream latency
+    "latency_ms": os.getenv("STUB_LATENCY_MS", "0"),
+    "jitter_ms": float(os.getenv("STUB_JITTER_MS", "0")),
+}
+
+# Request fields that influence the completion; everything else (e.g. stream options,
+# user ids) is ignored when matching cassettes
+KEY_FIELDS = [
+    "model", "messages", "tools", "tool_choice", "functions", "function_call",
+    "response_format", "temperature", "top_p", "n", "max_tokens", "max_completion_tokens",
+]
+
+
+def cassette_key(body):
+    """Stable hash of the fields that determine a chat completion."""
+    canonical = {field: body[field] for field in KEY_FIELDS if field in body}
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cassette_path(key):
+    return os.path.join(config["cassette_dir"], f"{key}.json")
+
+
+def load_cassette(key):
+    path = cassette_path(key)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_cassette(key, body, response, latency_ms):
+    os.makedirs(config["cassette_dir"], exist_ok=True)
+    path = cassette_path(key)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({
+            "model": body.get("model"),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "latency_ms": latency_ms,
+            "response": response,
+        }, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+async def inject_latency(cassette):
+    if config["latency_ms"] == "recorded":
+        delay_ms = float(cassette.get("latency_ms") or 0)
+    else:
+        delay_ms = float(config["latency_ms"])
+    if config["jitter_ms"]:
+        delay_ms += random.uniform(-config["jitter_ms"], config["jitter_ms"])
+    if delay_ms > 0:
+        await asyncio.sleep(delay_ms / 1000.0)
+
+
+def openai_error(status_code, message, error_type="invalid_request_error"):
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": error_type, "param": None, "code": None}},
+    )
+
+
+async def forward_upstream(body, authorization):
+    import httpx
+
+    headers = {"Content-Type": "application/json"}
+    api_key = os.getenv("OPENAI_API") or os.getenv("OPENAI_API_KEY")
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+    elif authorization:
+        headers["Authorization"] = authorization
+
+    async with httpx.AsyncClient(timeout=120.0) as client:
+        return await client.post(f"{config['upstream_url']}/chat/completions", json=body, headers=headers)
+
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    if body.get("stream"):
+        return openai_error(400, "Streaming is not supported by the LLM stub")
+
+    key = cassette_key(body)
+    cassette = load_cassette(key)
+
+    if cassette is not None:
+        await inject_latency(cassette)
+        return JSONResponse(content=cassette["response"])
+
+    if config["mode"] != "record":
+        print(f"Cassette miss for {body.get('model')} request {key[:12]}")
+        return openai_error(404, f"No recorded response for request {key[:12]} (run the stub in record mode first)")
+
+    started = time.monotonic()
+    upstream = await forward_upstream(body, request.headers.get("authorization"))
+    latency_ms = (time.monotonic() - started) * 1000.0
+
+    if upstream.status_code != 200:
+        # Pass errors (429s, auth failures) through without recording them
+        try:
+            content = upstream.json()
+        except ValueError:
+            content = {"error": {"message": upstream.text, "type": "upstream_error", "param": None, "code": None}}
+        return JSONResponse(status_code=upstream.status_code, content=content)
+
+    response = upstream.json()
+    save_cassette(key, body, response, latency_ms)
+    print(f"Recorded {body.get('model')} request {key[:12]} ({latency_ms:.0f}ms)")
+    return JSONResponse(content=response)
+
+
+@app.get("/v1/models")
+async def list_models():
+    models = set()
+    if os.path.isdir(config["cassette_dir"]):
+        for fname in os.listdir(config["cassette_dir"]):
+            if fname.endswith(".json"):
+                try:
+                    with open(os.path.join(config["cassette_dir"], fname), "r") as f:
+                        models.add(json.load(f).get("model"))
+                except Exception:
+                    continue
+    return {
+        "object": "list",
+        "data": [{"id": m, "object": "model", "owned_by": "zipclip-stub"} for m in sorted(filter(None, models))],
+    }
+
+
+@app.get("/health")
+async def health_check():
+    return {"status": "healthy", "mode": config["mode"], "cassette_dir": config["cassette_dir"]}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="OpenAI-compatible LLM stub with record/replay")
+    parser.add_argument("--mode", choices=["record", "replay"], default=config["mode"])
+    parser.add_argument("--cassettes", default=config["cassette_dir"], help="Cassette directory")
+    parser.add_argument("--upstream", default=config["upstream_url"], help="Upstream API base URL for record mode")
+    parser.add_argument("--latency-ms", default=config["latency_ms"], help="Injected latency in ms, or 'recorded'")
+    parser.add_argument("--jitter-ms", type=float, default=config["jitter_ms"], help="Uniform +/- latency jitter in ms")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8787)
+    args = parser.parse_args()
+
+    config.update({
+        "mode": args.mode,
+        "cassette_dir": args.cassettes,
+        "upstream_url": args.upstream.rstrip("/"),
+        "latency_ms": args.latency_ms,
+        "jitter_ms": args.jitter_ms,
+    })
+
+    import uvicorn
+    print(f"Starting LLM stub in {args.mode} mode on http://{args.host}:{args.port}/v1")
+    print(f"Set LLM_BASE_URL=http://{args.host}:{args.port}/v1 to route the pipeline through it")
+    uvicorn.run(app, host=args.host, port=args.port)
@@ -3,10 +3,11 @@ from Components.Edit import extractAudio, crop_video, stitch_video_segments
 from Components.Transcription import transcribeAudio
 from Components.LanguageTasks import GetHighlight, GetHighlightMultiSegment, GetHighlightMultiSegmentFromScenes, GetHighlightMultiSegmentFromFrames
 from Components.SceneDetection import detect_scenes, map_transcript_to_scenes, convert_scenes_to_segments, analyze_scenes_with_vision
-from Components.FaceCrop import crop_to_vertical, combine_videos
+from Components.FaceCrop import crop_to_vertical
 from Components.Subtitles import add_subtitles_to_video
 import sys
 import os
+import shutil
 import uuid
 import re
 
@@ -97,7 +98,6 @@ if Vid:
     audio_file = os.path.join(audio_dir, f"audio_{session_id}.wav")
     temp_clip = f"temp_clip_{session_id}.mp4"
     temp_cropped = f"temp_cropped_{session_id}.mp4"
-    temp_subtitled = f"temp_subtitled_{session_id}.mp4"
     
     Audio = extractAudio(Vid, audio_file)
     if Audio:
@@ -247,37 +247,36 @@ if Vid:
                 final_output = os.path.join(output_dir, f"{clean_title}_{session_id}_short.mp4")
                 temp_stitched = f"temp_stitched_{session_id}.mp4"
                 
+                shot_starts = None  # detected by crop_to_vertical unless stitching reports them
                 if len(segments) == 1:
                     # Single segment: use simple crop
                     seg = segments[0]
-                    print(f"Step 1/4: Extracting single segment ({seg['start']:.2f}s - {seg['end']:.2f}s)...")
+                    print(f"Step 1/3: Extracting single segment ({seg['start']:.2f}s - {seg['end']:.2f}s)...")
                     crop_video(Vid, temp_clip, seg['start'], seg['end'])
                 else:
                     # Multiple segments: stitch them together
-                    print(f"Step 1/4: Stitching {len(segments)} segments together...")
-                    if not stitch_video_segments(Vid, segments, temp_stitched):
+                    print(f"Step 1/3: Stitching {len(segments)} segments together...")
+                    shot_starts = []
+                    if not stitch_video_segments(Vid, segments, temp_stitched, shot_starts=shot_starts):
                         print("ERROR: Failed to stitch video segments")
                         sys.exit(1)
                     temp_clip = temp_stitched
 
-                print("Step 2/4: Cropping to vertical format (9:16)...")
-                crop_to_vertical(temp_clip, temp_cropped)
+                print("Step 2/3: Cropping to vertical format (9:16) with audio...")
+                crop_to_vertical(temp_clip, temp_cropped, shot_starts=shot_starts)
                 
                 if add_subtitles:
-                    print("Step 3/4: Adding subtitles to video...")
+                    print("Step 3/3: Adding subtitles to video...")
                     # Pass all segments for correct timing mapping
                     add_subtitles_to_video(
                         temp_cropped, 
-                        temp_subtitled, 
+                        final_output, 
                         transcriptions, 
                         segments=segments
                     )
-                    
-                    print("Step 4/4: Adding audio to final video...")
-                    combine_videos(temp_clip, temp_subtitled, final_output)
                 else:
-                    print("Step 3/3: Adding audio to final video (subtitles skipped)...")
-                    combine_videos(temp_clip, temp_cropped, final_output)
+                    print("Step 3/3: Writing final video (subtitles skipped)...")
+                    shutil.move(temp_cropped, final_output)
                 
                 print(f"\n{'='*60}")
                 print(f"✓ SUCCESS: {final_output} is ready!")
@@ -285,7 +284,7 @@ if Vid:
                 
                 # Clean up temporary files
                 try:
-                    temp_files = [audio_file, temp_clip, temp_cropped, temp_subtitled, temp_stitched]
+                    temp_files = [audio_file, temp_clip, temp_cropped, temp_stitched]
                     for temp_file in temp_files:
                         if os.path.exists(temp_file):
                             os.remove(temp_file)
@@ -3,17 +3,22 @@ Video Processor Wrapper
 Wraps the main video processing logic for API usage without modifying core functionality.
 """
 
-from moviepy.editor import VideoFileClip, ImageClip
 from Components.YoutubeDownloader import download_youtube_video
 from Components.Edit import extractAudio, crop_video, stitch_video_segments, apply_background_music
 from Components.Transcription import transcribeAudio
 from Components.LanguageTasks import GetHighlight, GetHighlightMultiSegment, GetHighlightMultiSegmentFromFrames, GetCoherentHighlights, GetMusicMood
-from Components.SceneDetection import detect_scenes, analyze_scenes_with_vision, analyze_frame_with_gpt
-from Components.FaceCrop import crop_to_vertical, combine_videos
+from Components.SceneDetection import detect_scenes, analyze_scenes_with_vision, analyze_frame_with_gpt, describe_frames
+from Components.FaceCrop import crop_to_vertical
+from Components.SegmentSnapping import BoundaryIndex, snap_segments
+from Components.KeyframeExtractor import extract_frame
+from Components.MediaProbe import probe_media
+from Components.HighlightScorer import score_windows, select_top_windows, build_prefiltered_transcript, local_highlight, local_multi_segment
 from Components.Subtitles import add_subtitles_to_video
 from Components.Music import select_and_download_music
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
 import os
-import tempfile
+import shutil
 import uuid
 import re
 from typing import Callable, Optional, Dict, List, Tuple
@@ -30,6 +35,22 @@ def clean_filename(title: str) -> str:
     return cleaned[:80]
 
 
+def _submit(executor, fn, *args):
+    """Submit fn to the executor in a copy of the caller's context (keeps the LLM job attribution)."""
+    ctx = contextvars.copy_context()
+    return executor.submit(ctx.run, fn, *args)
+
+
+def _prepare_music(theme, media_metadata):
+    """Pick a music mood for the theme and fetch a matching track (None if unavailable)."""
+    try:
+        mood = GetMusicMood(theme, media_metadata)
+        return select_and_download_music(mood)
+    except Exception as e:
+        print(f"Background music preparation failed: {e}")
+        return None
+
+
 def process_video(
     video_url_or_path: str,
     mode: str = 'continuous',
@@ -90,7 +111,6 @@ def process_video(
         audio_file = os.path.join(audio_dir, f"audio_{session_id}.wav")
         temp_clip = f"temp_clip_{session_id}.mp4"
         temp_cropped = f"temp_cropped_{session_id}.mp4"
-        temp_subtitled = f"temp_subtitled_{session_id}.mp4"
         temp_stitched = f"temp_stitched_{session_id}.mp4"
         
         Audio = extractAudio(Vid, audio_file)
@@ -110,12 +130,29 @@ def process_video(
         for segment in transcriptions:
             TransText += f"{segment['start']} - {segment['end']}: {segment['text']}\n"
         
+        # Local highlight scoring: 'llm' (default, local scorer only as fallback),
+        # 'prefilter' (send only the top-K scored windows to the LLM) or 'local' (no LLM call)
+        highlight_mode = os.getenv("HIGHLIGHT_MODE", "llm").lower()
+        if highlight_mode == 'prefilter' and mode in ('continuous', 'multi_segment'):
+            top_k = int(os.getenv("HIGHLIGHT_PREFILTER_TOP_K", "8"))
+            window_seconds = target_duration if mode == 'continuous' else 30.0
+            top_windows = select_top_windows(score_windows(transcriptions, window_seconds, Audio), top_k)
+            if top_windows:
+                TransText = build_prefiltered_transcript(transcriptions, top_windows)
+                print(f"Prefiltered transcript to {len(top_windows)} windows ({len(TransText)} characters)")
+        
         # Process based on mode
         segments = None
         
         if mode == 'continuous':
             update_progress("Finding best continuous highlight...", 55)
-            start, stop = GetHighlight(TransText)
+            if highlight_mode == 'local':
+                start, stop = local_highlight(transcriptions, target_duration, Audio)
+            else:
+                start, stop = GetHighlight(TransText)
+                if start is None or stop is None:
+                    print("LLM highlight selection failed - falling back to local scorer")
+                    start, stop = local_highlight(transcriptions, target_duration, Audio)
             
             if start is None or stop is None:
                 return {"success": False, "error": "Failed to get highlight from LLM"}
@@ -124,7 +161,13 @@ def process_video(
         
         elif mode == 'multi_segment':
             update_progress("Finding multiple important segments...", 55)
-            segments = GetHighlightMultiSegment(TransText, target_duration=target_duration)
+            if highlight_mode == 'local':
+                segments = local_multi_segment(transcriptions, target_duration, audio_path=Audio)
+            else:
+                segments = GetHighlightMultiSegment(TransText, target_duration=target_duration)
+                if segments is None:
+                    print("LLM segment selection failed - falling back to local scorer")
+                    segments = local_multi_segment(transcriptions, target_duration, audio_path=Audio)
             
             if segments is None:
                 return {"success": False, "error": "Failed to get segments from LLM"}
@@ -148,6 +191,10 @@ def process_video(
             if segments is None:
                 return {"success": False, "error": "Failed to select scenes from LLM"}
         
+        if mode in ('continuous', 'multi_segment') and segments:
+            # Snap LLM-selected edges to sentence/word boundaries and merge overlaps
+            segments = snap_segments(segments, BoundaryIndex(transcriptions))
+        
         if not segments or len(segments) == 0:
             return {"success": False, "error": "No segments selected"}
         
@@ -157,40 +204,39 @@ def process_video(
         clean_title = clean_filename(video_title) if video_title else "output"
         final_output = os.path.join(output_dir, f"{clean_title}_{session_id}_zipped.mp4")
         
+        shot_starts = None  # detected by crop_to_vertical unless stitching reports them
         if len(segments) == 1:
             update_progress("Extracting single segment...", 75)
             seg = segments[0]
             crop_video(Vid, temp_clip, seg['start'], seg['end'])
         else:
             update_progress(f"Stitching {len(segments)} segments...", 75)
-            if not stitch_video_segments(Vid, segments, temp_stitched):
+            shot_starts = []
+            if not stitch_video_segments(Vid, segments, temp_stitched, shot_starts=shot_starts):
                 return {"success": False, "error": "Failed to stitch video segments"}
             temp_clip = temp_stitched
         
         update_progress("Cropping to vertical format...", 80)
-        crop_to_vertical(temp_clip, temp_cropped)
+        # The cropped clip is encoded with the source audio already muxed in
+        crop_to_vertical(temp_clip, temp_cropped, shot_starts=shot_starts)
         
         if add_subtitles:
             update_progress("Adding subtitles...", 85)
             # Pass all segments for correct timing mapping
             add_subtitles_to_video(
                 temp_cropped, 
-                temp_subtitled, 
+                final_output, 
                 transcriptions, 
                 segments=segments,
                 subtitle_offset=0.0 # Can be made configurable if needed
             )
-            
-            update_progress("Adding audio to final video...", 90)
-            combine_videos(temp_clip, temp_subtitled, final_output)
         else:
-            update_progress("Adding audio to final video...", 90)
-            combine_videos(temp_clip, temp_cropped, final_output)
+            shutil.move(temp_cropped, final_output)
         
         update_progress("Cleaning up temporary files...", 95)
         
         # Clean up temporary files
-        temp_files = [audio_file, temp_clip, temp_cropped, temp_subtitled, temp_stitched]
+        temp_files = [audio_file, temp_clip, temp_cropped, temp_stitched]
         for temp_file in temp_files:
             if os.path.exists(temp_file):
                 try:
@@ -232,6 +278,10 @@ def process_multi_media(
         if progress_callback:
             progress_callback(message, percent)
     
+    # Independent LLM/vision requests run here so their network waits overlap
+    # with transcription, stitching and cropping
+    executor = ThreadPoolExecutor(max_workers=int(os.getenv("LLM_MAX_CONCURRENCY", "4")))
+    
     try:
         output_dir = "output_videos"
         audio_dir = "audio"
@@ -246,8 +296,15 @@ def process_multi_media(
         # Sort files sequentially by filename so users can dictate the order
         file_paths = sorted(file_paths, key=lambda x: os.path.basename(x))
         
-        media_metadata = []
-        temp_clips = [] # Keep track of video clips generated from images
+        # Describe all images in the background so they can share batched vision requests
+        image_paths = [p for p in file_paths if os.path.splitext(p)[1].lower() in ['.jpg', '.jpeg', '.png', '.webp']]
+        image_future = None
+        if image_paths:
+            update_progress(f"Analyzing {len(image_paths)} image(s)...", 10)
+            image_future = _submit(executor, describe_frames, image_paths)
+        
+        # One entry per file in order; vision results are collected once every file is transcribed
+        file_analyses = []
         
         for i, path in enumerate(file_paths):
             update_progress(f"Processing file {i+1}/{len(file_paths)}: {os.path.basename(path)}", 10 + int(i * 30 / len(file_paths)))
@@ -256,17 +313,7 @@ def process_multi_media(
             is_image = ext in ['.jpg', '.jpeg', '.png', '.webp']
             
             if is_image:
-                item = {
-                    'index': len(media_metadata),
-                    'filename': os.path.basename(path),
-                    'path': path,
-                    'type': 'image',
-                    'visual_description': analyze_frame_with_gpt(path),
-                    'duration': 5.0,
-                    'transcript': "",
-                    'file_index': i
-                }
-                media_metadata.append(item)
+                file_analyses.append({'type': 'image', 'path': path, 'file_index': i})
             else:
                 # Video: Transcribe + Quick visual analysis
                 # Extract audio first
@@ -277,52 +324,78 @@ def process_multi_media(
                     transcriptions = transcribeAudio(Audio)
                     if os.path.exists(audio_file): os.remove(audio_file)
                 
-                trans_text = " ".join([seg['text'] for seg in transcriptions])
+                analysis = {
+                    'type': 'video',
+                    'path': path,
+                    'file_index': i,
+                    'transcriptions': transcriptions,
+                    'trans_text': " ".join([seg['text'] for seg in transcriptions]),
+                }
                 
                 if mode == 'scene_based':
-                    from Components.SceneDetection import detect_scenes, analyze_scenes_with_vision
                     scenes = detect_scenes(path)
                     if not scenes:
-                        from moviepy.editor import VideoFileClip
-                        with VideoFileClip(path) as v:
-                            scenes = [(0.0, v.duration)]
-                    scene_segments = analyze_scenes_with_vision(path, scenes)
-                    
-                    for s in scene_segments:
-                        item = {
-                            'index': len(media_metadata),
-                            'filename': os.path.basename(path),
-                            'path': path,
-                            'type': 'video',
-                            'duration': s['duration'],
-                            'visual_description': s.get('frame_description', ''),
-                            'transcript': trans_text, # passing full video transcript is fine for LLM context
-                            'transcriptions_full': transcriptions,
-                            'scene_start': s['scene_start'],
-                            'scene_end': s['scene_end'],
-                            'file_index': i
-                        }
-                        media_metadata.append(item)
+                        scenes = [(0.0, probe_media(path)['duration'])]
+                    analysis['scenes_future'] = _submit(executor, analyze_scenes_with_vision, path, scenes)
                 else:
-                    with VideoFileClip(path) as v:
-                        duration = v.duration
-                        # Analyze first and middle frames
-                        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as tmp:
-                            v.save_frame(tmp.name, t=min(1.0, duration/2))
-                            v_desc = analyze_frame_with_gpt(tmp.name)
-                            os.unlink(tmp.name)
+                    analysis['duration'] = probe_media(path)['duration']
+                    # Analyze an early frame (decoded at vision resolution, encoded in memory)
+                    frame = extract_frame(path, min(1.0, analysis['duration']/2), max_edge=int(os.getenv("VISION_MAX_EDGE", "768")))
+                    analysis['description_future'] = _submit(executor, analyze_frame_with_gpt, frame)
+                file_analyses.append(analysis)
+        
+        update_progress("Collecting visual analysis...", 45)
+        image_descriptions = {}
+        if image_future is not None:
+            for p, desc in zip(image_paths, image_future.result()):
+                image_descriptions[p] = desc or "Scene content analysis unavailable"
+        
+        media_metadata = []
+        temp_clips = [] # Keep track of video clips generated from images
+        
+        for analysis in file_analyses:
+            path = analysis['path']
+            if analysis['type'] == 'image':
+                item = {
+                    'index': len(media_metadata),
+                    'filename': os.path.basename(path),
+                    'path': path,
+                    'type': 'image',
+                    'visual_description': image_descriptions[path],
+                    'duration': 5.0,
+                    'transcript': "",
+                    'file_index': analysis['file_index']
+                }
+                media_metadata.append(item)
+            elif 'scenes_future' in analysis:
+                for s in analysis['scenes_future'].result():
                     item = {
                         'index': len(media_metadata),
                         'filename': os.path.basename(path),
                         'path': path,
                         'type': 'video',
-                        'duration': duration,
-                        'visual_description': v_desc,
-                        'transcript': trans_text,
-                        'transcriptions_full': transcriptions,
-                        'file_index': i
+                        'duration': s['duration'],
+                        'visual_description': s.get('frame_description', ''),
+                        'transcript': analysis['trans_text'], # passing full video transcript is fine for LLM context
+                        'transcriptions_full': analysis['transcriptions'],
+                        'scene_start': s['scene_start'],
+                        'scene_end': s['scene_end'],
+                        'file_index': analysis['file_index']
                     }
                     media_metadata.append(item)
+            else:
+                item = {
+                    'index': len(media_metadata),
+                    'filename': os.path.basename(path),
+                    'path': path,
+                    'type': 'video',
+                    'duration': analysis['duration'],
+                    'visual_description': analysis['description_future'].result(),
+                    'transcript': analysis['trans_text'],
+                    'transcriptions_full': analysis['transcriptions'],
+                    'file_index': analysis['file_index']
+                }
+                media_metadata.append(item)
         
         update_progress("Finding coherent connections between files...", 50)
         highlights_result = GetCoherentHighlights(media_metadata, target_duration=target_duration)
@@ -333,6 +406,9 @@ def process_multi_media(
         selected_segments = highlights_result['segments']
         theme = highlights_result.get('theme', 'A coherent and engaging short video')
         
+        # Music only depends on the theme: pick and fetch it while the clips are stitched and cropped
+        music_future = _submit(executor, _prepare_music, theme, media_metadata)
+        
         update_progress(f"Generating clips for {len(selected_segments)} segments...", 60)
         
         final_segments = []
@@ -382,15 +458,15 @@ def process_multi_media(
         
         update_progress("Stitching all segments together...", 80)
         # Using None for input_file since segments have file_path
-        if not stitch_video_segments(None, final_segments, temp_stitched, theme=theme):
+        shot_starts = []
+        if not stitch_video_segments(None, final_segments, temp_stitched, theme=theme, shot_starts=shot_starts):
             return {"success": False, "error": "Failed to stitch segments"}
         
         update_progress("Finalizing video format...", 85)
-        crop_to_vertical(temp_stitched, temp_cropped)
+        crop_to_vertical(temp_stitched, temp_cropped, shot_starts=shot_starts)
         
         update_progress("Selecting background music...", 90)
-        mood = GetMusicMood(theme, media_metadata)
-        music_file = select_and_download_music(mood)
+        music_file = music_future.result()
         
         if music_file:
             update_progress("Applying background music with ducking...", 92)
@@ -412,11 +488,9 @@ def process_multi_media(
                 subtitle_offset=0.0
             )
             # Copy subtitled version to final output
-            import shutil
             shutil.copy2(temp_subtitled, final_output)
         else:
             # Copy ready_video (which has music + crop) to final output
-            import shutil
             shutil.copy2(ready_video, final_output)
         
         # Cleanup
@@ -436,3 +510,6 @@ def process_multi_media(
         import traceback
         traceback.print_exc()
         return {"success": False, "error": str(e)}
+    
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline crop-path planner.
+Detections are synthetic crop targets, so no video is needed.
+"""
+
+import numpy as np
+
+from Components.CropPlanner import plan_crop_path, CROP_PLAN_MAX_SPEED
+
+FPS = 30.0
+WINDOW = 600
+MAX_X = 1320
+
+
+def test_path_respects_speed_and_dead_zone():
+    # Subject jitters by a few pixels, then moves far right at frame 150
+    sample_frames = list(range(0, 300, 15))
+    targets = [300 + (5 if i % 2 else -5) if f < 150 else 1000 for i, f in enumerate(sample_frames)]
+    path = plan_crop_path([(0, 300)], [0], sample_frames, targets, FPS, WINDOW, MAX_X)
+
+    assert len(path) == 300
+    assert len(set(path[:60].tolist())) == 1, "jitter inside the dead zone should not move the window"
+    max_step = CROP_PLAN_MAX_SPEED * WINDOW / FPS
+    assert np.max(np.abs(np.diff(path))) <= max_step + 1, "window moved faster than the speed limit"
+    assert abs(int(path[-1]) - 1000) <= 1, "window should settle on the new target"
+    print("✓ Path ignores jitter, respects the speed limit and reaches the target")
+
+
+def test_shots_are_planned_independently():
+    # Two shots with different subjects: the path jumps exactly on the cut
+    ranges = [(0, 90), (90, 180)]
+    sample_frames = [0, 30, 60, 90, 120, 150]
+    targets = [100, 100, 100, 900, None, 900]
+    path = plan_crop_path(ranges, [100, 500], sample_frames, targets, FPS, WINDOW, MAX_X)
+    assert path[89] == 100 and path[90] == 900
+
+    # A shot without detections uses its default
+    path = plan_crop_path(ranges, [100, 500], [0, 30], [100, 100], FPS, WINDOW, MAX_X)
+    assert set(path[90:].tolist()) == {500}
+    print("✓ Shots snap on cuts and fall back to their defaults")
+
+
+if __name__ == "__main__":
+    test_path_respects_speed_and_dead_zone()
+    test_shots_are_planned_independently()
+    print("\nAll crop planner tests passed!")
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Test script for per-shot crop framing: sample allocation and shot detection
+on a synthetic clip (generated with ffmpeg's lavfi sources).
+"""
+
+import os
+import subprocess
+import tempfile
+
+import pytest
+
+from Components.FaceCrop import _allocate_samples, detect_shot_starts, CROP_SAMPLE_TOTAL, CROP_SHOT_MIN_SAMPLES
+from Components.FastSceneDetect import get_ffmpeg_exe
+
+
+def test_sample_total_is_capped():
+    few = [(i * 300, (i + 1) * 300) for i in range(4)]
+    indices, shots = _allocate_samples(few)
+    assert len(indices) == CROP_SAMPLE_TOTAL and sorted(set(shots)) == [0, 1, 2, 3]
+
+    for num_shots in (25, 40, 200):
+        ranges = [(i * 50, (i + 1) * 50) for i in range(num_shots)]
+        indices, shots = _allocate_samples(ranges)
+        assert len(indices) <= CROP_SAMPLE_TOTAL, (num_shots, len(indices))
+        assert all(ranges[s][0] <= i < ranges[s][1] for i, s in zip(indices, shots))
+        if num_shots * CROP_SHOT_MIN_SAMPLES <= CROP_SAMPLE_TOTAL:
+            assert len(set(shots)) == num_shots
+    print(f"✓ At most {CROP_SAMPLE_TOTAL} samples for 4 to 200 shots")
+
+
+def test_shot_detection_ignores_motion(monkeypatch):
+    # 4 s of moving test pattern, a 3 s solid shot, then 3 s of test pattern again
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the probe cache out of the working tree
+        monkeypatch.setenv("ZIPCLIP_CACHE_DIR", os.path.join(tmp, "cache"))
+        monkeypatch.delenv("MEDIA_PROBE_CACHE_DIR", raising=False)
+        monkeypatch.delenv("SCENE_DIFF_CACHE_DIR", raising=False)
+        path = os.path.join(tmp, "shots.mp4")
+        subprocess.run([
+            get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y",
+            "-f", "lavfi", "-i", "testsrc2=s=320x180:r=25:d=4",
+            "-f", "lavfi", "-i", "color=c=red:s=320x180:r=25:d=3",
+            "-f", "lavfi", "-i", "testsrc2=s=320x180:r=25:d=3",
+            "-filter_complex", "[0:v][1:v][2:v]concat=n=3:v=1:a=0",
+            "-c:v", "libx264", "-pix_fmt", "yuv420p", path,
+        ], check=True)
+        cuts = detect_shot_starts(path)
+
+    assert len(cuts) == 2, cuts
+    assert abs(cuts[0] - 4.0) <= 0.25 and abs(cuts[1] - 7.0) <= 0.25, cuts
+    print(f"✓ Shot starts {cuts} (motion inside the test pattern is not a cut)")
+
+
+if __name__ == "__main__":
+    test_sample_total_is_capped()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_shot_detection_ignores_motion(monkeypatch)
+    print("\nAll crop shot tests passed!")
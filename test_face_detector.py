@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the batched face detector: the res10 network and the Haar
+cascade are replaced by fakes, so only the mapping of their output to
+source-frame boxes is tested.
+"""
+
+import numpy as np
+import pytest
+
+import Components.FaceDetector as FaceDetectorModule
+from Components.FaceDetector import FaceDetector, DNN_INPUT_SIZE
+
+
+class FakeNet:
+    """Returns the given detection rows, shaped like res10's (1, 1, N, 7) output, once per forward()."""
+
+    def __init__(self, *outputs):
+        self.outputs = list(outputs)
+        self.blobs = []
+
+    def setInput(self, blob):
+        self.blobs.append(blob.shape)
+
+    def forward(self):
+        rows = np.array(self.outputs.pop(0), dtype=np.float32).reshape(-1, 7)
+        return rows[np.newaxis, np.newaxis]
+
+
+class FakeCascade:
+    def __init__(self, faces):
+        self.faces = faces
+        self.gray_shape = None
+
+    def detectMultiScale(self, gray, **kwargs):
+        self.gray_shape = gray.shape
+        return self.faces
+
+
+def dnn_detector(*outputs):
+    detector = FaceDetector(model="models/missing.caffemodel", confidence=0.5)
+    detector.net = FakeNet(*outputs)
+    return detector
+
+
+def test_missing_model_falls_back_to_haar():
+    detector = FaceDetector(model="models/missing.caffemodel")
+    assert detector.backend == "haar" and detector.net is None
+    print("✓ Missing caffemodel selects the Haar backend")
+
+
+def test_dnn_rows_map_to_frames():
+    frames = [np.zeros((360, 640, 3), dtype=np.uint8), np.zeros((1080, 1920, 3), dtype=np.uint8)]
+    detector = dnn_detector([
+        # [image index, class, confidence, x1, y1, x2, y2]
+        [1, 1, 0.9, 0.25, 0.5, 0.5, 0.75],
+        [0, 1, 0.8, 0.1, 0.1, 0.2, 0.3],
+        [0, 1, 0.3, 0.5, 0.5, 0.9, 0.9],    # below the confidence threshold
+        [0, 1, 0.7, -0.1, 0.9, 0.05, 1.2],  # corners outside the frame are clipped
+        [1, 1, 0.9, 0.5, 0.5, 0.5005, 0.6], # thinner than 2 px
+        [5, 1, 0.9, 0.1, 0.1, 0.2, 0.2],    # index beyond the batch
+    ])
+    faces = detector.detect_batch(frames)
+
+    assert detector.net.blobs == [(2, 3, DNN_INPUT_SIZE, DNN_INPUT_SIZE)]
+    assert faces[1] == [(480, 540, 480, 270, pytest.approx(0.9))], faces[1]
+    # Largest first: the 64x72 face before the clipped 32x36 one
+    assert faces[0] == [(64, 36, 64, 72, pytest.approx(0.8)), (0, 324, 32, 36, pytest.approx(0.7))], faces[0]
+    print("✓ DNN rows mapped to their frame, scaled, clipped and filtered by confidence")
+
+
+def test_dnn_batches_split(monkeypatch):
+    monkeypatch.setattr(FaceDetectorModule, "FACE_DNN_BATCH_SIZE", 2)
+    frames = [np.zeros((100, 100, 3), dtype=np.uint8) for _ in range(3)]
+    # Image indices restart at 0 in each forward pass
+    detector = dnn_detector([[1, 1, 0.9, 0.1, 0.1, 0.5, 0.5]], [[0, 1, 0.9, 0.2, 0.2, 0.6, 0.6]])
+    faces = detector.detect_batch(frames)
+
+    assert detector.net.blobs == [(2, 3, DNN_INPUT_SIZE, DNN_INPUT_SIZE), (1, 3, DNN_INPUT_SIZE, DNN_INPUT_SIZE)]
+    assert [len(f) for f in faces] == [0, 1, 1]
+    assert faces[2][0][:2] == (20, 20)
+    print("✓ Frames split into forward passes and mapped back across batches")
+
+
+def test_haar_boxes_scaled_back():
+    detector = FaceDetector(model="models/missing.caffemodel")
+    detector._cascade = FakeCascade([(10, 20, 30, 30), (100, 50, 60, 60)])
+    faces = detector.detect(np.zeros((720, 1280, 3), dtype=np.uint8))
+
+    # Detection runs on a 640x360 copy; boxes come back at full size, largest first
+    assert detector._cascade.gray_shape == (360, 640)
+    assert faces == [(200, 100, 120, 120, 1.0), (20, 40, 60, 60, 1.0)], faces
+    print("✓ Haar boxes from the downscaled copy are scaled back to the frame")
+
+
+if __name__ == "__main__":
+    test_missing_model_falls_back_to_haar()
+    test_dnn_rows_map_to_frames()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_dnn_batches_split(monkeypatch)
+    test_haar_boxes_scaled_back()
+    print("\nAll face detector tests passed!")
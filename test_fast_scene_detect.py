@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Test script for the built-in (ffmpeg stream) scene detector.
+Runs on synthetic frames, so no video file is needed.
+"""
+
+import os
+import subprocess
+import tempfile
+import threading
+
+import numpy as np
+import pytest
+
+import Components.FastSceneDetect as fast_scene_detect
+from Components.FastSceneDetect import hsv_frame_scores, sample_scores, detect_cuts, scenes_from_cuts, merge_chunk_series, propose_packet_cuts, threshold_for_target, verification_cost
+
+
+def make_frames(colors, per_color=5, size=(18, 32)):
+    frames = []
+    for rgb in colors:
+        frame = np.zeros((*size, 3), dtype=np.uint8)
+        frame[:] = rgb
+        frames.extend([frame] * per_color)
+    return np.stack(frames)
+
+
+def test_scores_match_across_batches():
+    frames = make_frames([(200, 30, 30), (30, 200, 30), (30, 30, 200)])
+    whole, _ = hsv_frame_scores(frames)
+    first, last_hsv = hsv_frame_scores(frames[:7])
+    second, _ = hsv_frame_scores(frames[7:], previous=last_hsv)
+    assert np.allclose(whole, np.concatenate([first, second]))
+    assert np.count_nonzero(whole > 10) == 2, whole
+    print("✓ Batched scores are identical to a single pass, cuts at the color changes")
+
+
+def test_cuts_and_min_scene_len():
+    times = np.arange(100) / 10.0  # 10 s sampled at 10 fps
+    scores = np.zeros(100, dtype=np.float32)
+    scores[[5, 30, 33, 80]] = 40.0
+
+    cuts = detect_cuts(times, scores, threshold=12.0, min_scene_len=1.0)
+    assert cuts == [3.0, 8.0], cuts  # 0.5 s and 3.3 s are too close to the previous cut
+
+    scenes = scenes_from_cuts(cuts, duration=10.0)
+    assert scenes == [(0.0, 3.0), (3.0, 8.0), (8.0, 10.0)], scenes
+    assert scenes_from_cuts([], duration=10.0) == []
+    print(f"✓ Scenes: {scenes}")
+
+
+def test_merge_chunk_series_matches_single_pass():
+    fps = 10.0
+    times = np.arange(300) / fps
+    scores = np.random.default_rng(0).random(300).astype(np.float32)
+
+    # Three chunks owning [0, 10), [10, 20), [20, end), each read from 1 s earlier
+    bounds = [(0.0, 10.0), (10.0, 20.0), (20.0, float('inf'))]
+    chunks = []
+    for start, end in bounds:
+        read = (times >= max(0.0, start - 1.0)) & (times < min(end, 30.0))
+        chunk_scores = scores[read].copy()
+        chunk_scores[0] = 0.0  # first frame of a chunk has no predecessor
+        chunks.append((times[read], chunk_scores))
+
+    merged_times, merged_scores = merge_chunk_series(chunks, bounds)
+    assert np.allclose(merged_times, times)
+    assert np.allclose(merged_scores[1:], scores[1:])
+    print("✓ Chunked series merge back into the single-pass series")
+
+
+def test_packet_candidates():
+    fps = 30.0
+    times = np.arange(300) / fps
+    sizes = np.full(300, 2000.0)
+    keyframes = np.zeros(300, dtype=bool)
+    keyframes[[0, 150]] = True
+    sizes[[0, 150]] = 40000.0
+    sizes[90] = 12000.0  # large predicted frame: likely a cut without a keyframe
+    sizes[200] = 3000.0  # ordinary motion
+
+    candidates = propose_packet_cuts(times, sizes, keyframes, fps)
+    assert candidates == [times[90], times[150]], candidates
+    print(f"✓ Packet candidates: {[round(t, 2) for t in candidates]}")
+
+
+def test_verification_cost():
+    times = np.arange(300) / 30.0
+    keyframes = np.zeros(300, dtype=bool)
+    keyframes[::60] = True  # 2 s GOPs
+
+    # Predicted frame 90: decode from keyframe 60 through 90; keyframe 120: decode 60..119 only
+    assert verification_cost(times, keyframes, [times[90]]) == 31
+    assert verification_cost(times, keyframes, [times[120]]) == 60
+    # One candidate per GOP costs about as much as decoding every frame
+    assert verification_cost(times, keyframes, list(times[59::60])) >= len(times) - 5
+    print("✓ Verification cost counts the frames decoded per candidate")
+
+
+def test_threshold_for_target_count():
+    times = np.arange(600) / 10.0  # 60 s at 10 fps
+    scores = np.zeros(600, dtype=np.float32)
+    # Cuts of decreasing strength every 5 s
+    for k, i in enumerate(range(50, 600, 50)):
+        scores[i] = 40.0 - 2.0 * k
+
+    threshold = threshold_for_target(times, scores, target_scenes=5, min_scene_len=1.0)
+    cuts = detect_cuts(times, scores, threshold, min_scene_len=1.0)
+    assert len(cuts) == 4, (threshold, cuts)
+    assert cuts == [5.0, 10.0, 15.0, 20.0], cuts  # the four strongest cuts
+    print(f"✓ Threshold {threshold:.2f} gives {len(cuts) + 1} scenes")
+
+
+def test_sample_scores_use_consecutive_frames():
+    # 30 frames of a slow fade (motion), with a hard cut between frames 12 and 13
+    frames = np.zeros((30, 18, 32, 3), dtype=np.uint8)
+    for i in range(30):
+        frames[i] = (40 + 4 * i, 40, 40) if i <= 12 else (40, 40, 200)
+    deltas, _ = hsv_frame_scores(frames)
+    scores = sample_scores(deltas, step=3.0)  # e.g. 30 fps reduced to 10 samples per second
+
+    assert len(scores) == 10
+    # The cut lands in sample 5 (frames 13-15) even though no sample sits on it
+    assert int(np.argmax(scores)) == 5 and scores[5] == deltas[13], scores
+    # Motion keeps its consecutive-frame score instead of the larger 3-frame delta
+    skipped, _ = hsv_frame_scores(frames[::3])
+    assert scores[2] == max(deltas[4:7]) and scores[2] < skipped[2], (scores[2], skipped[2])
+
+    # Fractional steps: sample k sits on frame ceil(k * step); frame 9 comes after the last sample (frame 8)
+    assert list(sample_scores(np.arange(10, dtype=np.float32), 2.5)) == [0, 3, 5, 8]
+    print(f"✓ Motion scores {scores[2]:.2f} per sample (vs {skipped[2]:.2f} across skipped frames), cut kept")
+
+
+def make_color_clip(path, colors, seconds_each=4, fps=30):
+    """Synthetic clip of solid-color shots (hard cuts between them), encoded with ffmpeg."""
+    cmd = [fast_scene_detect.get_ffmpeg_exe(), "-hide_banner", "-loglevel", "error", "-y"]
+    for color in colors:
+        cmd += ["-f", "lavfi", "-i", f"color=c={color}:s=160x90:r={fps}:d={seconds_each}"]
+    inputs = "".join(f"[{i}:v]" for i in range(len(colors)))
+    cmd += ["-filter_complex", f"{inputs}concat=n={len(colors)}:v=1:a=0", "-c:v", "libx264", "-pix_fmt", "yuv420p", path]
+    subprocess.run(cmd, check=True)
+
+
+def test_parallel_series_uses_several_workers(monkeypatch):
+    with tempfile.TemporaryDirectory() as tmp:
+        # Keep the probe cache out of the working tree
+        monkeypatch.setenv("ZIPCLIP_CACHE_DIR", os.path.join(tmp, "cache"))
+        monkeypatch.delenv("MEDIA_PROBE_CACHE_DIR", raising=False)
+        monkeypatch.delenv("SCENE_DIFF_CACHE_DIR", raising=False)
+        path = os.path.join(tmp, "shots.mp4")
+        make_color_clip(path, ["red", "white", "blue", "black", "yellow", "white"])
+        info = fast_scene_detect.probe_media(path)
+
+        single_times, single_scores = fast_scene_detect.compute_diff_series(path, info=info)
+
+        worker_threads = set()
+        original = fast_scene_detect.compute_diff_series
+
+        def tracking_series(*args, **kwargs):
+            worker_threads.add(threading.current_thread().name)
+            return original(*args, **kwargs)
+
+        fast_scene_detect.compute_diff_series = tracking_series
+        try:
+            times, scores = fast_scene_detect.compute_diff_series_parallel(path, workers=3, info=info)
+        finally:
+            fast_scene_detect.compute_diff_series = original
+
+    assert len(worker_threads) > 1, worker_threads
+    assert len(times) == len(single_times) and np.allclose(times, single_times)
+    cuts = detect_cuts(times, scores, threshold=27.0, min_scene_len=1.0)
+    assert cuts == detect_cuts(single_times, single_scores, threshold=27.0, min_scene_len=1.0), cuts
+    assert [round(c) for c in cuts] == [4, 8, 12, 16, 20], cuts
+    print(f"✓ {len(worker_threads)} chunk workers reproduced the single-pass cuts {cuts}")
+
+
+if __name__ == "__main__":
+    test_scores_match_across_batches()
+    test_cuts_and_min_scene_len()
+    test_merge_chunk_series_matches_single_pass()
+    test_packet_candidates()
+    test_verification_cost()
+    test_threshold_for_target_count()
+    test_sample_scores_use_consecutive_frames()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_parallel_series_uses_several_workers(monkeypatch)
+    print("\nAll fast scene detection tests passed!")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for perceptual-hash frame deduplication.
+"""
+
+import os
+import tempfile
+import numpy as np
+from Components.FrameHash import dhash, hamming_distances, group_near_duplicates, DescriptionStore, is_informative
+
+
+def make_frame(seed):
+    rng = np.random.default_rng(seed)
+    return (rng.random((72, 128, 3)) * 255).astype(np.uint8)
+
+
+def test_near_duplicates_hash_close():
+    frame = make_frame(1)
+    noisy = np.clip(frame.astype(int) + 3, 0, 255).astype(np.uint8)
+    other = make_frame(2)
+    h = dhash(frame)
+    distances = hamming_distances(np.array([dhash(noisy), dhash(other)], dtype=np.uint64), h)
+    assert distances[0] <= 6
+    assert distances[1] > 6
+    print("✓ Near-duplicate frames hash within threshold")
+
+
+def test_group_near_duplicates():
+    a, b = dhash(make_frame(1)), dhash(make_frame(2))
+    assert group_near_duplicates([a, b, a, None]) == [0, 1, 0, None]
+    print("✓ Near-duplicate grouping works")
+
+
+def test_store_roundtrip():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "descriptions.json")
+        h = dhash(make_frame(1))
+        store = DescriptionStore(path)
+        store.add(h, "A person talking to camera")
+        store.save()
+
+        reloaded = DescriptionStore(path)
+        assert reloaded.lookup(h ^ 0b11) == "A person talking to camera"
+        assert reloaded.lookup(dhash(make_frame(2))) is None
+    print("✓ Description store persists and matches near hashes")
+
+
+def test_store_index_and_cross_job_safety():
+    store = DescriptionStore(None, max_entries=3)
+    hashes = [dhash(make_frame(seed)) for seed in range(5)]
+    for i, h in enumerate(hashes):
+        store.add(h, f"frame {i}")
+    # Oldest entries were evicted; the index follows incremental adds and evictions
+    assert len(store) == 3
+    assert store.lookup(hashes[0]) is None
+    assert store.lookup(hashes[4] ^ 0b1) == "frame 4"
+    # Cross-job lookups are exact only
+    assert store.lookup(hashes[4] ^ 0b1, max_distance=0) is None
+    # Flat frames (all-black, blank) hash to near-constant values and are not shareable
+    assert not is_informative(dhash(np.zeros((72, 128, 3), dtype=np.uint8)))
+    assert is_informative(hashes[1])
+    print("✓ Store index stays consistent and cross-job matches are exact")
+
+
+if __name__ == "__main__":
+    test_near_duplicates_hash_close()
+    test_group_near_duplicates()
+    test_store_roundtrip()
+    test_store_index_and_cross_job_safety()
+    print("\n✓ All frame hash tests passed")
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for the threaded decode -> transform -> encode frame pipeline.
+Plain integers stand in for frames, so no video or OpenCV is needed.
+"""
+
+import random
+import time
+
+from Components.FramePipeline import run_frame_pipeline
+
+
+def test_results_arrive_in_frame_order():
+    def transform(index, frame):
+        # Uneven work so workers finish out of order
+        time.sleep(random.random() * 0.005)
+        return frame * 2
+
+    received = []
+    count = run_frame_pipeline(range(200), transform, lambda i, r: received.append((i, r)), workers=4)
+    assert count == 200
+    assert received == [(i, i * 2) for i in range(200)]
+    print("✓ results are consumed in frame order")
+
+
+def test_sink_can_stop_early():
+    decoded = []
+
+    def frames():
+        for i in range(10000):
+            decoded.append(i)
+            yield i
+
+    count = run_frame_pipeline(frames(), lambda i, f: f, lambda i, r: False if i == 10 else None,
+                               workers=2, max_in_flight=4)
+    assert count == 10
+    assert len(decoded) < 100, "decoder should stop shortly after the sink does"
+    print("✓ sink returning False stops decoding")
+
+
+def test_transform_errors_propagate():
+    def transform(index, frame):
+        if index == 5:
+            raise ValueError("bad frame")
+        return frame
+
+    try:
+        run_frame_pipeline(range(50), transform, lambda i, r: None, workers=3)
+    except ValueError as e:
+        assert str(e) == "bad frame"
+        print("✓ transform errors reach the caller")
+    else:
+        raise AssertionError("expected ValueError")
+
+
+if __name__ == "__main__":
+    test_results_arrive_in_frame_order()
+    test_sink_can_stop_early()
+    test_transform_errors_propagate()
+    print("\nAll frame pipeline tests passed.")
@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Test script for the local highlight scorer.
+"""
+
+from Components.HighlightScorer import (
+    score_windows,
+    select_top_windows,
+    build_prefiltered_transcript,
+    local_highlight,
+    local_multi_segment,
+)
+
+# Filler for the first minute, then a dense, punchy stretch
+sample_transcriptions = (
+    [{"text": "so yeah we were just kind of hanging out", "start": i * 6.0, "end": i * 6.0 + 6.0} for i in range(10)]
+    + [{"text": "Why did the rocket engine explode during the final ignition test?", "start": 60.0 + i * 4.0, "end": 64.0 + i * 4.0} for i in range(10)]
+    + [{"text": "and then we went home", "start": 100.0 + i * 6.0, "end": 106.0 + i * 6.0} for i in range(10)]
+)
+
+
+def test_scores_prefer_dense_window():
+    windows = score_windows(sample_transcriptions, window_seconds=30.0)
+    assert len(windows) == len(sample_transcriptions)
+    best = max(windows, key=lambda w: w['score'])
+    assert 55.0 <= best['start'] <= 90.0, best
+    print(f"✓ Best window: {best['start']:.1f}s - {best['end']:.1f}s")
+
+
+def test_top_windows_do_not_overlap():
+    windows = select_top_windows(score_windows(sample_transcriptions, window_seconds=20.0), top_k=3)
+    for a, b in zip(windows, windows[1:]):
+        assert a['end'] <= b['start']
+    text = build_prefiltered_transcript(sample_transcriptions, windows)
+    assert text.count("\n") < len(sample_transcriptions)
+    print(f"✓ {len(windows)} non-overlapping windows, prefiltered transcript has {text.count(chr(10))} lines")
+
+
+def test_local_fallbacks():
+    start, end = local_highlight(sample_transcriptions, target_duration=30)
+    assert start is not None and end > start
+    segments = local_multi_segment(sample_transcriptions, target_duration=40, segment_seconds=10.0)
+    assert segments and all(s['end'] > s['start'] for s in segments)
+    assert segments == sorted(segments, key=lambda s: s['start'])
+    print(f"✓ Local fallbacks returned {len(segments)} segments")
+
+
+if __name__ == "__main__":
+    test_scores_prefer_dense_window()
+    test_top_windows_do_not_overlap()
+    test_local_fallbacks()
+    print("\n✓ All highlight scorer tests passed")
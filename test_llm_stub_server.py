@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the LLM record/replay stub (no network: the upstream call is faked).
+"""
+
+import asyncio
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+import llm_stub_server
+
+client = TestClient(llm_stub_server.app)
+
+REQUEST = {
+    "model": "gpt-4o-mini",
+    "messages": [{"role": "user", "content": "Pick the best highlight"}],
+    "temperature": 1.0,
+}
+UPSTREAM_BODY = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "0 - 30"}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 12, "completion_tokens": 4, "total_tokens": 16},
+}
+UPSTREAM_LATENCY = 0.1
+
+
+class FakeUpstreamResponse:
+    status_code = 200
+
+    def json(self):
+        return UPSTREAM_BODY
+
+
+async def fake_forward_upstream(body, authorization):
+    fake_forward_upstream.calls += 1
+    await asyncio.sleep(UPSTREAM_LATENCY)
+    return FakeUpstreamResponse()
+
+
+def use_config(cassette_dir, **overrides):
+    llm_stub_server.config.update({
+        "mode": "replay",
+        "cassette_dir": cassette_dir,
+        "latency_ms": "0",
+        "jitter_ms": 0.0,
+    })
+    llm_stub_server.config.update(overrides)
+
+
+def timed_post(body):
+    started = time.monotonic()
+    response = client.post("/v1/chat/completions", json=body)
+    return response, time.monotonic() - started
+
+
+def test_record_then_replay():
+    original = llm_stub_server.forward_upstream
+    llm_stub_server.forward_upstream = fake_forward_upstream
+    fake_forward_upstream.calls = 0
+    try:
+        with tempfile.TemporaryDirectory() as cassettes:
+            use_config(cassettes, mode="record")
+            recorded = client.post("/v1/chat/completions", json=REQUEST)
+            assert recorded.status_code == 200, recorded.text
+            assert fake_forward_upstream.calls == 1
+
+            use_config(cassettes, mode="replay")
+            replayed = client.post("/v1/chat/completions", json=REQUEST)
+            assert replayed.status_code == 200, replayed.text
+            assert replayed.json() == recorded.json() == UPSTREAM_BODY
+            assert fake_forward_upstream.calls == 1
+
+            missing = client.post("/v1/chat/completions", json={**REQUEST, "temperature": 0.0})
+            assert missing.status_code == 404
+    finally:
+        llm_stub_server.forward_upstream = original
+    print("✓ Record then replay returns the same body without calling upstream")
+
+
+def test_latency_applied():
+    original = llm_stub_server.forward_upstream
+    llm_stub_server.forward_upstream = fake_forward_upstream
+    try:
+        with tempfile.TemporaryDirectory() as cassettes:
+            use_config(cassettes, mode="record")
+            client.post("/v1/chat/completions", json=REQUEST)
+
+            use_config(cassettes, latency_ms="0")
+            _, baseline = timed_post(REQUEST)
+
+            use_config(cassettes, latency_ms="300")
+            response, fixed = timed_post(REQUEST)
+            assert response.status_code == 200
+            assert fixed >= 0.3, fixed
+
+            use_config(cassettes, latency_ms="recorded")
+            response, recorded = timed_post(REQUEST)
+            assert response.status_code == 200
+            assert recorded >= UPSTREAM_LATENCY, recorded
+    finally:
+        llm_stub_server.forward_upstream = original
+    print(f"✓ Latency applied: {baseline * 1000:.0f}ms baseline, {fixed * 1000:.0f}ms fixed, {recorded * 1000:.0f}ms recorded")
+
+
+if __name__ == "__main__":
+    test_record_then_replay()
+    test_latency_applied()
+    print("\nAll LLM stub tests passed!")
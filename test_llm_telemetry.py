@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Test script for per-job LLM telemetry and the Prometheus export served at /metrics.
+"""
+
+import asyncio
+import threading
+
+from Components.LLMTelemetry import (
+    estimate_cost,
+    export_prometheus,
+    get_job_summary,
+    job_context,
+    record_cache_hits,
+    record_call,
+)
+
+
+def fake_job(job_id, calls, barrier):
+    """Record calls for job_id, interleaving with the other job at every step."""
+    with job_context(job_id):
+        for name, model, prompt_tokens, completion_tokens, retries in calls:
+            barrier.wait()
+            record_call(name, model, 0.5, prompt_tokens, completion_tokens, retries)
+
+
+def test_concurrent_jobs_are_separated():
+    barrier = threading.Barrier(2)
+    jobs = {
+        "telemetry-job-a": [("TestHighlight", "gpt-4o-mini", 1000, 200, 0), ("TestVision", "gpt-4o", 500, 100, 2)],
+        "telemetry-job-b": [("TestHighlight", "gpt-4o-mini", 3000, 400, 1), ("TestHighlight", "gpt-4o-mini", 100, 10, 0)],
+    }
+    threads = [threading.Thread(target=fake_job, args=(job_id, calls, barrier)) for job_id, calls in jobs.items()]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    a = get_job_summary("telemetry-job-a")
+    b = get_job_summary("telemetry-job-b")
+    assert a["calls"] == 2 and b["calls"] == 2
+    assert a["retries"] == 2 and b["retries"] == 1
+    assert a["prompt_tokens"] == 1500 and b["prompt_tokens"] == 3100
+    assert set(a["by_name"]) == {"TestHighlight", "TestVision"}
+    assert set(b["by_name"]) == {"TestHighlight"}
+    expected_a = estimate_cost("gpt-4o-mini", 1000, 200) + estimate_cost("gpt-4o", 500, 100)
+    assert abs(a["cost_usd"] - round(expected_a, 6)) < 1e-9, a["cost_usd"]
+    assert a["by_name"]["TestVision"]["model"] == "gpt-4o"
+
+    # Calls outside any job_context are not attributed to a job
+    record_call("TestHighlight", "gpt-4o-mini", 0.1, 10, 10)
+    assert get_job_summary("telemetry-job-a")["calls"] == 2
+
+    cleared = get_job_summary("telemetry-job-b", clear=True)
+    assert cleared["calls"] == 2 and get_job_summary("telemetry-job-b")["calls"] == 0
+    print(f"✓ Concurrent jobs separated: A ${a['cost_usd']:.6f} / {a['retries']} retries, B ${b['cost_usd']:.6f} / {b['retries']} retries")
+
+
+def test_async_tasks_inherit_job():
+    async def job(job_id):
+        with job_context(job_id):
+            # Tasks spawned inside the block copy the context, so their calls count for the job
+            await asyncio.gather(*[
+                asyncio.to_thread(record_call, "TestAsyncVision", "gpt-4o-mini", 0.2, 100, 10)
+                for _ in range(3)
+            ])
+            record_cache_hits("TestAsyncVision", "gpt-4o-mini", 2)
+
+    async def main():
+        await asyncio.gather(job("telemetry-async-a"), job("telemetry-async-b"))
+
+    asyncio.run(main())
+    for job_id in ("telemetry-async-a", "telemetry-async-b"):
+        summary = get_job_summary(job_id)
+        assert summary["calls"] == 3 and summary["cache_hits"] == 2, summary
+    print("✓ Async tasks and worker threads attribute calls to their job")
+
+
+def test_prometheus_export():
+    with job_context("telemetry-metrics"):
+        record_call("TestMetrics", "gpt-4o-mini", 1.5, 1000, 500, retries=3)
+        record_call("TestMetrics", "gpt-4o-mini", 0.5, 0, 0, error="APITimeoutError")
+
+    text = export_prometheus()
+    assert "# TYPE zipclip_llm_calls_total counter" in text
+    labels = '{name="TestMetrics",model="gpt-4o-mini",status="ok"}'
+    assert f"zipclip_llm_calls_total{labels} 1" in text
+    assert f"zipclip_llm_retries_total{labels} 3" in text
+    assert f"zipclip_llm_prompt_tokens_total{labels} 1000" in text
+    assert f"zipclip_llm_cost_usd_total{labels} {estimate_cost('gpt-4o-mini', 1000, 500)}" in text
+    assert 'zipclip_llm_calls_total{name="TestMetrics",model="gpt-4o-mini",status="error"} 1' in text
+    print("✓ Prometheus export renders calls, retries, tokens and cost per name/model/status")
+
+
+if __name__ == "__main__":
+    test_concurrent_jobs_are_separated()
+    test_async_tasks_inherit_job()
+    test_prometheus_export()
+    print("\nAll LLM telemetry tests passed!")
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Test script for the cached media probe.
+The probe backend is replaced with a counter, so no ffprobe/PyAV is needed.
+"""
+
+import os
+import tempfile
+
+import Components.MediaProbe as MediaProbe
+
+
+def test_probe_is_cached_per_file_version():
+    calls = []
+
+    def fake_probe(path):
+        calls.append(path)
+        return {"duration": 12.5, "fps": 30.0, "width": 1920, "height": 1080, "has_video": True, "has_audio": True}
+
+    original_exe, original_av = MediaProbe._get_ffprobe_exe, MediaProbe._probe_with_av
+    MediaProbe._get_ffprobe_exe = lambda: None
+    MediaProbe._probe_with_av = fake_probe
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["MEDIA_PROBE_CACHE_DIR"] = os.path.join(tmp, "probe")
+            video = os.path.join(tmp, "clip.mp4")
+            with open(video, "wb") as f:
+                f.write(b"\0" * 100)
+
+            info = MediaProbe.probe_media(video)
+            assert info["duration"] == 12.5 and info["frame_count"] == 375
+            MediaProbe.probe_media(video)
+            assert len(calls) == 1, "second probe should hit the memory cache"
+
+            # A fresh process (empty memory cache) reads the JSON cache
+            MediaProbe._memory_cache.clear()
+            assert MediaProbe.probe_media(video)["width"] == 1920
+            assert len(calls) == 1, "JSON cache should be used"
+
+            # Changing the file invalidates the entry
+            with open(video, "ab") as f:
+                f.write(b"\0")
+            MediaProbe.probe_media(video)
+            assert len(calls) == 2
+    finally:
+        MediaProbe._get_ffprobe_exe, MediaProbe._probe_with_av = original_exe, original_av
+        os.environ.pop("MEDIA_PROBE_CACHE_DIR", None)
+        MediaProbe._memory_cache.clear()
+    print("✓ Probe results are cached by path + mtime + size")
+
+
+def test_memory_cache_is_bounded_and_copied():
+    calls = []
+
+    def fake_probe(path):
+        calls.append(path)
+        return {"duration": 1.0, "fps": 25.0, "has_video": True, "has_audio": False}
+
+    original_exe, original_av = MediaProbe._get_ffprobe_exe, MediaProbe._probe_with_av
+    original_size = MediaProbe.MEDIA_PROBE_MEMORY_CACHE_SIZE
+    MediaProbe._get_ffprobe_exe = lambda: None
+    MediaProbe._probe_with_av = fake_probe
+    MediaProbe.MEDIA_PROBE_MEMORY_CACHE_SIZE = 2
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            os.environ["MEDIA_PROBE_CACHE_DIR"] = ""  # memory cache only
+            videos = []
+            for name in ("a.mp4", "b.mp4", "c.mp4"):
+                videos.append(os.path.join(tmp, name))
+                with open(videos[-1], "wb") as f:
+                    f.write(b"\0" * 10)
+
+            a, b, c = videos
+            info = MediaProbe.probe_media(a)
+            info["duration"] = 99.0  # callers may modify their copy
+            assert MediaProbe.probe_media(a)["duration"] == 1.0
+            MediaProbe.probe_media(b)
+            MediaProbe.probe_media(a)  # a is now the most recently used
+            MediaProbe.probe_media(c)  # evicts b
+            assert len(MediaProbe._memory_cache) == 2
+            assert len(calls) == 3
+            MediaProbe.probe_media(a)
+            assert len(calls) == 3, "a should still be cached"
+            MediaProbe.probe_media(b)
+            assert len(calls) == 4, "b should have been evicted"
+    finally:
+        MediaProbe._get_ffprobe_exe, MediaProbe._probe_with_av = original_exe, original_av
+        MediaProbe.MEDIA_PROBE_MEMORY_CACHE_SIZE = original_size
+        os.environ.pop("MEDIA_PROBE_CACHE_DIR", None)
+        MediaProbe._memory_cache.clear()
+    print("✓ Memory cache keeps the most recently used probes and hands out copies")
+
+
+def test_rotation_from_tags_and_display_matrix():
+    assert MediaProbe._rotation({"tags": {"rotate": "90"}}) == 90
+    # Current ffmpeg only reports the display matrix, counter-clockwise
+    assert MediaProbe._rotation({"side_data_list": [{"side_data_type": "Display Matrix", "rotation": -90}]}) == 90
+    assert MediaProbe._rotation({"side_data_list": [{"side_data_type": "Display Matrix", "rotation": 180}]}) == 180
+    assert MediaProbe._rotation({"tags": {}}) == 0
+    print("✓ Rotation read from the rotate tag or display-matrix side data")
+
+
+if __name__ == "__main__":
+    test_probe_is_cached_per_file_version()
+    test_memory_cache_is_bounded_and_copied()
+    test_rotation_from_tags_and_display_matrix()
+    print("\nAll media probe tests passed!")
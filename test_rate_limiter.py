@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Test script for the process-wide OpenAI request scheduler.
+"""
+
+import asyncio
+import time
+
+import pytest
+
+import Components.LLMClient as LLMClient
+from Components.RateLimiter import TokenBucket, RequestScheduler, PRIORITY_SELECTION, PRIORITY_BULK, _Ticket
+
+
+def test_token_bucket_adjust():
+    bucket = TokenBucket(rate=1.0, capacity=10)
+    assert bucket.try_acquire(10) == 0.0
+    bucket.adjust(-4)  # refund an over-estimate
+    assert bucket.try_acquire(4) == 0.0
+    assert bucket.try_acquire(1) > 0
+    print("✓ Token bucket refunds and charges corrections")
+
+
+def test_priority_and_job_fairness():
+    scheduler = RequestScheduler(rpm=6000, tpm=10_000_000)
+    order = []
+
+    async def request(label, priority, job_id):
+        await scheduler.acquire_async(100, priority, job_id)
+        order.append(label)
+
+    async def main():
+        # Hold the queue so every request is waiting before the first grant
+        scheduler.pause(0.3)
+        tasks = [asyncio.create_task(request(f"A-vision-{i}", PRIORITY_BULK, "A")) for i in range(3)]
+        tasks += [asyncio.create_task(request("B-vision-0", PRIORITY_BULK, "B"))]
+        tasks += [asyncio.create_task(request("B-select", PRIORITY_SELECTION, "B"))]
+        await asyncio.gather(*tasks)
+
+    asyncio.run(main())
+    assert order[0] == "B-select", order
+    # Job B's single vision call is not stuck behind job A's whole burst
+    assert order.index("B-vision-0") < order.index("A-vision-2"), order
+    print(f"✓ Dispatch order: {order}")
+
+
+def test_sync_callers_respect_rpm():
+    scheduler = RequestScheduler(rpm=600, tpm=10_000_000, burst_seconds=0.1)  # 10 req/s, burst of 1
+    started = time.monotonic()
+    for _ in range(4):
+        scheduler.acquire(10)
+    elapsed = time.monotonic() - started
+    assert elapsed >= 0.25, elapsed
+    print(f"✓ 4 blocking requests took {elapsed:.2f}s at 10 requests/second")
+
+
+def test_closed_loop_does_not_kill_dispatcher():
+    scheduler = RequestScheduler(rpm=6000, tpm=10_000_000)
+    loop = asyncio.new_event_loop()
+    orphan = _Ticket(10, loop)
+    loop.close()
+    # An async caller whose loop closed before its grant must not stop other callers
+    scheduler.pause(0.1)
+    scheduler._enqueue(orphan, PRIORITY_SELECTION, "gone")
+    scheduler.acquire(10)
+    assert scheduler._dispatcher.is_alive()
+    assert not orphan.granted
+    print("✓ Grant to a closed event loop is skipped and the dispatcher keeps running")
+
+
+def test_settle_uses_charged_tokens():
+    scheduler = RequestScheduler(rpm=6000, tpm=600, burst_seconds=1.0)  # 10 tokens/s, bucket of 10
+    charged = scheduler.acquire(50)
+    assert charged == 10, charged
+    # The oversized request really used 12 tokens: only the 2 beyond the charge are taken
+    scheduler.settle(charged, 12)
+    assert scheduler.tokens._tokens < -1.5, scheduler.tokens._tokens
+    print(f"✓ Oversized request charged {charged:.0f} tokens and settled against that")
+
+
+def test_failed_call_refunds_its_tokens(monkeypatch):
+    scheduler = RequestScheduler(rpm=6000, tpm=600, burst_seconds=1.0)  # bucket of 10 tokens
+    monkeypatch.setattr(LLMClient, "get_request_scheduler", lambda: scheduler)
+
+    class FailingModel:
+        def invoke(self, inputs, config=None):
+            raise ValueError("bad request")
+
+    for _ in range(5):
+        with pytest.raises(ValueError):
+            LLMClient.invoke_llm(FailingModel(), "x" * 400, "TestFailure", "gpt-4o-mini")
+    # Each attempt was charged the whole bucket; without the refund it would be empty
+    assert scheduler.tokens._tokens > 9, scheduler.tokens._tokens
+    print("✓ Tokens charged for failed calls are refunded")
+
+
+def test_zero_limits_disable_the_scheduler():
+    scheduler = RequestScheduler(rpm=0, tpm=0)
+    assert scheduler.requests is None and scheduler.tokens is None
+    started = time.monotonic()
+    for _ in range(20):
+        charged = scheduler.acquire(1_000_000)
+        scheduler.settle(charged, 0)
+    assert time.monotonic() - started < 1.0
+    print("✓ RPM/TPM of 0 disables the limits instead of blocking every call")
+
+
+if __name__ == "__main__":
+    test_token_bucket_adjust()
+    test_priority_and_job_fairness()
+    test_sync_callers_respect_rpm()
+    test_closed_loop_does_not_kill_dispatcher()
+    test_settle_uses_charged_tokens()
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_failed_call_refunds_its_tokens(monkeypatch)
+    test_zero_limits_disable_the_scheduler()
+    print("\nAll scheduler tests passed!")
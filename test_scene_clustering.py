@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Test script for visual scene clustering under a vision-call budget.
+"""
+
+import numpy as np
+
+from Components.SceneClustering import scene_embeddings, cluster_scenes
+
+
+def solid(rgb, noise_seed=None):
+    frame = np.zeros((90, 160, 3), dtype=np.uint8)
+    frame[:] = rgb
+    if noise_seed is not None:
+        noise = np.random.default_rng(noise_seed).integers(0, 6, frame.shape)
+        frame = np.clip(frame.astype(int) + noise, 0, 255).astype(np.uint8)
+    return frame
+
+
+def test_similar_scenes_share_a_cluster():
+    # Three looks, several near-identical scenes each
+    frames = [solid((200, 40, 40), i) for i in range(4)]
+    frames += [solid((40, 200, 40), 10 + i) for i in range(3)]
+    frames += [solid((40, 40, 200), 20 + i) for i in range(5)]
+
+    embeddings = scene_embeddings(frames)
+    representatives, labels = cluster_scenes(embeddings, max_clusters=3)
+
+    assert len(representatives) == 3
+    assert len(set(labels[:4])) == 1 and len(set(labels[4:7])) == 1 and len(set(labels[7:])) == 1, labels
+    assert len(set(labels)) == 3, labels
+    print(f"✓ 12 scenes -> {len(representatives)} representatives, labels {labels}")
+
+
+def test_under_budget_keeps_every_scene():
+    embeddings = np.random.default_rng(1).random((5, 8)).astype(np.float32)
+    representatives, labels = cluster_scenes(embeddings, max_clusters=10)
+    assert representatives == list(range(5)) and labels == list(range(5))
+    print("✓ No clustering when the budget covers every scene")
+
+
+if __name__ == "__main__":
+    test_similar_scenes_share_a_cluster()
+    test_under_budget_keeps_every_scene()
+    print("\nAll scene clustering tests passed!")
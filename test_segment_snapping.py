@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Test script for sentence-boundary snapping of selected segments.
+"""
+
+from Components.SegmentSnapping import BoundaryIndex, snap_segments
+
+
+def make_words(sentence, start, step=0.5):
+    return [
+        {"text": f" {w}", "start": start + i * step, "end": start + i * step + 0.4}
+        for i, w in enumerate(sentence.split())
+    ]
+
+
+sample_transcriptions = [
+    {"text": "Hello there. This is a test.", "start": 0.0, "end": 3.0,
+     "words": make_words("Hello there. This is a test.", 0.0)},
+    {"text": "We snap to sentences. Always cleanly.", "start": 3.0, "end": 6.0,
+     "words": make_words("We snap to sentences. Always cleanly.", 3.0)},
+]
+
+
+def test_snap_to_sentence_boundaries():
+    index = BoundaryIndex(sample_transcriptions)
+    assert index.sentence_starts == [0.0, 1.0, 3.0, 5.0]
+    assert index.snap_start(1.2) == 1.0
+    assert index.snap_end(4.3) == 4.9
+    print("✓ Edges snap to nearest sentence boundaries")
+
+
+def test_merge_and_sort():
+    index = BoundaryIndex(sample_transcriptions)
+    segments = snap_segments(
+        [{"start": 3.1, "end": 5.6, "content": "b"}, {"start": 0.1, "end": 2.4, "content": "a"}, {"start": 1.1, "end": 3.2, "content": "c"}],
+        index,
+        max_shift=1.0,
+        merge_gap=0.05,
+    )
+    assert len(segments) == 2
+    assert [s['start'] for s in segments] == sorted(s['start'] for s in segments)
+    for a, b in zip(segments, segments[1:]):
+        assert a['end'] < b['start']
+    print(f"✓ Segments sorted and merged: {[(s['start'], s['end']) for s in segments]}")
+
+
+if __name__ == "__main__":
+    test_snap_to_sentence_boundaries()
+    test_merge_and_sort()
+    print("\n✓ All segment snapping tests passed")
@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+"""
+Test script for concurrent and batched vision requests (describe_frames_async).
+The chat model is replaced by a stub that reads each frame's gray level back
+from the JPEG it receives, so no network or API key is needed.
+"""
+
+import asyncio
+import base64
+
+import cv2
+import numpy as np
+import pytest
+
+import Components.LLMClient as LLMClient
+from Components.RateLimiter import RequestScheduler
+from Components.SceneDetection import (
+    FrameBatchResponse,
+    FrameDescription,
+    analyze_frames_batch_with_gpt_async,
+    describe_frames_async,
+)
+
+
+def make_frames(count):
+    """Flat gray frames; frame i has gray level 20 * (i + 1)."""
+    return [np.full((48, 64, 3), 20 * (i + 1), dtype=np.uint8) for i in range(count)]
+
+
+def frame_ids(messages):
+    """Indices of the frames attached to a vision message, in order."""
+    ids = []
+    for part in messages[0].content:
+        if part["type"] == "image_url":
+            data = base64.b64decode(part["image_url"]["url"].split(",", 1)[1])
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+            ids.append(int(round(image.mean() / 20)) - 1)
+    return ids
+
+
+class Reply:
+    def __init__(self, content):
+        self.content = content
+
+
+class StubVisionModel:
+    """
+    Stands in for ChatOpenAI: answers "frame <i>" after delays[i] seconds,
+    raises for frames in `fail` and leaves frames in `skip` out of batched answers.
+    """
+
+    def __init__(self, delays=None, fail=(), skip=()):
+        self.delays = delays or {}
+        self.fail = set(fail)
+        self.skip = set(skip)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+
+    def with_structured_output(self, schema, method=None):
+        assert schema is FrameBatchResponse
+        return _StructuredStub(self)
+
+    async def ainvoke(self, messages, config=None, structured=False):
+        ids = frame_ids(messages)
+        self.calls.append(ids)
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            await asyncio.sleep(max(self.delays.get(i, 0.02) for i in ids))
+        finally:
+            self.active -= 1
+        if any(i in self.fail for i in ids):
+            raise RuntimeError(f"stub failure for frames {ids}")
+        if structured:
+            items = [FrameDescription(frame=n, description=f" frame {i} ") for n, i in enumerate(ids, 1) if i not in self.skip]
+            # Labels outside the request are ignored
+            items.append(FrameDescription(frame=len(ids) + 1, description="not a frame"))
+            return FrameBatchResponse(frames=items)
+        return Reply(f" frame {ids[0]} ")
+
+
+class _StructuredStub:
+    def __init__(self, model):
+        self.model = model
+
+    async def ainvoke(self, messages, config=None):
+        return await self.model.ainvoke(messages, config, structured=True)
+
+
+def use_stub(monkeypatch, model):
+    monkeypatch.setattr(LLMClient, "get_chat_model", lambda *args, **kwargs: model)
+    # Unlimited scheduler, so the test only measures the stub and the semaphore
+    monkeypatch.setattr(LLMClient, "get_request_scheduler", lambda: RequestScheduler(rpm=0, tpm=0))
+    # Flat frames would all hash alike; describe each one
+    monkeypatch.setenv("VISION_DEDUP_MAX_DISTANCE", "-1")
+    monkeypatch.setenv("LLM_MAX_RETRIES", "0")
+
+
+def test_results_keep_scene_order(monkeypatch):
+    # Later frames answer first
+    model = StubVisionModel(delays={i: 0.02 * (6 - i) for i in range(6)})
+    use_stub(monkeypatch, model)
+    descriptions = asyncio.run(describe_frames_async(make_frames(6), max_concurrency=6, batch_size=1))
+
+    assert descriptions == [f"frame {i}" for i in range(6)], descriptions
+    assert [ids[0] for ids in model.calls] == list(range(6))
+    print("✓ Descriptions follow scene order when requests finish in reverse")
+
+
+def test_semaphore_bounds_concurrency(monkeypatch):
+    model = StubVisionModel()
+    use_stub(monkeypatch, model)
+    descriptions = asyncio.run(describe_frames_async(make_frames(8), max_concurrency=3, batch_size=1))
+
+    assert all(descriptions)
+    assert model.max_active == 3, model.max_active
+    print(f"✓ At most {model.max_active} vision requests in flight for 8 frames")
+
+
+def test_failing_frame_falls_back_alone(monkeypatch):
+    model = StubVisionModel(fail={2})
+    use_stub(monkeypatch, model)
+    descriptions = asyncio.run(describe_frames_async(make_frames(4), max_concurrency=4, batch_size=1))
+
+    # The failed frame has no description (the fallback string is dropped); the others are kept
+    assert descriptions == ["frame 0", "frame 1", None, "frame 3"], descriptions
+    print("✓ One failing frame does not fail the others")
+
+
+def test_batch_response_parsed(monkeypatch):
+    model = StubVisionModel(skip={1})
+    use_stub(monkeypatch, model)
+    descriptions = asyncio.run(analyze_frames_batch_with_gpt_async(make_frames(3)))
+
+    assert descriptions == ["frame 0", None, "frame 2"], descriptions
+    assert model.calls == [[0, 1, 2]]
+    print("✓ Batched response mapped to frames by label; skipped frame left empty")
+
+
+def test_missing_batch_frame_uses_single_request(monkeypatch):
+    model = StubVisionModel(skip={2})
+    use_stub(monkeypatch, model)
+    descriptions = asyncio.run(describe_frames_async(make_frames(5), max_concurrency=2, batch_size=4))
+
+    assert descriptions == [f"frame {i}" for i in range(5)], descriptions
+    # One batch of four, the fifth frame alone, then frame 2 again on its own
+    assert sorted(model.calls) == [[0, 1, 2, 3], [2], [4]], model.calls
+    print("✓ Frame missing from a batched answer is described by a single-frame request")
+
+
+def test_failed_batch_retries_frames_individually(monkeypatch):
+    model = StubVisionModel(fail={3})
+    use_stub(monkeypatch, model)
+    descriptions = asyncio.run(describe_frames_async(make_frames(4), max_concurrency=2, batch_size=4))
+
+    assert descriptions == ["frame 0", "frame 1", "frame 2", None], descriptions
+    assert len(model.calls) == 5, model.calls
+    print("✓ Failed batch falls back to one request per frame")
+
+
+if __name__ == "__main__":
+    for test in (
+        test_results_keep_scene_order,
+        test_semaphore_bounds_concurrency,
+        test_failing_frame_falls_back_alone,
+        test_batch_response_parsed,
+        test_missing_batch_frame_uses_single_request,
+        test_failed_batch_retries_frames_individually,
+    ):
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            test(monkeypatch)
+    print("\nAll vision request tests passed!")